@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark for libcloud.utils.files.read_in_chunks.
+
+Compares the current implementation with the previous one (which
+concatenated and re-sliced byte strings) on a synthetic stream.
+
+Example (stream 2 GB in 64 KB pieces, re-chunked to 5 MB parts):
+
+    python contrib/benchmark_read_in_chunks.py --size 2048 --piece-size 64 \
+        --chunk-size 5120
+"""
+
+import os
+import sys
+import time
+import argparse
+
+this_dir = os.path.abspath(os.path.split(__file__)[0])
+sys.path.insert(0, os.path.join(this_dir, '../'))
+
+from libcloud.utils.files import read_in_chunks
+
+
+def legacy_read_in_chunks(iterator, chunk_size, fill_size=False):
+    data = b''
+    empty = False
+
+    while not empty or len(data) > 0:
+        if not empty:
+            try:
+                chunk = next(iterator)
+                if len(chunk) > 0:
+                    data += chunk
+                else:
+                    empty = True
+            except StopIteration:
+                empty = True
+
+        if len(data) == 0:
+            return
+
+        if fill_size:
+            if empty or len(data) >= chunk_size:
+                yield data[:chunk_size]
+                data = data[chunk_size:]
+        else:
+            yield data
+            data = b''
+
+
+def generate_pieces(size, piece_size):
+    piece = b'x' * piece_size
+    remaining = size
+
+    while remaining > 0:
+        if remaining < piece_size:
+            piece = piece[:remaining]
+
+        remaining -= len(piece)
+        yield piece
+
+
+def run(func, size, piece_size, chunk_size):
+    start = time.time()
+    total = 0
+
+    for chunk in func(generate_pieces(size, piece_size), chunk_size,
+                      fill_size=True):
+        total += len(chunk)
+
+    elapsed = time.time() - start
+    assert total == size
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=512,
+                        help='Stream size in MB (default: 512)')
+    parser.add_argument('--piece-size', type=int, default=64,
+                        help='Size of pieces yielded by the source iterator '
+                             'in KB (default: 64)')
+    parser.add_argument('--chunk-size', type=int, default=5 * 1024,
+                        help='Chunk size in KB (default: 5120)')
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='Only benchmark the current implementation')
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    piece_size = args.piece_size * 1024
+    chunk_size = args.chunk_size * 1024
+
+    implementations = [('current', read_in_chunks)]
+
+    if not args.skip_legacy:
+        implementations.append(('legacy', legacy_read_in_chunks))
+
+    for name, func in implementations:
+        elapsed = run(func, size, piece_size, chunk_size)
+        print('%-8s %8.2f s %10.1f MB/s' % (name, elapsed,
+                                            args.size / elapsed))
+
+
+if __name__ == '__main__':
+    main()
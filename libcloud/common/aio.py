@@ -0,0 +1,539 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+asyncio support.
+
+This module requires Python 3.7 or newer and is not imported by default.
+
+L{AsyncConnection} performs non-blocking HTTP requests on the asyncio event
+loop using the request hooks (signing, default params and headers) and the
+response classes of an existing libcloud connection. It doesn't use a
+thread per request, so it is the building block for issuing thousands of
+concurrent API requests.
+
+L{AsyncNodeDriver}, L{AsyncStorageDriver}, L{AsyncDNSDriver} and
+L{AsyncLoadBalancerDriver} are a convenience for calling the existing
+(blocking) driver methods from a coroutine. Each call still occupies a
+thread of a bounded pool for its whole duration, so the number of
+concurrent calls is limited by the size of the pool. They don't block the
+event loop, but they are not a replacement for L{AsyncConnection} when the
+number of concurrent calls matters.
+
+The wrappers also expose the L{AsyncConnection} of the driver through
+L{AsyncDriver.request} and L{AsyncDriver.async_request}, so API requests
+which are not covered by a driver method can be issued without a thread
+using the credentials and the endpoint of the driver.
+"""
+
+import io
+import os
+import ssl
+import time
+import asyncio
+import functools
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
+
+import libcloud.security
+
+from libcloud.utils.py3 import b
+from libcloud.common.base import ConnectionPool, NON_IDEMPOTENT_METHODS
+from libcloud.common.types import LibcloudError
+
+__all__ = [
+    'AsyncHTTPResponse',
+    'AsyncConnection',
+    'AsyncDriver',
+    'AsyncNodeDriver',
+    'AsyncStorageDriver',
+    'AsyncDNSDriver',
+    'AsyncLoadBalancerDriver'
+]
+
+# Maximum number of driver calls which are executed concurrently by the
+# thread pool used by the Async*Driver classes
+DEFAULT_MAX_WORKERS = 10
+
+
+class AsyncHTTPResponse(object):
+    """
+    Fully buffered HTTP response returned by L{AsyncConnection}.
+
+    Exposes the subset of the httplib.HTTPResponse interface which is used by
+    the libcloud Response classes.
+    """
+
+    def __init__(self, status, reason, headers, body, version=11):
+        self.status = status
+        self.reason = reason
+        self.version = version
+        self._headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, amt=None):
+        return self._body.read(amt)
+
+    def getheader(self, name, default=None):
+        name = name.lower()
+
+        for key, value in self._headers:
+            if key.lower() == name:
+                return value
+
+        return default
+
+    def getheaders(self):
+        return list(self._headers)
+
+    def isclosed(self):
+        return True
+
+
+class _AsyncStream(object):
+    """
+    Open connection to the API server which is kept in the connection pool.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnection(object):
+    """
+    Connection which performs non-blocking HTTP requests using asyncio.
+
+    All the request pre-processing is delegated to the wrapped connection
+    (morph_action_hook, add_default_params, add_default_headers,
+    pre_connect_hook, encode_data) and responses are parsed using its
+    responseCls, so this class works with any existing connection class.
+
+    Note: Custom request() overrides in the wrapped connection class are not
+    called.
+    """
+
+    def __init__(self, connection, max_size=10, idle_timeout=10):
+        """
+        @type connection: L{Connection}
+        @param connection: Connection instance whose hooks and response
+                           classes are used.
+
+        @type max_size: C{int}
+        @param max_size: Maximum number of idle keep-alive connections which
+                         are kept per endpoint.
+
+        @type idle_timeout: C{int}
+        @param idle_timeout: Number of seconds after which an idle connection
+                             is closed.
+        """
+        self.connection = connection
+        self.connection_pool = ConnectionPool(max_size=max_size,
+                                              idle_timeout=idle_timeout)
+
+    async def request(self, action, params=None, data=None, headers=None,
+                      method='GET'):
+        """
+        Request a given `action`.
+
+        Takes the same arguments as L{Connection.request}, except that raw
+        requests are not supported.
+
+        @return: An instance of type I{responseCls} of the wrapped connection
+        """
+        connection = self.connection
+
+        # Preparing a request can block (e.g. OpenStack authenticates on the
+        # first request) so it's not done on the event loop
+        prepare = functools.partial(connection._prepare_request,
+                                    action=action, params=params, data=data,
+                                    headers=headers, method=method)
+        loop = asyncio.get_running_loop()
+        url, data, headers = await loop.run_in_executor(None, prepare)
+
+        host, port, secure = connection.host, int(connection.port), \
+            connection.secure
+
+        coroutine = self._perform_request(host=host, port=port,
+                                          secure=secure, method=method,
+                                          url=url, data=data,
+                                          headers=headers)
+
+        if connection.timeout:
+            http_response = await asyncio.wait_for(coroutine,
+                                                   connection.timeout)
+        else:
+            http_response = await coroutine
+
+        return connection.responseCls(response=http_response,
+                                      connection=connection)
+
+    async def async_request(self, action, params=None, data=None,
+                            headers=None, method='GET', context=None):
+        """
+        Awaitable version of L{PollingConnection.async_request}.
+
+        Job status is polled using asyncio.sleep so the event loop is not
+        blocked while waiting for the job to complete.
+
+        @return: An instance of type I{responseCls} of the wrapped connection
+        """
+        connection = self.connection
+
+        if not hasattr(connection, 'has_completed'):
+            raise LibcloudError('%s is not a PollingConnection' %
+                                (connection.__class__.__name__))
+
+        kwargs = connection.get_request_kwargs(action=action, params=params,
+                                               data=data, headers=headers,
+                                               method=method,
+                                               context=context)
+        response = await self._request_for_poll(**kwargs)
+        kwargs = connection.get_poll_request_kwargs(response=response,
+                                                    context=context,
+                                                    request_kwargs=kwargs)
+
+        end = time.time() + connection.timeout
+        completed = False
+        while time.time() < end and not completed:
+            response = await self._request_for_poll(**kwargs)
+            completed = connection.has_completed(response=response)
+            if not completed:
+                await asyncio.sleep(connection.poll_interval)
+
+        if not completed:
+            raise LibcloudError('Job did not complete in %s seconds' %
+                                (connection.timeout))
+
+        return response
+
+    def close(self):
+        """
+        Close all the idle keep-alive connections.
+        """
+        self.connection_pool.clear()
+
+    async def _request_for_poll(self, **kwargs):
+        request_method = self.connection.request_method
+
+        if request_method == 'request':
+            return await self.request(**kwargs)
+
+        # Custom request method (e.g. CloudStack's _sync_request) which
+        # performs a blocking request
+        func = functools.partial(getattr(self.connection, request_method),
+                                 **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func)
+
+    async def _perform_request(self, host, port, secure, method, url, data,
+                               headers):
+        key = (host, port, secure)
+
+        if method in NON_IDEMPOTENT_METHODS:
+            # Can't be safely re-sent if an idle connection is stale
+            stream, reused = None, False
+        else:
+            stream, reused = self.connection_pool.acquire(
+                key=key, factory=lambda: None)
+
+        released = False
+
+        try:
+            if stream is None:
+                stream = await self._open_stream(host=host, port=port,
+                                                 secure=secure)
+
+            try:
+                http_response, will_close = await self._send(
+                    stream=stream, method=method, url=url, data=data,
+                    headers=headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+
+                # Stale keep-alive connection, retry on a fresh one
+                stream.close()
+                stream = None
+                self.connection_pool.discard(key=key)
+                stream = await self._open_stream(host=host, port=port,
+                                                 secure=secure)
+                http_response, will_close = await self._send(
+                    stream=stream, method=method, url=url, data=data,
+                    headers=headers)
+
+            if not will_close:
+                self.connection_pool.release(key=key, connection=stream)
+                released = True
+        finally:
+            # Also closes the connection if the request has been cancelled
+            # (e.g. timed out) while the response was being read
+            if stream is not None and not released:
+                stream.close()
+
+        return http_response
+
+    async def _open_stream(self, host, port, secure):
+        ssl_context = None
+
+        if secure:
+            ssl_context = self._get_ssl_context()
+
+        reader, writer = await asyncio.open_connection(host, port,
+                                                       ssl=ssl_context)
+        return _AsyncStream(reader=reader, writer=writer)
+
+    def _get_ssl_context(self):
+        if not libcloud.security.VERIFY_SSL_CERT:
+            warnings.warn(libcloud.security.VERIFY_SSL_DISABLED_MSG)
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            return context
+
+        ca_certs = [cert for cert in libcloud.security.CA_CERTS_PATH
+                    if os.path.isfile(cert)]
+
+        if ca_certs:
+            return ssl.create_default_context(cafile=ca_certs[0])
+
+        if libcloud.security.VERIFY_SSL_CERT_STRICT:
+            raise RuntimeError(
+                libcloud.security.CA_CERTS_UNAVAILABLE_ERROR_MSG)
+
+        warnings.warn(libcloud.security.CA_CERTS_UNAVAILABLE_WARNING_MSG)
+        return ssl.create_default_context()
+
+    async def _send(self, stream, method, url, data, headers):
+        lines = ['%s %s HTTP/1.1' % (method, url)]
+
+        for key, value in headers.items():
+            lines.append('%s: %s' % (key, value))
+
+        request = b('\r\n'.join(lines) + '\r\n\r\n')
+
+        if data:
+            request += b(data)
+
+        stream.writer.write(request)
+        await stream.writer.drain()
+
+        return await self._read_response(reader=stream.reader, method=method)
+
+    async def _read_response(self, reader, method):
+        while True:
+            status_line = await reader.readline()
+
+            if not status_line:
+                raise ConnectionResetError('Connection closed by the server')
+
+            version, status, reason = self._parse_status_line(status_line)
+            headers = await self._read_headers(reader=reader)
+
+            # Skip informational (e.g. 100 Continue) responses
+            if not 100 <= status < 200:
+                break
+
+        lower_headers = dict([(key.lower(), value)
+                              for key, value in headers])
+        transfer_encoding = lower_headers.get('transfer-encoding', '')
+        content_length = lower_headers.get('content-length', None)
+
+        will_close = (version == 10 or
+                      lower_headers.get('connection', '').lower() == 'close')
+
+        if method == 'HEAD' or status in (204, 304):
+            body = b('')
+        elif 'chunked' in transfer_encoding.lower():
+            body = await self._read_chunked(reader=reader)
+        elif content_length is not None:
+            body = await reader.readexactly(int(content_length))
+        else:
+            body = await reader.read()
+            will_close = True
+
+        http_response = AsyncHTTPResponse(status=status, reason=reason,
+                                          headers=headers, body=body,
+                                          version=version)
+        return http_response, will_close
+
+    def _parse_status_line(self, line):
+        parts = line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ConnectionResetError('Invalid status line: %r' % (line))
+
+        version = 10 if parts[0] == 'HTTP/1.0' else 11
+        reason = parts[2] if len(parts) == 3 else ''
+        return version, int(parts[1]), reason
+
+    async def _read_headers(self, reader):
+        headers = []
+
+        while True:
+            line = await reader.readline()
+
+            if line in (b('\r\n'), b('\n'), b('')):
+                break
+
+            name, value = line.decode('latin-1').split(':', 1)
+            headers.append((name.strip(), value.strip()))
+
+        return headers
+
+    async def _read_chunked(self, reader):
+        chunks = []
+
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b(';'), 1)[0].strip(), 16)
+
+            if size == 0:
+                # Skip trailers
+                await self._read_headers(reader=reader)
+                break
+
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+        return b('').join(chunks)
+
+
+class AsyncDriver(object):
+    """
+    Wraps a driver instance and exposes awaitable variants of its methods.
+
+    Methods listed in `async_methods` are the blocking driver methods run in
+    a bounded thread pool: every call in progress uses one thread of the
+    pool and calls beyond `max_workers` wait for a free thread.
+    """
+
+    async_methods = ()
+
+    def __init__(self, driver, executor=None,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """
+        @type driver: L{BaseDriver}
+        @param driver: Driver instance.
+
+        @type executor: C{concurrent.futures.Executor}
+        @param executor: Optional executor used to run the driver methods.
+                         If not provided, a new ThreadPoolExecutor with
+                         `max_workers` workers is created and shut down by
+                         L{close}.
+        """
+        self.driver = driver
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self._connection = None
+
+    @property
+    def connection(self):
+        """
+        L{AsyncConnection} which wraps the connection of the driver.
+        """
+        if self._connection is None:
+            self._connection = AsyncConnection(self.driver.connection)
+
+        return self._connection
+
+    async def request(self, action, **kwargs):
+        """
+        Perform a non-blocking request using the connection of the driver.
+
+        See L{AsyncConnection.request}.
+        """
+        return await self.connection.request(action, **kwargs)
+
+    async def async_request(self, action, **kwargs):
+        """
+        Perform a non-blocking polling request using the connection of the
+        driver.
+
+        See L{AsyncConnection.async_request}.
+        """
+        return await self.connection.async_request(action, **kwargs)
+
+    async def call(self, name, *args, **kwargs):
+        """
+        Call driver method `name` without blocking the event loop.
+        """
+        func = functools.partial(getattr(self.driver, name), *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func)
+
+    def close(self):
+        """
+        Close the idle connections of L{connection} and shut down the
+        executor if it has been created by this wrapper.
+        """
+        if self._connection is not None:
+            self._connection.close()
+
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '<%s: driver=%r>' % (self.__class__.__name__, self.driver)
+
+
+def _async_method(name):
+    async def method(self, *args, **kwargs):
+        return await self.call(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = 'Awaitable variant of C{%s}.' % (name)
+    return method
+
+
+class AsyncNodeDriver(AsyncDriver):
+    async_methods = ('list_nodes', 'create_node', 'destroy_node',
+                     'reboot_node', 'list_images', 'list_sizes',
+                     'list_locations', 'deploy_node')
+
+
+class AsyncStorageDriver(AsyncDriver):
+    async_methods = ('list_containers', 'list_container_objects',
+                     'get_container', 'get_object', 'create_container',
+                     'delete_container', 'upload_object', 'download_object',
+                     'delete_object')
+
+
+class AsyncDNSDriver(AsyncDriver):
+    async_methods = ('list_zones', 'list_records', 'get_zone', 'get_record',
+                     'create_zone', 'update_zone', 'delete_zone',
+                     'create_record', 'update_record', 'delete_record')
+
+
+class AsyncLoadBalancerDriver(AsyncDriver):
+    async_methods = ('list_balancers', 'create_balancer', 'destroy_balancer',
+                     'get_balancer', 'balancer_attach_member',
+                     'balancer_detach_member', 'balancer_list_members')
+
+
+for _cls in (AsyncNodeDriver, AsyncStorageDriver, AsyncDNSDriver,
+             AsyncLoadBalancerDriver):
+    for _name in _cls.async_methods:
+        setattr(_cls, _name, _async_method(_name))
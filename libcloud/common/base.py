@@ -13,9 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
 import sys
 import ssl
 import time
+import socket
+import threading
 
 from xml.etree import ElementTree as ET
 from pipes import quote as pquote
@@ -36,13 +41,20 @@ from libcloud.utils.py3 import u
 from libcloud.utils.py3 import b
 
 from libcloud.utils.misc import lowercase_keys
+from libcloud.utils.xml import findall, iterparse_elements
 from libcloud.utils.compression import decompress_data
+from libcloud.utils.compression import COMPRESSION_TYPES, DecompressingReader
 from libcloud.common.types import LibcloudError, MalformedResponseError
 
 from libcloud.httplib_ssl import LibcloudHTTPSConnection
 
 LibcloudHTTPConnection = httplib.HTTPConnection
 
+# Requests which are always sent on a new connection. If a re-used idle
+# connection turned out to be stale, they couldn't be safely re-sent since the
+# server may have already processed them.
+NON_IDEMPOTENT_METHODS = ['POST', 'PATCH']
+
 
 class HTTPResponse(httplib.HTTPResponse):
     # On python 2.6 some calls can hang because HEAD isn't quite properly
@@ -139,14 +151,12 @@ class Response(object):
         if original_data is not None:
             return original_data
 
-        body = response.read()
-
-        if encoding in ['zlib', 'deflate']:
-            body = decompress_data('zlib', body)
-        elif encoding in ['gzip', 'x-gzip']:
-            body = decompress_data('gzip', body)
+        if encoding in COMPRESSION_TYPES:
+            # Decompress the body while it's being read so the whole
+            # compressed body is never held in memory
+            body = DecompressingReader(response, encoding).read()
         else:
-            body = body.strip()
+            body = response.read().strip()
 
         return body
 
@@ -194,23 +204,53 @@ class XmlResponse(Response):
 
 class RawResponse(Response):
 
-    def __init__(self, connection):
+    def __init__(self, connection, decompress=False):
+        """
+        @type decompress: C{bool}
+        @param decompress: Decompress the body of a response which uses
+                           deflate or gzip encoding while it's being read.
+                           Only meant for API responses: objects which are
+                           stored compressed are downloaded as stored.
+        """
         self._status = None
         self._response = None
         self._headers = {}
         self._error = None
         self._reason = None
         self.connection = connection
+        self.decompress = decompress
 
     @property
     def response(self):
         if not self._response:
             response = self.connection.connection.getresponse()
+            response = self._decompress_raw_response(response)
             self._response, self.body = response, response
             if not self.success():
                 self.parse_error()
         return self._response
 
+    def _decompress_raw_response(self, response):
+        """
+        Wrap a response which uses deflate or gzip encoding in a stream which
+        decompresses the data while it's being read.
+
+        Nothing is decompressed unless it has been requested. Partial
+        (range) responses are always returned as-is since a range of a
+        compressed stream can't be decompressed on its own.
+
+        @return: Response or L{DecompressingReader} instance.
+        """
+        if not self.decompress or response.status != httplib.OK:
+            return response
+
+        encoding = response.getheader('content-encoding', None)
+
+        if encoding in COMPRESSION_TYPES:
+            return DecompressingReader(response, encoding)
+
+        return response
+
     @property
     def status(self):
         if not self._status:
@@ -230,6 +270,262 @@ class RawResponse(Response):
         return self._reason
 
 
+class StreamingXmlResponse(object):
+    """
+    Response which is returned by L{Connection.request} if C{stream=True}.
+
+    The body is not read in advance. Instead it's incrementally parsed while
+    it's being read from the socket using L{iterparse}. The underlying
+    connection is released once the body has been consumed or L{close} has
+    been called.
+
+    Unsuccessful responses are processed by the connection C{responseCls}
+    so the usual provider specific errors are raised.
+    """
+
+    object = None
+    body = None
+
+    def __init__(self, response, connection, release=None):
+        self.status = response.status
+        self.headers = lowercase_keys(dict(response.getheaders()))
+        self.error = response.reason
+        self.connection = connection
+
+        self._response = response
+        self._release = release
+        self._consumed = False
+
+        if not (200 <= int(self.status) <= 299):
+            try:
+                parsed = connection.responseCls(response=response,
+                                                connection=connection)
+            finally:
+                self.close()
+
+            self.body = parsed.body
+            self.object = parsed.object
+            self._consumed = True
+
+    def iterparse(self, xpath, namespace=None):
+        """
+        Return a generator which yields elements matching C{xpath} as soon as
+        they have been received.
+
+        Once the generator is exhausted, C{object} contains the root element
+        without the yielded elements.
+
+        @param xpath: Path of the elements relative to the root element.
+        @type xpath: C{str}
+
+        @param namespace: Optional namespace of the elements.
+        @type namespace: C{str}
+
+        @rtype: C{generator} of C{Element}
+        """
+        if self._consumed:
+            for element in findall(element=self.object, xpath=xpath,
+                                   namespace=namespace):
+                yield element
+            return
+
+        self._consumed = True
+        source = self._response
+        encoding = self.headers.get('content-encoding', None)
+
+        if encoding in COMPRESSION_TYPES:
+            source = DecompressingReader(source, encoding)
+
+        parsed = {}
+
+        try:
+            for element in iterparse_elements(source=source, xpath=xpath,
+                                              namespace=namespace,
+                                              parsed=parsed):
+                self.object = parsed['root']
+                yield element
+        except SyntaxError:
+            raise MalformedResponseError('Failed to parse XML',
+                                         body=None,
+                                         driver=self.connection.driver)
+        finally:
+            self.object = parsed.get('root', None)
+            self.close()
+
+    def close(self):
+        """
+        Release the underlying connection.
+
+        Connection is only re-used if the body has been fully read.
+        """
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of idle HTTP(S) connections.
+
+    Connections are keyed by the connection class and the arguments they were
+    created with (host, port, timeout) so a socket is only ever re-used for
+    the same endpoint. A connection is only handed back to the pool once the
+    response to the previous request has been fully read which makes it safe
+    to re-use it for another HTTP/1.1 keep-alive request.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=10):
+        """
+        @type max_size: C{int}
+        @param max_size: Maximum number of idle connections which are kept
+                         per endpoint. 0 disables pooling.
+
+        @type idle_timeout: C{int}
+        @param idle_timeout: Number of seconds after which an idle connection
+                             is evicted from the pool and closed. Should be
+                             lower than the keep-alive timeout of the
+                             servers (often 15 seconds or less).
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key, factory):
+        """
+        Return an idle connection for the provided key or create a new one.
+
+        @type key: C{tuple}
+        @param key: Pool key which identifies the endpoint.
+
+        @type factory: C{callable}
+        @param factory: Callable which returns a new connection.
+
+        @return: C{tuple} of (connection, reused) where reused is C{True} if
+                 the connection has been taken from the pool.
+        """
+        now = time.time()
+        expired = []
+        connection = None
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+
+            # Connections are appended on release so the most recently used
+            # ones live at the end of the list
+            while idle:
+                candidate, last_used = idle.pop()
+
+                if now - last_used <= self.idle_timeout:
+                    connection = candidate
+                    break
+
+                expired.append(candidate)
+
+        for item in expired:
+            self._close(item)
+
+        if connection is not None:
+            return connection, True
+
+        return factory(), False
+
+    def release(self, key, connection):
+        """
+        Return a connection whose response has been fully read to the pool.
+
+        If the pool for this key is already full, the connection is closed.
+        """
+        now = time.time()
+        expired = []
+        pooled = False
+
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+
+            while idle and now - idle[0][1] > self.idle_timeout:
+                expired.append(idle.pop(0)[0])
+
+            if len(idle) < self.max_size:
+                idle.append((connection, now))
+                pooled = True
+
+        for item in expired:
+            self._close(item)
+
+        if not pooled:
+            self._close(connection)
+
+    def discard(self, key):
+        """
+        Close and remove all the idle connections for the provided key.
+        """
+        with self._lock:
+            idle = self._idle.pop(key, [])
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def clear(self):
+        """
+        Close and remove all the idle connections.
+        """
+        with self._lock:
+            keys = list(self._idle.keys())
+
+        for key in keys:
+            self.discard(key)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class RequestStateAttribute(object):
+    """
+    Descriptor for Connection attributes which hold per-request state (the
+    underlying HTTP connection, the current action, method, etc.).
+
+    Values are stored in a thread-local so a single Connection (and as such,
+    a single driver instance) can be used to perform concurrent requests from
+    multiple threads without them clobbering each other's state.
+
+    Threads which haven't set a value yet see the default value of the
+    descriptor.
+    """
+
+    # Only used when the thread-local of an instance is created
+    _lock = threading.Lock()
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        return getattr(self._get_local(instance), self.name, self.default)
+
+    def __set__(self, instance, value):
+        setattr(self._get_local(instance), self.name, value)
+
+    def _get_local(self, instance):
+        local = instance.__dict__.get('_request_state', None)
+
+        if local is None:
+            with self._lock:
+                local = instance.__dict__.get('_request_state', None)
+
+                if local is None:
+                    local = threading.local()
+                    instance.__dict__['_request_state'] = local
+
+        return local
+
 #TODO: Move this to a better location/package
 class LoggingConnection():
     """
@@ -379,13 +675,22 @@ class Connection(object):
 
     responseCls = Response
     rawResponseCls = RawResponse
-    connection = None
+    streamResponseCls = StreamingXmlResponse
+    connection_pool = ConnectionPool()
     host = '127.0.0.1'
     port = 443
     timeout = None
     secure = 1
     driver = None
-    action = None
+
+    # Per-request state, see RequestStateAttribute
+    connection = RequestStateAttribute('connection')
+    action = RequestStateAttribute('action')
+    method = RequestStateAttribute('method')
+    context = RequestStateAttribute('context')
+
+    _connection_key = RequestStateAttribute('_connection_key')
+    _connection_reused = RequestStateAttribute('_connection_reused', False)
 
     def __init__(self, secure=True, host=None, port=None, url=None,
                  timeout=None):
@@ -442,7 +747,7 @@ class Connection(object):
 
         return (host, port, secure, request_path)
 
-    def connect(self, host=None, port=None, base_url=None):
+    def connect(self, host=None, port=None, base_url=None, pooled=True):
         """
         Establish a connection with the API server.
 
@@ -452,6 +757,10 @@ class Connection(object):
         @type port: C{int}
         @param port: Optional port to override our default
 
+        @type pooled: C{bool}
+        @param pooled: False to always open a new connection instead of
+                       re-using an idle one from the connection pool.
+
         @returns: A connection
         """
         # prefer the attribute base_url if its set or sent
@@ -475,14 +784,31 @@ class Connection(object):
         if self.timeout and not PY25:
             kwargs.update({'timeout': self.timeout})
 
-        connection = self.conn_classes[secure](**kwargs)
+        connection_cls = self.conn_classes[secure]
+
+        def factory():
+            return connection_cls(**kwargs)
+
         # You can uncoment this line, if you setup a reverse proxy server
         # which proxies to your endpoint, and lets you easily capture
         # connections in cleartext when you setup the proxy to do SSL
         # for you
-        #connection = self.conn_classes[False]("127.0.0.1", 8080)
+        #factory = lambda: self.conn_classes[False]("127.0.0.1", 8080)
+
+        key = None
+
+        if self.connection_pool is not None:
+            key = (connection_cls, tuple(sorted(kwargs.items())))
+
+        if key is not None and pooled:
+            connection, reused = self.connection_pool.acquire(key=key,
+                                                              factory=factory)
+        else:
+            connection, reused = factory(), False
 
         self.connection = connection
+        self._connection_key = key
+        self._connection_reused = reused
 
     def _user_agent(self):
         user_agent_suffix = ' '.join(['(%s)' % x for x in self.ua])
@@ -510,7 +836,7 @@ class Connection(object):
         self.ua.append(token)
 
     def request(self, action, params=None, data=None, headers=None,
-                method='GET', raw=False):
+                method='GET', raw=False, stream=False):
         """
         Request a given `action`.
 
@@ -540,8 +866,101 @@ class Connection(object):
                      and use the rawResponseCls class. This is used with
                      storage API when uploading a file.
 
+        @type stream: C{bool}
+        @param stream: True to return a L{StreamingXmlResponse} which parses
+                       the XML body incrementally while it's being read
+                       instead of reading it in advance.
+
         @return: An instance of type I{responseCls}
         """
+        url, data, headers = self._prepare_request(action=action,
+                                                   params=params, data=data,
+                                                   headers=headers,
+                                                   method=method)
+
+        # Removed terrible hack...this a less-bad hack that doesn't execute a
+        # request twice, but it's still a hack.
+        # The body of a raw request is sent by the caller and nothing re-sends
+        # it if an idle connection turns out to be stale, so it always uses a
+        # new connection. The same goes for non-idempotent requests.
+        self.connect(pooled=not raw and
+                     method not in NON_IDEMPOTENT_METHODS)
+
+        while True:
+            try:
+                # @TODO: Should we just pass File object as body to request
+                # method instead of dealing with splitting and sending the
+                # file ourselves?
+                if raw:
+                    self.connection.putrequest(method, url)
+
+                    for key, value in list(headers.items()):
+                        self.connection.putheader(key, str(value))
+
+                    self.connection.endheaders()
+                    http_response = None
+                else:
+                    self.connection.request(method=method, url=url,
+                                            body=data, headers=headers)
+                    http_response = self.connection.getresponse()
+            except ssl.SSLError:
+                e = sys.exc_info()[1]
+                raise ssl.SSLError(str(e))
+            except (httplib.BadStatusLine, socket.error):
+                if not self._connection_reused:
+                    raise
+
+                # Server has closed an idle keep-alive connection. Other idle
+                # connections to the same endpoint are most likely stale as
+                # well so drop them and retry on a fresh connection.
+                self.connection.close()
+                self.connection_pool.discard(key=self._connection_key)
+                self.connect()
+                continue
+
+            break
+
+        if raw:
+            # Body is streamed by the caller so the connection can't be
+            # returned to the pool
+            response = self.rawResponseCls(connection=self)
+        elif stream:
+            # Connection can only be released once the body has been consumed
+            # which can happen after other requests have been made
+            connection = self.connection
+            key = self._connection_key
+            released = []
+
+            def release():
+                if not released:
+                    released.append(True)
+                    self._release_connection(http_response=http_response,
+                                             connection=connection, key=key)
+
+            try:
+                response = self.streamResponseCls(response=http_response,
+                                                  connection=self,
+                                                  release=release)
+            except Exception:
+                release()
+                raise
+        else:
+            try:
+                response = self.responseCls(response=http_response,
+                                            connection=self)
+            finally:
+                self._release_connection(http_response=http_response)
+
+        return response
+
+    def _prepare_request(self, action, params=None, data=None, headers=None,
+                         method='GET'):
+        """
+        Run the request hooks and build the final request URL, body and
+        headers.
+
+        @return: C{tuple} of (url, data, headers)
+        """
         if params is None:
             params = {}
 
@@ -590,33 +1009,27 @@ class Connection(object):
         else:
             url = action
 
-        # Removed terrible hack...this a less-bad hack that doesn't execute a
-        # request twice, but it's still a hack.
-        self.connect()
-        try:
-            # @TODO: Should we just pass File object as body to request method
-            # instead of dealing with splitting and sending the file ourselves?
-            if raw:
-                self.connection.putrequest(method, url)
+        return url, data, headers
 
-                for key, value in list(headers.items()):
-                    self.connection.putheader(key, str(value))
+    def _release_connection(self, http_response, connection=None, key=None):
+        """
+        Return the current (or the provided) connection to the connection
+        pool if the response body has been fully read.
+        """
+        connection = connection or self.connection
+        key = key or self._connection_key
 
-                self.connection.endheaders()
-            else:
-                self.connection.request(method=method, url=url, body=data,
-                                        headers=headers)
-        except ssl.SSLError:
-            e = sys.exc_info()[1]
-            raise ssl.SSLError(str(e))
+        if self.connection_pool is None or key is None:
+            return
 
-        if raw:
-            response = self.rawResponseCls(connection=self)
-        else:
-            response = self.responseCls(response=self.connection.getresponse(),
-                                        connection=self)
+        is_closed = getattr(http_response, 'isclosed', None)
 
-        return response
+        if is_closed is not None and not is_closed():
+            # Unread data is still pending on the socket, it can't be re-used
+            connection.close()
+            return
+
+        self.connection_pool.release(key=key, connection=connection)
 
     def morph_action_hook(self, action):
         return self.request_path + action
@@ -25,6 +25,10 @@ from libcloud.common.base import JsonResponse
 from libcloud.common.types import MalformedResponseError
 
 
+# Number of items requested per page by paginated list calls
+DEFAULT_PAGE_SIZE = 500
+
+
 class CloudStackResponse(JsonResponse):
     pass
 
@@ -103,6 +107,39 @@ class CloudStackConnection(ConnectionUserAndKey, PollingConnection):
         result = result.object[command]
         return result
 
+    def _sync_request_all(self, command, key, page_size=DEFAULT_PAGE_SIZE,
+                          **kwargs):
+        """Perform a synchronous list call and follow the pagination
+           (page / pagesize parameters) until all the items have been
+           retrieved.
+
+           @param key: Name of the list in the response (e.g.
+                       'virtualmachine').
+           @type  key: C{str}
+
+           @param page_size: Number of items requested per page.
+           @type  page_size: C{int}
+
+           @rtype: C{list} of C{dict}"""
+        items = []
+        page = 1
+
+        while True:
+            result = self._sync_request(command, page=page,
+                                        pagesize=page_size, **kwargs)
+            page_items = result.get(key, [])
+            items.extend(page_items)
+
+            if len(page_items) < page_size:
+                break
+
+            if 'count' in result and len(items) >= int(result['count']):
+                break
+
+            page += 1
+
+        return items
+
 
 class CloudStackDriverMixIn(object):
     host = None
@@ -120,3 +157,6 @@ class CloudStackDriverMixIn(object):
 
     def _async_request(self, command, **kwargs):
         return self.connection._async_request(command, **kwargs)
+
+    def _sync_request_all(self, command, key, **kwargs):
+        return self.connection._sync_request_all(command, key, **kwargs)
@@ -0,0 +1,267 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Call the same method on many driver instances (e.g. one per region, tenant
+or account) concurrently.
+
+Drivers of any API (compute, storage, DNS, load balancer) which are
+returned by the C{get_driver} function of the C{providers} modules can be
+mixed. Example::
+
+    drivers = [get_driver(provider)(key, secret) for provider in regions]
+
+    for result in fan_out(drivers, 'list_nodes', timeout=30):
+        if result.success:
+            nodes.extend(result.result)
+        else:
+            failures.append((result.driver, result.error))
+"""
+
+from __future__ import with_statement
+
+import sys
+import time
+import threading
+
+from libcloud.utils.py3 import queue
+from libcloud.common.types import LibcloudError
+
+__all__ = [
+    'DriverTimeoutError',
+    'FanOutResult',
+    'fan_out',
+    'fan_out_all'
+]
+
+# Default maximum number of drivers which are called concurrently
+DEFAULT_WORKERS = 8
+
+
+class DriverTimeoutError(LibcloudError):
+    """
+    Exception reported for a driver call which didn't complete in time.
+    """
+
+    def __repr__(self):
+        return ('<DriverTimeoutError in ' + repr(self.driver) + ' ' +
+                repr(self.value) + '>')
+
+
+class FanOutResult(object):
+    """
+    Result of a call to a single driver.
+    """
+
+    def __init__(self, driver, method, result=None, error=None,
+                 elapsed=None):
+        """
+        @param driver: Driver instance which was called.
+        @type driver: L{BaseDriver}
+
+        @param method: Name of the method which was called.
+        @type method: C{str}
+
+        @param result: Value returned by the method.
+
+        @param error: Exception raised by the method (or a
+                      L{DriverTimeoutError}) if the call failed.
+        @type error: C{Exception}
+
+        @param elapsed: Number of seconds the call took.
+        @type elapsed: C{float}
+        """
+        self.driver = driver
+        self.method = method
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def __repr__(self):
+        return ('<FanOutResult: driver=%r, method=%s, success=%s, '
+                'elapsed=%.3f>' % (self.driver, self.method, self.success,
+                                   self.elapsed or 0))
+
+
+def fan_out(drivers, method, args=None, kwargs=None,
+            workers=DEFAULT_WORKERS, timeout=None):
+    """
+    Call a method on multiple drivers using a bounded pool of threads and
+    return a generator which yields a L{FanOutResult} for every driver as
+    soon as its call completes.
+
+    A failure of one driver doesn't affect the other calls, the exception is
+    reported in the result instead.
+
+    Threads can't be interrupted so a call which exceeds the timeout is
+    reported as failed with L{DriverTimeoutError} and abandoned: it keeps
+    running in the background, its result is discarded and a new worker
+    thread takes its place so the remaining drivers are not delayed.
+
+    @param drivers: Driver instances to call.
+    @type drivers: C{iterable} of L{BaseDriver}
+
+    @param method: Name of the driver method to call or a function which
+                   is called with the driver as the only argument.
+    @type method: C{str} or C{callable}
+
+    @param args: Positional arguments for the method.
+    @type args: C{tuple}
+
+    @param kwargs: Keyword arguments for the method.
+    @type kwargs: C{dict}
+
+    @param workers: Maximum number of drivers which are called
+                    concurrently.
+    @type workers: C{int}
+
+    @param timeout: Number of seconds after which a call to a single driver
+                    is reported as failed. Defaults to no timeout.
+    @type timeout: C{float}
+
+    @rtype: C{generator} of L{FanOutResult}
+    """
+    drivers = list(drivers)
+    args = args or ()
+    kwargs = kwargs or {}
+
+    if callable(method):
+        func = method
+        method_name = getattr(method, '__name__', repr(method))
+    else:
+        func = lambda driver: getattr(driver, method)(*args, **kwargs)
+        method_name = method
+
+    tasks = queue.Queue()
+    results = queue.Queue()
+    lock = threading.Lock()
+    started = {}
+    abandoned = set()
+    stopped = []
+
+    for index, driver in enumerate(drivers):
+        tasks.put((index, driver))
+
+    def worker():
+        while not stopped:
+            try:
+                index, driver = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            start = time.time()
+
+            with lock:
+                started[index] = start
+
+            try:
+                result = FanOutResult(driver=driver, method=method_name,
+                                      result=func(driver))
+            except Exception:
+                result = FanOutResult(driver=driver, method=method_name,
+                                      error=sys.exc_info()[1])
+
+            result.elapsed = time.time() - start
+
+            with lock:
+                if index in abandoned:
+                    # The call timed out and a new worker has replaced this
+                    # one
+                    return
+
+                del started[index]
+
+            results.put(result)
+
+    def start_worker():
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+
+    for _ in range(max(min(workers, len(drivers)), 1)):
+        start_worker()
+
+    pending = len(drivers)
+
+    try:
+        while pending:
+            wait = None
+
+            if timeout is not None:
+                with lock:
+                    start = min(started.values() or [time.time()])
+
+                wait = max(start + timeout - time.time(), 0)
+
+            try:
+                result = results.get(timeout=wait)
+            except queue.Empty:
+                now = time.time()
+                expired = []
+
+                with lock:
+                    for index, start in list(started.items()):
+                        if now - start >= timeout:
+                            del started[index]
+                            abandoned.add(index)
+                            expired.append((index, now - start))
+
+                for index, elapsed in expired:
+                    pending -= 1
+                    start_worker()
+
+                    driver = drivers[index]
+                    error = DriverTimeoutError(
+                        value='%s did not complete within %s seconds' %
+                        (method_name, timeout), driver=driver)
+                    yield FanOutResult(driver=driver, method=method_name,
+                                       error=error, elapsed=elapsed)
+
+                continue
+
+            pending -= 1
+            yield result
+    finally:
+        # Don't start calls for the remaining drivers if the generator is
+        # closed early
+        stopped.append(True)
+
+
+def fan_out_all(drivers, method, args=None, kwargs=None,
+                workers=DEFAULT_WORKERS, timeout=None):
+    """
+    Call a method on multiple drivers and wait for all the calls to
+    complete.
+
+    See L{fan_out} for a description of the arguments.
+
+    @return: A tuple of two lists: the L{FanOutResult}s of the calls which
+             succeeded and of the calls which failed. Both are in the same
+             order as C{drivers}.
+    @rtype: C{tuple}
+    """
+    drivers = list(drivers)
+    order = dict((id(driver), index) for index, driver in
+                 enumerate(drivers))
+    results = sorted(fan_out(drivers, method, args=args, kwargs=kwargs,
+                             workers=workers, timeout=timeout),
+                     key=lambda result: order[id(result.driver)])
+
+    return ([result for result in results if result.success],
+            [result for result in results if not result.success])
@@ -16,15 +16,26 @@
 """
 Common utilities for OpenStack
 """
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
 import sys
 import binascii
 import os
+import hashlib
 import datetime
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 from libcloud.utils.py3 import httplib
 from libcloud.utils.iso8601 import parse_date
 
 from libcloud.common.base import ConnectionUserAndKey, Response
+from libcloud.common.base import Connection, RequestStateAttribute
 from libcloud.compute.types import (LibcloudError, InvalidCredsError,
                                     MalformedResponseError)
 
@@ -55,6 +66,11 @@ __all__ = [
     'OpenStackServiceCatalog',
     'OpenStackDriverMixin',
 
+    'OpenStackAuthToken',
+    'OpenStackAuthTokenCache',
+    'MemoryAuthTokenCache',
+    'FileAuthTokenCache',
+
     'AUTH_TOKEN_EXPIRES_GRACE_SECONDS'
 ]
 
@@ -295,17 +311,266 @@ class OpenStackAuthConnection(ConnectionUserAndKey):
         if not self.auth_token_expires:
             return False
 
-        expires = self.auth_token_expires - \
-                datetime.timedelta(seconds=AUTH_TOKEN_EXPIRES_GRACE_SECONDS)
+        return not _is_token_expired(self.auth_token_expires)
+
+
+def _is_token_expired(expires):
+    """
+    Return True if a token which expires at the provided time has expired
+    or will expire in less than AUTH_TOKEN_EXPIRES_GRACE_SECONDS seconds.
+
+    @type expires: C{datetime.datetime}
+    @rtype: C{bool}
+    """
+    expires = expires - \
+            datetime.timedelta(seconds=AUTH_TOKEN_EXPIRES_GRACE_SECONDS)
+
+    time_tuple_expires = expires.utctimetuple()
+    time_tuple_now = datetime.datetime.utcnow().utctimetuple()
+
+    return time_tuple_now >= time_tuple_expires
+
+
+class OpenStackAuthToken(object):
+    """
+    Auth token, its expiration time and the service catalog which has been
+    returned by the identity service. Instances are stored in an
+    L{OpenStackAuthTokenCache}.
+    """
+
+    def __init__(self, auth_token, auth_token_expires, urls, auth_version,
+                 auth_user_info=None):
+        """
+        @param auth_token: Auth token.
+        @type auth_token: C{str}
+
+        @param auth_token_expires: Token expiration time.
+        @type auth_token_expires: C{datetime.datetime}
+
+        @param urls: Service catalog as returned by the identity service.
+        @type urls: C{dict} or C{list}
+
+        @param auth_version: Auth version used to obtain the token.
+        @type auth_version: C{str}
+
+        @param auth_user_info: User info returned by the identity service.
+        @type auth_user_info: C{dict}
+        """
+        self.auth_token = auth_token
+        self.auth_token_expires = auth_token_expires
+        self.urls = urls
+        self.auth_version = auth_version
+        self.auth_user_info = auth_user_info
+        self._service_catalog = None
+
+    @property
+    def service_catalog(self):
+        """
+        Parsed service catalog. It's only parsed once and shared by all the
+        connections which use this token.
+
+        @rtype: L{OpenStackServiceCatalog}
+        """
+        if self._service_catalog is None:
+            self._service_catalog = OpenStackServiceCatalog(
+                self.urls, ex_force_auth_version=self.auth_version)
+
+        return self._service_catalog
+
+    def is_valid(self):
+        """
+        Return True if the token hasn't expired yet (taking
+        AUTH_TOKEN_EXPIRES_GRACE_SECONDS into account).
+
+        @rtype: C{bool}
+        """
+        if not self.auth_token or not self.auth_token_expires:
+            return False
+
+        return not _is_token_expired(self.auth_token_expires)
+
+    def to_dict(self):
+        return {'auth_token': self.auth_token,
+                'auth_token_expires': self.auth_token_expires.isoformat(),
+                'urls': self.urls,
+                'auth_version': self.auth_version,
+                'auth_user_info': self.auth_user_info}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(auth_token=data['auth_token'],
+                   auth_token_expires=parse_date(data['auth_token_expires']),
+                   urls=data['urls'], auth_version=data['auth_version'],
+                   auth_user_info=data.get('auth_user_info'))
+
+
+class OpenStackAuthTokenCache(object):
+    """
+    Base class for auth token caches which allow auth tokens to be re-used
+    by multiple driver instances (and processes, depending on the store).
+
+    Keys are tuples of (auth_url, user_id, tenant_name, auth_version,
+    hash of the secret). Custom stores (e.g. memcached or redis) only need
+    to implement the get, put and clear methods.
+    """
+
+    def get(self, key):
+        """
+        Return a cached token or None if the key is not in the cache.
+
+        @type key: C{tuple}
+        @rtype: L{OpenStackAuthToken}
+        """
+        raise NotImplementedError('get not implemented for this cache')
+
+    def put(self, key, token):
+        """
+        Store a token in the cache.
+
+        @type key: C{tuple}
+        @type token: L{OpenStackAuthToken}
+        """
+        raise NotImplementedError('put not implemented for this cache')
+
+    def clear(self, key):
+        """
+        Remove a token from the cache (e.g. after it has been rejected by the
+        server).
+
+        @type key: C{tuple}
+        """
+        raise NotImplementedError('clear not implemented for this cache')
+
+
+class MemoryAuthTokenCache(OpenStackAuthTokenCache):
+    """
+    Auth token cache which stores tokens in memory of the current process.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._tokens.get(key, None)
+
+    def put(self, key, token):
+        with self._lock:
+            self._tokens[key] = token
+
+    def clear(self, key):
+        with self._lock:
+            self._tokens.pop(key, None)
+
 
-        time_tuple_expires = expires.utctimetuple()
-        time_tuple_now = datetime.datetime.utcnow().utctimetuple()
+class FileAuthTokenCache(OpenStackAuthTokenCache):
+    """
+    Auth token cache which stores tokens in a JSON file so they can be shared
+    by multiple processes. Access to the file is serialized using fcntl
+    locks.
+
+    Tokens are stored in clear text so the file is created readable only by
+    the current user.
+    """
 
-        # TODO: Subtract some reasonable grace time period
-        if time_tuple_now < time_tuple_expires:
-            return True
+    def __init__(self, path):
+        """
+        @param path: Path to the cache file.
+        @type path: C{str}
+        """
+        if fcntl is None:
+            raise LibcloudError('FileAuthTokenCache requires fcntl module')
+
+        self.path = path
+
+        # Parsed tokens are kept in memory so the service catalog is only
+        # parsed once if the file hasn't changed
+        self._tokens = {}
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, int('0600', 8))
+        return os.fdopen(fd, 'r+')
+
+    def _read(self, fp):
+        fp.seek(0)
+        data = fp.read()
+
+        if not data:
+            return {}
+
+        try:
+            return json.loads(data)
+        except ValueError:
+            # Corrupted cache file, it will be overwritten
+            return {}
+
+    def _write(self, fp, data):
+        fp.seek(0)
+        fp.truncate()
+        fp.write(json.dumps(data))
+        fp.flush()
+
+    def _serialize_key(self, key):
+        return json.dumps(list(key))
+
+    def get(self, key):
+        key = self._serialize_key(key)
+        fp = self._open()
+
+        try:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_SH)
+            data = self._read(fp).get(key, None)
+        finally:
+            fp.close()
+
+        if data is None:
+            return None
+
+        token = self._tokens.get(key, None)
+
+        if token is None or token.auth_token != data['auth_token']:
+            token = OpenStackAuthToken.from_dict(data)
+            self._tokens[key] = token
+
+        return token
+
+    def put(self, key, token):
+        key = self._serialize_key(key)
+        fp = self._open()
+
+        try:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            data = self._read(fp)
+
+            # Drop expired tokens so the file doesn't grow indefinitely
+            for k, v in list(data.items()):
+                if not OpenStackAuthToken.from_dict(v).is_valid():
+                    del data[k]
+
+            data[key] = token.to_dict()
+            self._write(fp, data)
+        finally:
+            fp.close()
+
+        self._tokens[key] = token
+
+    def clear(self, key):
+        key = self._serialize_key(key)
+        fp = self._open()
+
+        try:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            data = self._read(fp)
+
+            if key in data:
+                del data[key]
+                self._write(fp, data)
+        finally:
+            fp.close()
+
+        self._tokens.pop(key, None)
 
-        return False
 
 class OpenStackServiceCatalog(object):
     """
@@ -459,6 +724,11 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
     @param ex_force_service_region: Region to use when selecting an
     service.  If not specified, a provider specific default will be used.
     @type ex_force_service_region: C{string}
+
+    @param ex_auth_cache: Cache used to share auth tokens and service
+    catalogs between connections. Defaults to the auth_cache class
+    attribute (None, tokens are not shared).
+    @type ex_auth_cache: L{OpenStackAuthTokenCache}
     """
 
     auth_url = None
@@ -469,8 +739,16 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
     service_type = None
     service_name = None
     service_region = None
+    auth_cache = None
     _auth_version = None
 
+    # Endpoint is resolved from the service catalog on each request so it
+    # needs to be stored per-request (e.g. CDN vs storage endpoint)
+    host = RequestStateAttribute('host', Connection.host)
+    port = RequestStateAttribute('port', Connection.port)
+    secure = RequestStateAttribute('secure', Connection.secure)
+    request_path = RequestStateAttribute('request_path')
+
     def __init__(self, user_id, key, secure=True,
                  host=None, port=None, timeout=None,
                  ex_force_base_url=None,
@@ -480,7 +758,8 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
                  ex_tenant_name=None,
                  ex_force_service_type=None,
                  ex_force_service_name=None,
-                 ex_force_service_region=None):
+                 ex_force_service_region=None,
+                 ex_auth_cache=None):
 
         self._ex_force_base_url = ex_force_base_url
         self._ex_force_auth_url = ex_force_auth_url
@@ -491,6 +770,11 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
         self._ex_force_service_region = ex_force_service_region
 
         self._osa = None
+        self._auth_lock = threading.Lock()
+        self._ex_force_auth_token = ex_force_auth_token
+
+        if ex_auth_cache is not None:
+            self.auth_cache = ex_auth_cache
 
         if ex_force_auth_token:
             self.auth_token = ex_force_auth_token
@@ -547,7 +831,24 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
         return super(OpenStackBaseConnection, self).morph_action_hook(action)
 
     def request(self, **kwargs):
-        return super(OpenStackBaseConnection, self).request(**kwargs)
+        # Load the token (possibly from the auth cache) first so a revoked
+        # cached token is detected on the first request of a connection
+        self._populate_hosts_and_request_paths()
+        token = self.auth_token
+
+        try:
+            return super(OpenStackBaseConnection, self).request(**kwargs)
+        except InvalidCredsError:
+            if self._ex_force_auth_token or not token:
+                raise
+
+            # Token has been revoked or has expired earlier than advertised,
+            # authenticate again and retry the request once
+            with self._auth_lock:
+                if self.auth_token == token:
+                    self._invalidate_auth_token()
+
+            return super(OpenStackBaseConnection, self).request(**kwargs)
 
     def _populate_hosts_and_request_paths(self):
         """
@@ -556,35 +857,94 @@ class OpenStackBaseConnection(ConnectionUserAndKey):
         """
 
         if not self.auth_token:
-            aurl = self.auth_url
+            # Only authenticate once if multiple threads are sharing this
+            # connection
+            with self._auth_lock:
+                if not self.auth_token:
+                    self._authenticate()
+
+        # Set up connection info
+        url = self._ex_force_base_url or self.get_endpoint()
+        (self.host, self.port, self.secure, self.request_path) = \
+                self._tuple_from_url(url)
 
-            if self._ex_force_auth_url is not None:
-                aurl = self._ex_force_auth_url
+    def _get_auth_url(self):
+        aurl = self.auth_url
 
-            if aurl == None:
-                raise LibcloudError('OpenStack instance must ' +
-                                    'have auth_url set')
+        if self._ex_force_auth_url is not None:
+            aurl = self._ex_force_auth_url
 
-            osa = OpenStackAuthConnection(self, aurl, self._auth_version,
-                                          self.user_id, self.key,
-                                          tenant_name=self._ex_tenant_name,
-                                          timeout=self.timeout)
+        if aurl == None:
+            raise LibcloudError('OpenStack instance must ' +
+                                'have auth_url set')
 
-            # may throw InvalidCreds, etc
-            osa.authenticate()
+        return aurl
 
-            self.auth_token = osa.auth_token
-            self.auth_token_expires = osa.auth_token_expires
-            self.auth_user_info = osa.auth_user_info
+    def _get_auth_cache_key(self):
+        """
+        Return the key under which the token is stored in the auth cache.
 
-            # pull out and parse the service catalog
-            self.service_catalog = OpenStackServiceCatalog(osa.urls,
-                    ex_force_auth_version=self._auth_version)
+        A hash of the secret is part of the key so a token is never handed
+        out to a connection with different credentials.
 
-        # Set up connection info
-        url = self._ex_force_base_url or self.get_endpoint()
-        (self.host, self.port, self.secure, self.request_path) = \
-                self._tuple_from_url(url)
+        @rtype: C{tuple}
+        """
+        key_hash = hashlib.sha256(str(self.key).encode('utf-8')).hexdigest()
+        return (self._get_auth_url(), self.user_id, self._ex_tenant_name,
+                self._auth_version, key_hash)
+
+    def _invalidate_auth_token(self):
+        """
+        Discard the current token (and remove it from the auth cache) so a
+        new one is obtained on the next request.
+        """
+        if self.auth_cache is not None:
+            self.auth_cache.clear(self._get_auth_cache_key())
+
+        self.auth_token = None
+
+    def _authenticate(self):
+        aurl = self._get_auth_url()
+        cache = self.auth_cache
+
+        if cache is not None:
+            cache_key = self._get_auth_cache_key()
+            token = cache.get(cache_key)
+
+            if token is not None and token.is_valid():
+                self._set_auth_token(token)
+                return
+
+        osa = OpenStackAuthConnection(self, aurl, self._auth_version,
+                                      self.user_id, self.key,
+                                      tenant_name=self._ex_tenant_name,
+                                      timeout=self.timeout)
+
+        # may throw InvalidCreds, etc
+        osa.authenticate()
+
+        token = OpenStackAuthToken(auth_token=osa.auth_token,
+                                   auth_token_expires=osa.auth_token_expires,
+                                   urls=osa.urls,
+                                   auth_version=self._auth_version,
+                                   auth_user_info=osa.auth_user_info)
+
+        # Tokens without an expiration time (auth 1.0) are not cached
+        if cache is not None and token.auth_token_expires:
+            cache.put(cache_key, token)
+
+        self._set_auth_token(token)
+
+    def _set_auth_token(self, token):
+        # pull out the (parsed) service catalog
+        self.service_catalog = token.service_catalog
+
+        self.auth_token_expires = token.auth_token_expires
+        self.auth_user_info = token.auth_user_info
+
+        # Token is set last so other threads never see a token without a
+        # service catalog
+        self.auth_token = token.auth_token
 
     def _add_cache_busting_to_params(self, params):
         cache_busting_number = binascii.hexlify(os.urandom(8)).decode('ascii')
@@ -607,6 +967,7 @@ class OpenStackDriverMixin(object):
         self._ex_force_service_name = kwargs.get('ex_force_service_name', None)
         self._ex_force_service_region = kwargs.get('ex_force_service_region',
                                                    None)
+        self._ex_auth_cache = kwargs.get('ex_auth_cache', None)
 
     def openstack_connection_kwargs(self):
         """
@@ -630,4 +991,6 @@ class OpenStackDriverMixin(object):
             rv['ex_force_service_name'] = self._ex_force_service_name
         if self._ex_force_service_region:
             rv['ex_force_service_region'] = self._ex_force_service_region
+        if self._ex_auth_cache is not None:
+            rv['ex_auth_cache'] = self._ex_auth_cache
         return rv
@@ -19,13 +19,17 @@ Provides base classes for working with drivers
 
 import sys
 import time
+import random
 import hashlib
 import os
 import socket
 import struct
 import binascii
+import threading
 
 from libcloud.utils.py3 import b
+from libcloud.utils.py3 import queue
+from libcloud.utils.concurrency import parallel_map
 
 import libcloud.compute.ssh
 from libcloud.pricing import get_size_price
@@ -48,6 +52,18 @@ NODE_ONLINE_WAIT_TIMEOUT = 10 * 60
 # script.
 SSH_CONNECT_TIMEOUT = 5 * 60
 
+# Default number of nodes which are created or deployed concurrently by
+# deploy_nodes
+DEPLOY_WORKERS = 10
+
+# Maximum number of seconds to wait between two polls of the state of nodes
+# which are starting
+NODE_WAIT_MAX_PERIOD = 30
+
+# Maximum number of nodes which drivers look up one by one while waiting for
+# them to start. The state of more nodes is retrieved by listing all nodes.
+NODE_LOOKUP_MAX_NODES = 10
+
 
 __all__ = [
     "Node",
@@ -752,6 +768,169 @@ class NodeDriver(BaseDriver):
                                    'public_ips', other option is 'private_ips'.
         :type ssh_interface: ``str``
         """
+        self._check_deploy_arguments(kwargs)
+
+        node = self.create_node(**kwargs)
+        password = self._get_deploy_password(node, kwargs)
+
+        ssh_interface = kwargs.get('ssh_interface', 'public_ips')
+
+        # Wait until node is up and running and has IP assigned
+        try:
+            node, ip_addresses = self.wait_until_running(
+                nodes=[node],
+                wait_period=3,
+                timeout=kwargs.get('timeout', NODE_ONLINE_WAIT_TIMEOUT),
+                ssh_interface=ssh_interface)[0]
+        except Exception:
+            e = sys.exc_info()[1]
+            raise DeploymentError(node=node, original_exception=e, driver=self)
+
+        return self._deploy_to_node(node, ip_addresses, password, kwargs)
+
+    def deploy_nodes(self, nodes, workers=DEPLOY_WORKERS, **kwargs):
+        """
+        Create multiple nodes and start a deployment on each of them.
+
+        Nodes are created concurrently and the deployment of a node starts
+        as soon as it is running, while the other nodes are still booting.
+        At most ``workers`` nodes are created or deployed at the same time.
+        A failure of one node doesn't affect the other nodes.
+
+        >>> from libcloud.compute.drivers.dummy import DummyNodeDriver
+        >>> from libcloud.compute.deployment import ScriptDeployment
+        >>> driver = DummyNodeDriver(0)
+        >>> script = ScriptDeployment("yum -y install emacs strace tcpdump")
+        >>> names = [{'name': 'web%d' % (i)} for i in range(3)]
+        >>> def d():
+        ...     try:
+        ...         results = driver.deploy_nodes(names, deploy=script)
+        ...     except NotImplementedError:
+        ...         print ("not implemented for dummy driver")
+        >>> d()
+        not implemented for dummy driver
+
+        :param nodes: Arguments which are specific to each node (e.g. the
+                      name), one dictionary per node. They are merged with
+                      the other keyword arguments.
+        :type nodes: ``list`` of ``dict``
+
+        :param workers: Maximum number of nodes which are created or
+                        deployed concurrently (default is 10).
+        :type workers: ``int``
+
+        The other keyword arguments are the arguments of
+        :meth:`deploy_node`.
+
+        :return: ``[(Node, result)]`` list of tuples in the same order as
+                 ``nodes``. The result is ``True`` if the deployment
+                 succeeded, otherwise a :class:`DeploymentError`. The node
+                 is ``None`` if it couldn't be created.
+        :rtype: ``list`` of ``tuple``
+        """
+        self._check_deploy_arguments(kwargs)
+
+        node_kwargs = []
+
+        for extra_kwargs in nodes:
+            merged_kwargs = kwargs.copy()
+            merged_kwargs.update(extra_kwargs)
+            node_kwargs.append(merged_kwargs)
+
+        results = [None] * len(node_kwargs)
+        created = {}
+
+        def create(index):
+            try:
+                return self.create_node(**node_kwargs[index])
+            except Exception:
+                e = sys.exc_info()[1]
+                return DeploymentError(node=None, original_exception=e,
+                                       driver=self)
+
+        for index, node in parallel_map(create, range(len(node_kwargs)),
+                                        workers=workers):
+            if isinstance(node, DeploymentError):
+                results[index] = (None, node)
+                continue
+
+            password = self._get_deploy_password(node, node_kwargs[index])
+            created[node.uuid] = (index, node, password)
+
+        # The nodes are waited for in a separate thread so the wait isn't
+        # suspended (and doesn't time out) while all the workers are busy
+        # with deployments
+        running = queue.Queue()
+        wait_errors = []
+
+        def wait():
+            try:
+                for item in self.iterate_running_nodes(
+                        nodes=[node for (_, node, _) in created.values()],
+                        wait_period=3,
+                        timeout=kwargs.get('timeout',
+                                           NODE_ONLINE_WAIT_TIMEOUT),
+                        ssh_interface=kwargs.get('ssh_interface',
+                                                 'public_ips')):
+                    running.put(item)
+            except Exception:
+                # Nodes which are not running before the timeout expires
+                # are reported as failed below
+                wait_errors.append(sys.exc_info()[1])
+
+            running.put(None)
+
+        def running_nodes():
+            while True:
+                item = running.get()
+
+                if item is None:
+                    return
+
+                yield item
+
+        thread = threading.Thread(target=wait)
+        thread.daemon = True
+        thread.start()
+
+        def deploy(item):
+            node, ip_addresses = item
+            index, _, password = created[node.uuid]
+
+            try:
+                self._deploy_to_node(node, ip_addresses, password,
+                                     node_kwargs[index])
+            except DeploymentError:
+                return sys.exc_info()[1]
+
+            return True
+
+        for (node, _), result in parallel_map(deploy, running_nodes(),
+                                              workers=workers):
+            results[created[node.uuid][0]] = (node, result)
+
+        thread.join()
+
+        for index, node, _ in created.values():
+            if results[index] is None:
+                if wait_errors:
+                    exception = wait_errors[0]
+                else:
+                    exception = LibcloudError(value='Node is not running',
+                                              driver=self)
+
+                error = DeploymentError(node=node,
+                                        original_exception=exception,
+                                        driver=self)
+                results[index] = (node, error)
+
+        return results
+
+    def _check_deploy_arguments(self, kwargs):
+        """
+        Raise if a node can't be deployed with the given deploy_node
+        arguments.
+        """
         if not libcloud.compute.ssh.have_paramiko:
             raise RuntimeError('paramiko is not installed. You can install ' +
                                'it using pip: pip install paramiko')
@@ -774,29 +953,26 @@ class NodeDriver(BaseDriver):
             raise NotImplementedError(
                 'deploy_node not implemented for this driver')
 
-        node = self.create_node(**kwargs)
-        max_tries = kwargs.get('max_tries', 3)
-
-        password = None
+    def _get_deploy_password(self, node, kwargs):
+        """
+        Return the password which is used to SSH into a newly created node.
+        """
         if 'auth' in kwargs:
             if isinstance(kwargs['auth'], NodeAuthPassword):
-                password = kwargs['auth'].password
+                return kwargs['auth'].password
         elif 'password' in node.extra:
-            password = node.extra['password']
+            return node.extra['password']
 
-        ssh_interface = kwargs.get('ssh_interface', 'public_ips')
+        return None
 
-        # Wait until node is up and running and has IP assigned
-        try:
-            node, ip_addresses = self.wait_until_running(
-                nodes=[node],
-                wait_period=3,
-                timeout=kwargs.get('timeout', NODE_ONLINE_WAIT_TIMEOUT),
-                ssh_interface=ssh_interface)[0]
-        except Exception:
-            e = sys.exc_info()[1]
-            raise DeploymentError(node=node, original_exception=e, driver=self)
+    def _deploy_to_node(self, node, ip_addresses, password, kwargs):
+        """
+        Connect to a running node and run the deployment task.
 
+        :return: ``Node`` Node instance on success, otherwise
+                 :class:`DeploymentError` is raised.
+        """
+        max_tries = kwargs.get('max_tries', 3)
         ssh_username = kwargs.get('ssh_username', 'root')
         ssh_alternate_usernames = kwargs.get('ssh_alternate_usernames', [])
         ssh_port = kwargs.get('ssh_port', 22)
@@ -937,7 +1113,8 @@ class NodeDriver(BaseDriver):
                                        force_ipv4=force_ipv4)
 
     def wait_until_running(self, nodes, wait_period=3, timeout=600,
-                           ssh_interface='public_ips', force_ipv4=True):
+                           ssh_interface='public_ips', force_ipv4=True,
+                           max_wait_period=NODE_WAIT_MAX_PERIOD, backoff=1.5):
         """
         Block until the given nodes are fully booted and have an IP address
         assigned.
@@ -945,8 +1122,9 @@ class NodeDriver(BaseDriver):
         :param nodes: list of node instances.
         :type nodes: ``List`` of :class:`Node`
 
-        :param wait_period: How many seconds to between each loop
-                                 iteration (default is 3)
+        :param wait_period: How many seconds to wait before polling the
+                            state of the nodes again (default is 3). The
+                            period grows by ``backoff`` after every poll.
         :type wait_period: ``int``
 
         :param timeout: How many seconds to wait before timing out
@@ -961,10 +1139,53 @@ class NodeDriver(BaseDriver):
         :param force_ipv4: Ignore ipv6 IP addresses (default is True).
         :type force_ipv4: ``bool``
 
+        :param max_wait_period: Maximum number of seconds between two polls
+                                (default is 30).
+        :type max_wait_period: ``int``
+
+        :param backoff: Multiplier applied to the wait period after every
+                        poll (default is 1.5).
+        :type backoff: ``float``
+
         :return: ``[(Node, ip_addresses)]`` list of tuple of Node instance and
                  list of ip_address on success.
         :rtype: ``list`` of ``tuple``
         """
+        order = dict([(node.uuid, index) for (index, node) in
+                      enumerate(nodes)])
+        result = list(self.iterate_running_nodes(
+            nodes=nodes, wait_period=wait_period, timeout=timeout,
+            ssh_interface=ssh_interface, force_ipv4=force_ipv4,
+            max_wait_period=max_wait_period, backoff=backoff))
+
+        return sorted(result, key=lambda item: order[item[0].uuid])
+
+    def iterate_running_nodes(self, nodes, wait_period=3, timeout=600,
+                              ssh_interface='public_ips', force_ipv4=True,
+                              max_wait_period=NODE_WAIT_MAX_PERIOD,
+                              backoff=1.5, jitter=0.1):
+        """
+        Return a generator which yields the given nodes as soon as they are
+        fully booted and have an IP address assigned, so work (e.g. a
+        deployment) can start on the first nodes while the other nodes are
+        still booting.
+
+        Only the state of the nodes which are not running yet is polled and
+        drivers which support it look up those nodes directly instead of
+        listing all the nodes.
+
+        See :meth:`wait_until_running` for a description of the arguments.
+
+        :param jitter: Fraction of the wait period by which every wait is
+                       randomly shortened or extended so many concurrent
+                       waiters don't poll at the same time (default is 0.1).
+        :type jitter: ``float``
+
+        :return: Generator of ``(Node, ip_addresses)`` tuples. If the
+                 timeout expires before all the nodes are running,
+                 :class:`LibcloudError` is raised.
+        :rtype: ``generator`` of ``tuple``
+        """
         def is_supported(address):
             """Return True for supported address"""
             if force_ipv4 and not is_valid_ip_address(address=address,
@@ -983,30 +1204,65 @@ class NodeDriver(BaseDriver):
             raise ValueError('ssh_interface argument must either be' +
                              'public_ips or private_ips')
 
-        uuids = set([n.uuid for n in nodes])
+        pending = dict([(n.uuid, n) for n in nodes])
+        period = wait_period
+
         while time.time() < end:
-            nodes = self.list_nodes()
-            nodes = list([n for n in nodes if n.uuid in uuids])
-
-            if len(nodes) > len(uuids):
-                found_uuids = [n.uuid for n in nodes]
-                msg = ('Unable to match specified uuids ' +
-                       '(%s) with existing nodes. Found ' % (uuids) +
-                       'multiple nodes with same uuid: (%s)' % (found_uuids))
-                raise LibcloudError(value=msg, driver=self)
-
-            running_nodes = [n for n in nodes if n.state == NodeState.RUNNING]
-            addresses = [filter_addresses(getattr(n, ssh_interface)) for n in
-                         running_nodes]
-            if len(running_nodes) == len(uuids) == len(addresses):
-                return list(zip(running_nodes, addresses))
-            else:
-                time.sleep(wait_period)
-                continue
+            found = {}
+
+            for node in self._get_nodes(list(pending.values())):
+                if node.uuid not in pending:
+                    continue
+
+                if node.uuid in found:
+                    msg = ('Unable to match specified uuids ' +
+                           '(%s) with existing nodes. Found ' %
+                           (set(pending)) +
+                           'multiple nodes with same uuid: (%s)' %
+                           (node.uuid))
+                    raise LibcloudError(value=msg, driver=self)
+
+                found[node.uuid] = node
+
+            running = [found[n.uuid] for n in nodes if n.uuid in found and
+                       found[n.uuid].state == NodeState.RUNNING]
+
+            for node in running:
+                addresses = filter_addresses(getattr(node, ssh_interface))
+
+                if addresses:
+                    del pending[node.uuid]
+                    # Nodes which are started together tend to become
+                    # ready together, so poll quickly again
+                    period = wait_period
+                    yield node, addresses
+
+            if not pending:
+                return
+
+            delay = period * (1 + random.uniform(-jitter, jitter))
+            time.sleep(max(min(delay, end - time.time()), 0))
+            period = min(period * backoff, max(max_wait_period, wait_period))
 
         raise LibcloudError(value='Timed out after %s seconds' % (timeout),
                             driver=self)
 
+    def _get_nodes(self, nodes):
+        """
+        Return the current state of the given nodes. Nodes which don't exist
+        (yet) are omitted.
+
+        Drivers which can look up specific nodes override this method so
+        waiting for a few nodes doesn't require listing all the nodes.
+
+        :param nodes: list of node instances.
+        :type nodes: ``list`` of :class:`Node`
+
+        :rtype: ``list`` of :class:`Node`
+        """
+        uuids = set([node.uuid for node in nodes])
+        return [node for node in self.list_nodes() if node.uuid in uuids]
+
     def _ssh_client_connect(self, ssh_client, wait_period=1.5, timeout=300):
         """
         Try to connect to the remote SSH server. If a connection times out or
@@ -20,9 +20,13 @@ Provides generic deployment steps for machines post boot.
 from __future__ import with_statement
 
 import os
+import sys
+import time
 import binascii
+import threading
 
 from libcloud.utils.py3 import basestring, PY3
+from libcloud.utils.py3 import queue
 
 
 class Deployment(object):
@@ -104,11 +108,10 @@ class FileDeployment(Deployment):
         """
         perms = int(oct(os.stat(self.source).st_mode)[4:], 8)
 
+        # The file is streamed so large files are not loaded into memory
         with open(self.source, 'rb') as fp:
-            content = fp.read()
+            client.putfo(path=self.target, chmod=perms, fo=fp)
 
-        client.put(path=self.target, chmod=perms,
-                   contents=content)
         return node
 
 
@@ -198,34 +201,182 @@ class ScriptFileDeployment(ScriptDeployment):
                                                delete=delete)
 
 
+class DeploymentStepResult(object):
+    """
+    Outcome of a single step of a L{MultiStepDeployment}.
+    """
+
+    def __init__(self, step):
+        """
+        @type step: L{Deployment}
+        @keyword step: The step which was run.
+        """
+        self.step = step
+        self.elapsed = None
+        self.stdout = None
+        self.stderr = None
+        self.exit_status = None
+        self.error = None
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def __repr__(self):
+        return ('<DeploymentStepResult: step=%r, success=%s, elapsed=%s>' %
+                (self.step, self.success, self.elapsed))
+
+
 class MultiStepDeployment(Deployment):
     """
     Runs a chain of Deployment steps.
+
+    By default the steps are run one after another. If more than one worker
+    is used, the steps form a graph instead: a step starts as soon as all
+    the steps it depends on have completed, so independent uploads and
+    scripts run concurrently, each over its own channel of the same SSH
+    connection.
     """
-    def __init__(self, add=None):
+    def __init__(self, add=None, workers=1):
         """
         @type add: C{list}
         @keyword add: Deployment steps to add.
+
+        @type workers: C{int}
+        @keyword workers: Maximum number of steps which run concurrently.
         """
         self.steps = []
+        self.dependencies = {}
+        self.workers = workers
+
+        # L{DeploymentStepResult} of each step of the last run, in the same
+        # order as the steps
+        self.results = []
+
         self.add(add)
 
-    def add(self, add):
+    def add(self, add, depends_on=None):
         """Add a deployment to this chain.
 
         @type add: Single L{Deployment} or a C{list} of L{Deployment}
         @keyword add: Adds this deployment to the others already in this object.
+
+        @type depends_on: Single L{Deployment} or a C{list} of L{Deployment}
+        @keyword depends_on: Steps which must complete before the added
+                             steps start when steps run concurrently. They
+                             must already have been added.
         """
-        if add is not None:
-            add = add if isinstance(add, (list, tuple)) else [add]
-            self.steps.extend(add)
+        if add is None:
+            return
+
+        add = add if isinstance(add, (list, tuple)) else [add]
+
+        if depends_on is None:
+            depends_on = []
+        elif not isinstance(depends_on, (list, tuple)):
+            depends_on = [depends_on]
+
+        for step in depends_on:
+            if step not in self.steps:
+                raise ValueError('Dependency %r must be added before the '
+                                 'steps which depend on it' % (step))
+
+        for step in add:
+            self.dependencies[id(step)] = list(depends_on)
+
+        self.steps.extend(add)
 
     def run(self, node, client):
         """
         Run each deployment that has been added.
 
+        If a step fails, no new steps are started and the error is raised
+        once the running steps have completed.
+
         See also L{Deployment.run}
         """
-        for s in self.steps:
-            node = s.run(node, client)
-        return node
+        self.results = [DeploymentStepResult(step) for step in self.steps]
+
+        if self.workers <= 1:
+            for index, step in enumerate(self.steps):
+                node = self._run_step(index, node, client)
+            return node
+
+        return self._run_concurrently(node, client)
+
+    def _run_step(self, index, node, client):
+        step = self.steps[index]
+        result = self.results[index]
+        start = time.time()
+
+        try:
+            return step.run(node, client)
+        except Exception:
+            result.error = sys.exc_info()[1]
+            raise
+        finally:
+            result.elapsed = time.time() - start
+            result.stdout = getattr(step, 'stdout', None)
+            result.stderr = getattr(step, 'stderr', None)
+            result.exit_status = getattr(step, 'exit_status', None)
+
+    def _run_concurrently(self, node, client):
+        """
+        Run the steps as a dependency graph using up to C{self.workers}
+        threads.
+
+        Every step is passed the node given to L{run}. The node returned by
+        the last step is returned.
+        """
+        indexes = dict([(id(step), index) for (index, step) in
+                        enumerate(self.steps)])
+        dependencies = [[indexes[id(dependency)] for dependency in
+                         self.dependencies.get(id(step), [])]
+                        for step in self.steps]
+
+        finished = queue.Queue()
+        nodes = {}
+        started = set()
+        completed = set()
+        running = 0
+        error = None
+
+        def worker(index):
+            try:
+                nodes[index] = self._run_step(index, node, client)
+            except Exception:
+                finished.put((index, sys.exc_info()[1]))
+            else:
+                finished.put((index, None))
+
+        while True:
+            for index in range(len(self.steps)):
+                if error is not None or running >= self.workers:
+                    break
+
+                if index in started or \
+                   not set(dependencies[index]).issubset(completed):
+                    continue
+
+                started.add(index)
+                running += 1
+
+                thread = threading.Thread(target=worker, args=(index,))
+                thread.daemon = True
+                thread.start()
+
+            if not running:
+                break
+
+            index, step_error = finished.get()
+            running -= 1
+
+            if step_error is None:
+                completed.add(index)
+            elif error is None:
+                error = step_error
+
+        if error is not None:
+            raise error
+
+        return nodes.get(len(self.steps) - 1, node)
@@ -226,26 +226,65 @@ class CloudStackNodeDriver(CloudStackDriverMixIn, NodeDriver):
             locations.append(NodeLocation(loc['id'], loc['name'], 'AU', self))
         return locations
 
-    def list_nodes(self):
+    def list_nodes(self, ex_fetch_forwarding_rules=True):
         """
         @inherits: L{NodeDriver.list_nodes}
+
+        @param ex_fetch_forwarding_rules: Populate the ip_forwarding_rules
+                                          and port_forwarding_rules extra
+                                          attributes. Set to False if only
+                                          node state and IPs are needed.
+        @type  ex_fetch_forwarding_rules: C{bool}
+
         @rtype: C{list} of L{CloudStackNode}
         """
-        vms = self._sync_request('listVirtualMachines')
-        addrs = self._sync_request('listPublicIpAddresses')
+        vms = self._sync_request_all('listVirtualMachines', 'virtualmachine')
+        addrs = self._sync_request_all('listPublicIpAddresses',
+                                       'publicipaddress')
 
         public_ips_map = {}
-        for addr in addrs.get('publicipaddress', []):
+        addresses_map = {}
+        for addr in addrs:
+            address = CloudStackAddress(addr['id'], addr['ipaddress'], self)
+            addresses_map[addr['id']] = address
+
             if 'virtualmachineid' not in addr:
                 continue
             vm_id = addr['virtualmachineid']
             if vm_id not in public_ips_map:
                 public_ips_map[vm_id] = {}
-            public_ips_map[vm_id][addr['ipaddress']] = addr['id']
+            public_ips_map[vm_id][addr['ipaddress']] = address
+
+        # Each rule listing is retrieved once and joined with the nodes
+        # using an index keyed on the virtual machine id
+        ip_rules_map = {}
+        port_rules_map = {}
+
+        if ex_fetch_forwarding_rules and public_ips_map:
+            # IP forwarding (static NAT) rules require an address which is
+            # associated with a virtual machine
+            for rule in self._sync_request_all('listIpForwardingRules',
+                                               'ipforwardingrule'):
+                vm_id = rule['virtualmachineid']
+                ip_rules_map.setdefault(vm_id, []).append(rule)
+
+        if ex_fetch_forwarding_rules and addrs:
+            for rule in self._sync_request_all('listPortForwardingRules',
+                                               'portforwardingrule'):
+                vm_id = rule['virtualmachineid']
+                port_rules_map.setdefault(vm_id, []).append(rule)
+
+        def get_address(rule):
+            address = addresses_map.get(rule.get('ipaddressid'))
+
+            if address is None:
+                address = CloudStackAddress(rule.get('ipaddressid'),
+                                            rule.get('ipaddress'), self)
+            return address
 
         nodes = []
 
-        for vm in vms.get('virtualmachine', []):
+        for vm in vms:
             state = self.NODE_STATE_MAP[vm['state']]
 
             public_ips = []
@@ -280,36 +319,31 @@ class CloudStackNodeDriver(CloudStackDriverMixIn, NodeDriver):
                        }
             )
 
-            addresses = public_ips_map.get(vm['id'], {}).items()
-            addresses = [CloudStackAddress(node, v, k) for k, v in addresses]
+            addresses = list(public_ips_map.get(vm['id'], {}).values())
             node.extra['ip_addresses'] = addresses
 
+            if not ex_fetch_forwarding_rules:
+                nodes.append(node)
+                continue
+
             rules = []
-            for addr in addresses:
-                result = self._sync_request('listIpForwardingRules')
-                for r in result.get('ipforwardingrule', []):
-                    if r['virtualmachineid'] == node.id:
-                        rule = CloudStackIPForwardingRule(node, r['id'],
-                                                          addr,
-                                                          r['protocol']
-                                                          .upper(),
-                                                          r['startport'],
-                                                          r['endport'])
-                        rules.append(rule)
+            for r in ip_rules_map.get(vm['id'], []):
+                rule = CloudStackIPForwardingRule(node, r['id'],
+                                                  get_address(r),
+                                                  r['protocol'].upper(),
+                                                  r['startport'],
+                                                  r['endport'])
+                rules.append(rule)
             node.extra['ip_forwarding_rules'] = rules
 
             rules = []
-            for addr in addrs:
-                result = self._sync_request('listPortForwardingRules')
-                for r in result.get('portforwardingrule', []):
-                    if r['virtualmachineid'] == node.id:
-                        rule = CloudStackPortForwardingRule(node, r['id'],
-                                                            addr,
-                                                            r['protocol']
-                                                            .upper(),
-                                                            r['publicport'],
-                                                            r['privateport'])
-                        rules.append(rule)
+            for r in port_rules_map.get(vm['id'], []):
+                rule = CloudStackPortForwardingRule(node, r['id'],
+                                                    get_address(r),
+                                                    r['protocol'].upper(),
+                                                    r['publicport'],
+                                                    r['privateport'])
+                rules.append(rule)
             node.extra['port_forwarding_rules'] = rules
 
             nodes.append(node)
@@ -649,11 +683,12 @@ class CloudStackNodeDriver(CloudStackDriverMixIn, NodeDriver):
         if result == {}:
             pass
         else:
-            nodes = self.list_nodes()
+            nodes = self.list_nodes(ex_fetch_forwarding_rules=False)
+            public_ips = self.ex_list_public_ips()
             for rule in result['portforwardingrule']:
                 node = [n for n in nodes
                         if n.id == rule['virtualmachineid']]
-                addr = [a for a in self.ex_list_public_ips()
+                addr = [a for a in public_ips
                         if a.address == rule['ipaddress']]
                 rules.append(CloudStackPortForwardingRule
                              (node[0],
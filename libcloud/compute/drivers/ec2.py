@@ -618,10 +618,13 @@ class BaseEC2NodeDriver(NodeDriver):
         params = {'Action': 'DescribeInstances'}
         if ex_node_ids:
             params.update(self._pathlist('InstanceId', ex_node_ids))
-        elem = self.connection.request(self.path, params=params).object
+        # Reservations are parsed one by one while the response is being
+        # read so the whole document is never held in memory
+        response = self.connection.request(self.path, params=params,
+                                           stream=True)
         nodes = []
-        for rs in findall(element=elem, xpath='reservationSet/item',
-                          namespace=NAMESPACE):
+        for rs in response.iterparse(xpath='reservationSet/item',
+                                     namespace=NAMESPACE):
             groups = [g.findtext('')
                       for g in findall(element=rs,
                                        xpath='groupSet/item/groupId',
@@ -634,6 +637,18 @@ class BaseEC2NodeDriver(NodeDriver):
             node.public_ips.extend(ips)
         return nodes
 
+    def _get_nodes(self, nodes):
+        try:
+            return self.list_nodes(ex_node_ids=[node.id for node in nodes])
+        except Exception:
+            e = sys.exc_info()[1]
+
+            # New instances are not immediately visible to DescribeInstances
+            if 'InvalidInstanceID.NotFound' in str(e):
+                return []
+
+            raise e
+
     def list_sizes(self, location=None):
         available_types = REGION_DETAILS[self.region_name]['instance_types']
         sizes = []
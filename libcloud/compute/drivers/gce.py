@@ -23,17 +23,22 @@ import sys
 import os
 import getpass
 
+from libcloud.utils.py3 import httplib
 from libcloud.common.google import GoogleResponse
 from libcloud.common.google import GoogleBaseConnection
 
 from libcloud.compute.base import Node, NodeDriver, NodeImage, NodeLocation
 from libcloud.compute.base import NodeSize, StorageVolume, UuidMixin
+from libcloud.compute.base import NODE_LOOKUP_MAX_NODES
 from libcloud.compute.providers import Provider
 from libcloud.compute.types import NodeState, LibcloudError
 
 API_VERSION = 'v1beta15'
 DEFAULT_TASK_COMPLETION_TIMEOUT = 180
 
+# Number of seconds for which cached zone and network information is valid
+CACHE_TTL = 3600
+
 
 def timestamp_to_datetime(timestamp):
     """
@@ -82,10 +87,18 @@ class ResourceExistsError(GCEKnownError):
     pass
 
 
-class GCEResponse(GoogleResponse):
+class ResourceNotFoundError(GCEKnownError):
     pass
 
 
+class GCEResponse(GoogleResponse):
+    def parse_error(self):
+        if self.status == httplib.NOT_FOUND:
+            raise ResourceNotFoundError(self.body)
+
+        return super(GCEResponse, self).parse_error()
+
+
 class GCEConnection(GoogleBaseConnection):
     """Connection class for the GCE driver."""
     host = 'www.googleapis.com'
@@ -353,13 +366,19 @@ class GCENodeDriver(NodeDriver):
                              '"project" keyword.')
         super(GCENodeDriver, self).__init__(user_id, key, **kwargs)
 
-        # Cache Zone information to reduce API calls and increase speed
+        # Cache Zone, Network and Size (machine type) information to reduce
+        # API calls and increase speed. Converters resolve references from
+        # the cache so listing resources doesn't result in an additional
+        # request per resource.
         self.base_path = '/compute/%s/projects/%s' % (API_VERSION,
                                                       self.project)
-        self.zone_list = self.ex_list_zones()
         self.zone_dict = {}
-        for zone in self.zone_list:
-            self.zone_dict[zone.name] = zone
+        self.zone_cache_expires = 0
+        self.network_dict = {}
+        self.network_cache_expires = 0
+        # (zone name, size name) -> (size, expiration time)
+        self.size_dict = {}
+        self.zone_list = self.ex_list_zones()
         if datacenter:
             self.zone = self.ex_get_zone(datacenter)
         else:
@@ -514,15 +533,13 @@ class GCENodeDriver(NodeDriver):
         if ex_project is None:
             response = self.connection.request(request, method='GET').object
         else:
-            # Save the connection request_path
-            save_request_path = self.connection.request_path
-            # Override the connection request path
-            new_request_path = save_request_path.replace(self.project,
-                                                         ex_project)
-            self.connection.request_path = new_request_path
+            # Use a full URL for the alternate project instead of overriding
+            # the connection request_path which is shared between threads
+            request_path = self.connection.request_path.replace(self.project,
+                                                                ex_project)
+            request = 'https://%s%s%s' % (self.connection.host, request_path,
+                                          request)
             response = self.connection.request(request, method='GET').object
-            # Restore the connection request_path
-            self.connection.request_path = save_request_path
         list_images = [self._to_node_image(i) for i in
                        response.get('items', [])]
         return list_images
@@ -555,6 +572,10 @@ class GCENodeDriver(NodeDriver):
         response = self.connection.request(request, method='GET').object
         list_networks = [self._to_network(n) for n in
                          response.get('items', [])]
+
+        # Refresh the network cache
+        self.network_dict = dict([(n.name, n) for n in list_networks])
+        self.network_cache_expires = time.time() + CACHE_TTL
         return list_networks
 
     def list_nodes(self, ex_zone=None):
@@ -593,6 +614,24 @@ class GCENodeDriver(NodeDriver):
                 list_nodes = [self._to_node(i) for i in response['items']]
         return list_nodes
 
+    def _get_nodes(self, nodes):
+        if len(nodes) > NODE_LOOKUP_MAX_NODES:
+            # Nodes may be in any zone, not only in the default one
+            uuids = set([node.uuid for node in nodes])
+            return [node for node in self.list_nodes(ex_zone='all')
+                    if node.uuid in uuids]
+
+        found = []
+
+        for node in nodes:
+            try:
+                found.append(self.ex_get_node(node.name, node.extra['zone']))
+            except ResourceNotFoundError:
+                # The node doesn't exist (yet or anymore)
+                pass
+
+        return found
+
     def list_sizes(self, location=None):
         """
         Return a list of sizes (machineTypes) in a zone.
@@ -625,6 +664,12 @@ class GCENodeDriver(NodeDriver):
                     list_sizes.extend(zone_sizes)
             else:
                 list_sizes = [self._to_node_size(s) for s in response['items']]
+
+        # Refresh the size cache
+        expires = time.time() + CACHE_TTL
+        for size in list_sizes:
+            key = (size.extra['zone'].name, size.name)
+            self.size_dict[key] = (size, expires)
         return list_sizes
 
     def list_volumes(self, ex_zone=None):
@@ -675,6 +720,10 @@ class GCENodeDriver(NodeDriver):
         request = '/zones'
         response = self.connection.request(request, method='GET').object
         list_zones = [self._to_zone(z) for z in response['items']]
+
+        # Refresh the zone cache
+        self.zone_dict = dict([(z.name, z) for z in list_zones])
+        self.zone_cache_expires = time.time() + CACHE_TTL
         return list_zones
 
     def ex_create_address(self, name, region=None):
@@ -1305,6 +1354,7 @@ class GCENodeDriver(NodeDriver):
         if 'error' in response:
             self._categorize_error(response['error'])
         else:
+            self.network_dict.pop(network.name, None)
             return True
 
     def destroy_node(self, node):
@@ -1515,9 +1565,15 @@ class GCENodeDriver(NodeDriver):
         zone = zone or self.zone
         if not hasattr(zone, 'name'):
             zone = self.ex_get_zone(zone)
+        # Check size cache first
+        size, expires = self.size_dict.get((zone.name, name), (None, 0))
+        if time.time() < expires:
+            return size
         request = '/zones/%s/machineTypes/%s' % (zone.name, name)
         response = self.connection.request(request, method='GET').object
-        return self._to_node_size(response)
+        size = self._to_node_size(response)
+        self.size_dict[(zone.name, name)] = (size, time.time() + CACHE_TTL)
+        return size
 
     def ex_get_volume(self, name, zone=None):
         """
@@ -1555,12 +1611,36 @@ class GCENodeDriver(NodeDriver):
         else:
             short_name = name
             request = '/zones/%s' % name
-        # Check zone cache first
+        # Check zone cache first (the whole cache is refreshed with a single
+        # request once it has expired)
+        if time.time() >= self.zone_cache_expires:
+            self.ex_list_zones()
         if short_name in self.zone_dict:
             return self.zone_dict[short_name]
         # Otherwise, look up zone information
         response = self.connection.request(request, method='GET').object
-        return self._to_zone(response)
+        zone = self._to_zone(response)
+        self.zone_dict[zone.name] = zone
+        return zone
+
+    def _get_cached_network(self, name):
+        """
+        Return a Network object from the network cache.
+
+        The cache is refreshed with a single list request if it has expired
+        and the network is only requested directly if it's not in the list.
+
+        @param  name: The name of the network
+        @type   name: C{str}
+
+        @return:  A Network object for the network
+        @rtype:   L{GCENetwork}
+        """
+        if time.time() >= self.network_cache_expires:
+            self.ex_list_networks()
+        if name not in self.network_dict:
+            self.network_dict[name] = self.ex_get_network(name)
+        return self.network_dict[name]
 
     def _to_address(self, address):
         """
@@ -1600,7 +1680,7 @@ class GCENodeDriver(NodeDriver):
         extra['description'] = firewall.get('description')
         extra['network_name'] = firewall['network'].split('/')[-1]
 
-        network = self.ex_get_network(extra['network_name'])
+        network = self._get_cached_network(extra['network_name'])
         source_ranges = firewall.get('sourceRanges')
         source_tags = firewall.get('sourceTags')
 
@@ -35,9 +35,11 @@ from xml.etree import ElementTree as ET
 from libcloud.common.openstack import OpenStackBaseConnection
 from libcloud.common.openstack import OpenStackDriverMixin
 from libcloud.common.types import MalformedResponseError, ProviderError
+from libcloud.common.types import InvalidCredsError
 from libcloud.compute.types import NodeState, Provider
 from libcloud.compute.base import NodeSize, NodeImage
 from libcloud.compute.base import NodeDriver, Node, NodeLocation, StorageVolume
+from libcloud.compute.base import NODE_LOOKUP_MAX_NODES
 from libcloud.pricing import get_size_price
 from libcloud.common.base import Response
 from libcloud.utils.xml import findall
@@ -70,6 +72,11 @@ class OpenStackResponse(Response):
 
     def success(self):
         i = int(self.status)
+
+        if i == httplib.UNAUTHORIZED:
+            # Token has been revoked or has expired
+            raise InvalidCredsError(self.body)
+
         return i >= 200 and i <= 299
 
     def has_content_type(self, content_type):
@@ -1144,6 +1151,13 @@ class OpenStack_1_1_NodeDriver(OpenStackNodeDriver):
                                                     None))
         super(OpenStack_1_1_NodeDriver, self).__init__(*args, **kwargs)
 
+    def _get_nodes(self, nodes):
+        if len(nodes) > NODE_LOOKUP_MAX_NODES:
+            return super(OpenStack_1_1_NodeDriver, self)._get_nodes(nodes)
+
+        nodes = [self.ex_get_node_details(node.id) for node in nodes]
+        return [node for node in nodes if node is not None]
+
     def create_node(self, **kwargs):
         """Create a new node
 
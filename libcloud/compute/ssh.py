@@ -16,6 +16,9 @@
 """
 Wraps multiple ways to communicate over SSH
 """
+
+from __future__ import with_statement
+
 have_paramiko = False
 
 try:
@@ -29,11 +32,14 @@ except ImportError:
 # Ref: https://bugs.launchpad.net/paramiko/+bug/392973
 
 import os
+import posixpath
+import threading
 import subprocess
 import logging
 
-from os.path import split as psplit
-from os.path import join as pjoin
+# Size of a block which is read from a local file and written to a remote
+# file in a single SFTP request
+SFTP_CHUNK_SIZE = 32 * 1024
 
 
 class BaseSSHClient(object):
@@ -99,6 +105,31 @@ class BaseSSHClient(object):
         raise NotImplementedError(
             'put not implemented for this ssh client')
 
+    def putfo(self, path, fo, chmod=None, mode='w'):
+        """
+        Upload the contents of a file-like object to the remote node.
+
+        Clients which support it read the file in blocks, so large files
+        are never fully loaded into memory.
+
+        @type path: C{str}
+        @keyword path: File path on the remote node.
+
+        @type fo: C{file}
+        @keyword fo: File-like object opened in binary mode.
+
+        @type chmod: C{int}
+        @keyword chmod: chmod file to this after creation.
+
+        @type mode: C{str}
+        @keyword mode: Mode in which the file is opened.
+
+        @return: Full path to the location where a file has been saved.
+        @rtype: C{str}
+        """
+        return self.put(path=path, contents=fo.read(), chmod=chmod,
+                        mode=mode)
+
     def delete(self, path):
         """
         Delete/Unlink a file on the remote node.
@@ -141,6 +172,9 @@ class ParamikoSSHClient(BaseSSHClient):
 
     """
     A SSH Client powered by Paramiko.
+
+    A single SFTP session is opened on the first upload and reused by all
+    the following file operations until the connection is closed.
     """
     def __init__(self, hostname, port=22, username='root', password=None,
                  key=None, timeout=None):
@@ -148,6 +182,14 @@ class ParamikoSSHClient(BaseSSHClient):
                                                 password, key, timeout)
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.sftp = None
+        self._sftp_lock = threading.Lock()
+
+        # Home directory of the user, relative paths are relative to it
+        self._home = None
+
+        # Remote directories which are known to exist
+        self._directories = set()
 
     def connect(self):
         conninfo = {'hostname': self.hostname,
@@ -167,51 +209,142 @@ class ParamikoSSHClient(BaseSSHClient):
         if self.timeout:
             conninfo['timeout'] = self.timeout
 
+        with self._sftp_lock:
+            # The session and the cached paths belong to the previous
+            # connection
+            if self.sftp is not None:
+                try:
+                    self.sftp.close()
+                except Exception:
+                    # The previous connection may already be closed
+                    pass
+
+                self.sftp = None
+
+            self._home = None
+            self._directories = set()
+
         self.client.connect(**conninfo)
         return True
 
     def put(self, path, contents=None, chmod=None, mode='w'):
-        sftp = self.client.open_sftp()
-        # less than ideal, but we need to mkdir stuff otherwise file() fails
-        head, tail = psplit(path)
+        def write(remote_file):
+            if contents is not None:
+                remote_file.write(contents)
 
-        if path[0] == "/":
-            sftp.chdir("/")
-        else:
-            # Relative path - start from a home directory (~)
-            sftp.chdir('.')
+        return self._put(path=path, write=write, chmod=chmod, mode=mode)
 
-        for part in head.split("/"):
-            if part != "":
-                try:
-                    sftp.mkdir(part)
-                except IOError:
-                    # so, there doesn't seem to be a way to
-                    # catch EEXIST consistently *sigh*
-                    pass
-                sftp.chdir(part)
+    def putfo(self, path, fo, chmod=None, mode='w'):
+        def write(remote_file):
+            while True:
+                data = fo.read(SFTP_CHUNK_SIZE)
+
+                if not data:
+                    break
 
-        cwd = sftp.getcwd()
+                remote_file.write(data)
 
-        ak = sftp.file(tail, mode=mode)
-        ak.write(contents)
-        if chmod is not None:
-            ak.chmod(chmod)
-        ak.close()
-        sftp.close()
+        return self._put(path=path, write=write, chmod=chmod, mode=mode)
+
+    def delete(self, path):
+        sftp = self._get_sftp()
+        sftp.unlink(path)
+        return True
+
+    def _get_sftp(self):
+        """
+        Return the SFTP session of this connection, open it if needed.
+
+        The session is shared by all the threads which use this client.
+        """
+        with self._sftp_lock:
+            if self.sftp is None:
+                self.sftp = self.client.open_sftp()
+
+            return self.sftp
+
+    def _put(self, path, write, chmod, mode):
+        """
+        Create the parent directories of a remote file, open it and call
+        C{write} with the opened file.
+
+        @return: Full path to the location where a file has been saved.
+        @rtype: C{str}
+        """
+        sftp = self._get_sftp()
 
         if path[0] == '/':
             file_path = path
         else:
-            file_path = pjoin(cwd, path)
+            # Relative path - start from a home directory (~)
+            if self._home is None:
+                self._home = sftp.normalize('.')
+
+            file_path = posixpath.join(self._home, path)
+
+        directory = posixpath.dirname(file_path)
+        self._mkdirs(sftp, directory)
+
+        try:
+            remote_file = sftp.file(file_path, mode=mode)
+        except IOError:
+            if directory not in self._directories:
+                raise
+
+            # The directory may have been removed after it has been cached,
+            # check it again
+            self._forget_directory(directory)
+            self._mkdirs(sftp, directory)
+            remote_file = sftp.file(file_path, mode=mode)
+
+        try:
+            # Don't wait for the server to acknowledge every write, the
+            # status of all the writes is checked when the file is closed
+            remote_file.set_pipelined(True)
+            write(remote_file)
+
+            if chmod is not None:
+                remote_file.chmod(chmod)
+        finally:
+            remote_file.close()
 
         return file_path
 
-    def delete(self, path):
-        sftp = self.client.open_sftp()
-        sftp.unlink(path)
-        sftp.close()
-        return True
+    def _mkdirs(self, sftp, directory):
+        """
+        Create a remote directory and its missing parents.
+
+        Directories which are known to exist are not checked again, so
+        uploading many files to the same directory costs no extra round
+        trips.
+        """
+        if directory in ('', '/') or directory in self._directories:
+            return
+
+        try:
+            sftp.stat(directory)
+        except IOError:
+            self._mkdirs(sftp, posixpath.dirname(directory))
+
+            try:
+                sftp.mkdir(directory)
+            except IOError:
+                # The directory may have been created concurrently.
+                # Otherwise opening the file fails with a clear error.
+                pass
+
+        while directory not in ('', '/'):
+            self._directories.add(directory)
+            directory = posixpath.dirname(directory)
+
+    def _forget_directory(self, directory):
+        """
+        Remove a remote directory and its parents from the directories which
+        are known to exist.
+        """
+        while directory not in ('', '/'):
+            self._directories.discard(directory)
+            directory = posixpath.dirname(directory)
 
     def run(self, cmd):
         # based on exec_command()
@@ -230,6 +363,10 @@ class ParamikoSSHClient(BaseSSHClient):
         return [so, se, status]
 
     def close(self):
+        if self.sftp is not None:
+            self.sftp.close()
+            self.sftp = None
+
         self.client.close()
         return True
 
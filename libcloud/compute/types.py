@@ -197,7 +197,8 @@ class DeploymentError(LibcloudError):
 
     def __repr__(self):
         return (('<DeploymentError: node=%s, error=%s, driver=%s>'
-                % (self.node.id, str(self.value), str(self.driver))))
+                % (getattr(self.node, 'id', None), str(self.value),
+                   str(self.driver))))
 
 
 """Deprecated alias of L{DeploymentException}"""
@@ -24,7 +24,7 @@ from libcloud.utils.py3 import httplib
 from libcloud.utils.misc import reverse_dict
 from libcloud.loadbalancer.base import LoadBalancer, Member, Driver, Algorithm
 from libcloud.loadbalancer.base import DEFAULT_ALGORITHM
-from libcloud.common.types import LibcloudError
+from libcloud.common.types import LibcloudError, InvalidCredsError
 from libcloud.common.base import JsonResponse, PollingConnection
 from libcloud.loadbalancer.types import State, MemberCondition
 from libcloud.common.openstack import OpenStackBaseConnection,\
@@ -39,6 +39,10 @@ class RackspaceResponse(JsonResponse):
         return super(RackspaceResponse, self).parse_body()
 
     def success(self):
+        if int(self.status) == httplib.UNAUTHORIZED:
+            # Token has been revoked or has expired
+            raise InvalidCredsError(self.body)
+
         return 200 <= int(self.status) <= 299
 
 
@@ -21,6 +21,11 @@ Provides base classes for working with storage
 from __future__ import with_statement
 
 import os.path                          # pylint: disable-msg=W0404
+import sys
+import ssl
+import heapq
+import socket
+import string
 import hashlib
 from os.path import join as pjoin
 
@@ -29,12 +34,39 @@ from libcloud.utils.py3 import next
 from libcloud.utils.py3 import b
 
 import libcloud.utils.files
+from libcloud.utils.concurrency import parallel_map, prefetch, retry
+from libcloud.utils.concurrency import interleave, merge_sorted
+from libcloud.utils.concurrency import chain_prefetched
 from libcloud.common.types import LibcloudError
 from libcloud.common.base import ConnectionUserAndKey, BaseDriver
 from libcloud.storage.types import ObjectDoesNotExistError
 
 CHUNK_SIZE = 8096
 
+# Size of a block which is read from a local file when uploading it
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Default size of a single range request when downloading an object in parts
+DOWNLOAD_PART_SIZE = 8 * 1024 * 1024
+
+# Number of times a single range request is retried
+DOWNLOAD_PART_RETRIES = 3
+
+# Default number of shards a container listing is split into when listing it
+# in parallel
+LIST_SHARDS = 16
+
+# Default number of shards which are listed concurrently
+LIST_WORKERS = 8
+
+# Characters which are used as boundaries when a level of a container which
+# doesn't have any common prefixes is split into key ranges
+KEY_RANGE_CHARACTERS = string.digits + string.ascii_uppercase + \
+    string.ascii_lowercase
+
+# Default number of concurrent requests used when deleting multiple objects
+DELETE_WORKERS = 8
+
 
 class Object(object):
     """
@@ -89,6 +121,10 @@ class Object(object):
     def as_stream(self, chunk_size=None):
         return self.driver.download_object_as_stream(self, chunk_size)
 
+    def copy(self, container, object_name=None, extra=None):
+        return self.driver.copy_object(self, container,
+                                       object_name=object_name, extra=extra)
+
     def delete(self):
         return self.driver.delete_object(self)
 
@@ -155,6 +191,9 @@ class Container(object):
     def delete_object(self, obj):
         return self.driver.delete_object(obj)
 
+    def delete_objects(self, objects, **kwargs):
+        return self.driver.delete_objects(objects, container=self, **kwargs)
+
     def delete(self):
         return self.driver.delete_container(self)
 
@@ -173,6 +212,10 @@ class StorageDriver(BaseDriver):
     hash_type = 'md5'
     supports_chunked_encoding = False
 
+    # True if iterate_container_objects supports listing the objects which
+    # follow a name (ex_marker)
+    supports_list_marker = False
+
     def __init__(self, key, secret=None, secure=True, host=None, port=None,
                  **kwargs):
         super(StorageDriver, self).__init__(key=key, secret=secret,
@@ -223,6 +266,227 @@ class StorageDriver(BaseDriver):
         """
         return list(self.iterate_container_objects(container))
 
+    def ex_iterate_container_objects_parallel(self, container,
+                                              shards=LIST_SHARDS,
+                                              prefix=None, delimiter='/',
+                                              workers=LIST_WORKERS,
+                                              ordered=False):
+        """
+        Return a generator of objects for the given container which lists
+        multiple parts (shards) of the keyspace concurrently.
+
+        Shards are either prefixes supplied by the caller or discovered by
+        listing the container level by level using a delimiter until there
+        are at least the requested number of common prefixes. Objects which
+        are found while discovering the shards are yielded as they are
+        listed. If the driver supports ``ex_marker``, a level which doesn't
+        have any common prefixes (a flat keyspace) is split into key ranges
+        instead.
+
+        This requires driver support for ``ex_prefix`` (and for
+        ``_iterate_container_level`` if the shards are discovered).
+
+        :param container: Container instance.
+        :type container: :class:`Container`
+
+        :param shards: Number of shards to discover or a list of prefixes.
+                       Supplied prefixes must not overlap (e.g. ``a/`` and
+                       ``a/b/``), otherwise objects are returned multiple
+                       times. Prefixes which contain ``prefix`` are clipped
+                       to it.
+        :type shards: ``int`` or ``list`` of ``str``
+
+        :param prefix: Only return objects starting with prefix.
+        :type prefix: ``str``
+
+        :param delimiter: Delimiter used to discover shards.
+        :type delimiter: ``str``
+
+        :param workers: Number of shards listed concurrently.
+        :type workers: ``int``
+
+        :param ordered: True to yield objects sorted by name, otherwise
+                        objects are yielded as soon as they are listed.
+        :type ordered: ``bool``
+
+        :return: A generator of Object instances.
+        :rtype: ``generator`` of :class:`Object`
+        """
+        prefix = prefix or ''
+        found = []
+        ranges = []
+
+        if isinstance(shards, (list, tuple)):
+            for shard in shards:
+                if prefix.startswith(shard):
+                    shard = prefix
+                elif not shard.startswith(prefix):
+                    continue
+
+                if (shard, None, None) not in ranges:
+                    ranges.append((shard, None, None))
+        else:
+            for obj in self._discover_container_shards(
+                    container=container, prefix=prefix, delimiter=delimiter,
+                    shards=shards, workers=workers, ordered=ordered,
+                    ranges=ranges, found=found):
+                yield obj
+
+        # Shards don't overlap so listing them one after the other in this
+        # order returns the objects sorted by name
+        ranges.sort(key=lambda shard: shard[1] or shard[0])
+        sources = [self._iterate_container_shard(container, shard)
+                   for shard in ranges]
+
+        if ordered:
+            objects = merge_sorted([found, chain_prefetched(sources,
+                                                            workers=workers)],
+                                   key=lambda obj: obj.name)
+        else:
+            objects = interleave(sources, workers=workers)
+
+        try:
+            for obj in objects:
+                yield obj
+        finally:
+            objects.close()
+
+    def _discover_container_shards(self, container, prefix, delimiter,
+                                   shards, workers, ordered, ranges, found):
+        """
+        Split the keyspace under ``prefix`` into at least ``shards`` shards
+        (if the container has enough common prefixes) and return a generator
+        which yields the objects which are found on the way.
+
+        Every level is listed using the delimiter. A prefix which has been
+        listed is replaced by the prefixes one level below it. Shards are
+        appended to ``ranges`` as (prefix, start after, end) tuples.
+
+        In ordered mode, an object is only yielded once no unlisted part of
+        the keyspace precedes it. The objects which can't be yielded yet
+        when the discovery ends are appended to ``found`` in order.
+        """
+        prefixes = [prefix]
+        held = []
+
+        while prefixes and len(prefixes) + len(ranges) < shards:
+            levels = [self._list_container_level(container, level_prefix,
+                                                 delimiter, shards)
+                      for level_prefix in prefixes]
+            prefixes = []
+
+            for (obj, shard) in interleave(levels, workers=workers):
+                if shard is None:
+                    if ordered:
+                        heapq.heappush(held, (obj.name, obj))
+                    else:
+                        yield obj
+                elif shard[1] is None:
+                    prefixes.append(shard[0])
+                else:
+                    ranges.append(shard)
+
+            bounds = prefixes + [shard[1] for shard in ranges]
+
+            while held and (not bounds or held[0][0] < min(bounds)):
+                yield heapq.heappop(held)[1]
+
+        ranges.extend([(shard, None, None) for shard in prefixes])
+        found.extend([obj for (_, obj) in sorted(held)])
+
+    def _list_container_level(self, container, prefix, delimiter, shards):
+        """
+        Return a generator which lists a single level of the container and
+        yields an (object, None) tuple for every object and a (None, shard)
+        tuple for every common prefix.
+
+        If the first two pages of the level don't contain any common
+        prefixes, the rest of the level is split into key ranges (if the
+        driver supports it) instead of being listed page by page.
+        """
+        pages = self._iterate_container_level(container, prefix, delimiter)
+        flat = True
+
+        try:
+            for (index, (objects, prefixes)) in enumerate(pages):
+                for obj in objects:
+                    yield obj, None
+
+                for common_prefix in prefixes:
+                    yield None, (common_prefix, None, None)
+
+                flat = flat and not prefixes
+
+                if flat and index == 1 and objects and \
+                   self.supports_list_marker:
+                    for shard in self._split_key_range(prefix,
+                                                       objects[-1].name,
+                                                       shards):
+                        yield None, shard
+                    break
+        finally:
+            pages.close()
+
+    def _split_key_range(self, prefix, start_after, shards):
+        """
+        Split the names under ``prefix`` which follow ``start_after`` into
+        up to ``shards`` consecutive ranges using the character following
+        the prefix as the boundary.
+
+        :return: ``list`` of (prefix, start after, end) tuples
+        :rtype: ``list``
+        """
+        candidates = [prefix + char for char in KEY_RANGE_CHARACTERS
+                      if prefix + char > start_after]
+        count = min(shards - 1, len(candidates))
+        boundaries = [candidates[index * len(candidates) // count]
+                      for index in range(max(count, 0))]
+
+        return [(prefix, start, end) for (start, end) in
+                zip([start_after] + boundaries, boundaries + [None])]
+
+    def _iterate_container_shard(self, container, shard):
+        """
+        Return a generator of the objects in a single shard.
+        """
+        (prefix, start_after, end) = shard
+
+        if start_after is None:
+            return self.iterate_container_objects(container, ex_prefix=prefix)
+
+        return self._iterate_container_key_range(container, prefix,
+                                                 start_after, end)
+
+    def _iterate_container_key_range(self, container, prefix, start_after,
+                                     end):
+        """
+        Return a generator of the objects under ``prefix`` whose names are
+        greater than ``start_after`` and not greater than ``end``.
+        """
+        objects = self.iterate_container_objects(container, ex_prefix=prefix,
+                                                 ex_marker=start_after)
+
+        try:
+            for obj in objects:
+                if end is not None and obj.name > end:
+                    break
+
+                yield obj
+        finally:
+            objects.close()
+
+    def _iterate_container_level(self, container, prefix, delimiter):
+        """
+        List a single level of the container.
+
+        :return: A generator which yields a (list of objects with names
+                 which don't contain the delimiter after the prefix, list
+                 of common prefixes) tuple for every page of the listing.
+        :rtype: ``generator`` of ``tuple``
+        """
+        raise NotImplementedError(
+            '_iterate_container_level not implemented for this driver')
+
     def get_container(self, container_name):
         """
         Return a container instance.
@@ -407,6 +671,62 @@ class StorageDriver(BaseDriver):
         raise NotImplementedError(
             'upload_object_via_stream not implemented for this driver')
 
+    def copy_object(self, obj, container, object_name=None, extra=None):
+        """
+        Copy an object to a container.
+
+        If the destination container belongs to this driver instance and the
+        provider supports it, the object is copied on the server side.
+        Otherwise the object is downloaded and uploaded again as a stream,
+        which also allows copying objects between providers and accounts.
+
+        :param obj: Object to copy.
+        :type obj: :class:`Object`
+
+        :param container: Destination container.
+        :type container: :class:`Container`
+
+        :param object_name: Name of the copy. Defaults to the name of the
+                            source object.
+        :type object_name: ``str``
+
+        :param extra: Extra attributes (driver specific) of the copy. If not
+                      provided, the content type and meta data of the source
+                      object are preserved. (optional)
+        :type extra: ``dict``
+
+        :return: The copy.
+        :rtype: :class:`Object`
+        """
+        object_name = object_name or obj.name
+
+        if container.driver is self:
+            try:
+                return self._copy_object(obj, container, object_name, extra)
+            except NotImplementedError:
+                pass
+
+        if extra is None:
+            extra = {'meta_data': obj.meta_data or {}}
+            content_type = (obj.extra or {}).get('content_type', None)
+
+            if content_type:
+                extra['content_type'] = content_type
+
+        iterator = self.download_object_as_stream(obj)
+        return container.driver.upload_object_via_stream(
+            iterator, container, object_name, extra=extra)
+
+    def _copy_object(self, obj, container, object_name, extra):
+        """
+        Copy an object on the server side.
+
+        :return: The copy.
+        :rtype: :class:`Object`
+        """
+        raise NotImplementedError(
+            'server side copy not implemented for this driver')
+
     def delete_object(self, obj):
         """
         Delete an object.
@@ -420,6 +740,122 @@ class StorageDriver(BaseDriver):
         raise NotImplementedError(
             'delete_object not implemented for this driver')
 
+    def delete_objects(self, objects, container=None,
+                       workers=DELETE_WORKERS):
+        """
+        Delete multiple objects.
+
+        Drivers which support it delete the objects in batches using a
+        single request per batch (e.g. S3 Multi-Object Delete). Otherwise
+        the objects are deleted one by one. In both cases up to ``workers``
+        requests are performed concurrently.
+
+        Objects which don't exist are reported as deleted.
+
+        :param objects: Objects or names of the objects to delete.
+        :type objects: ``list`` of :class:`Object` or ``str``
+
+        :param container: Container holding the objects. Required if object
+                          names are provided.
+        :type container: :class:`Container`
+
+        :param workers: Maximum number of concurrent requests.
+        :type workers: ``int``
+
+        :return: A list of (object, result) tuples in the same order as the
+                 provided objects. The result is ``True`` if the object has
+                 been deleted, otherwise it's the exception which describes
+                 the failure.
+        :rtype: ``list`` of ``tuple``
+        """
+        objects = [self._get_object_to_delete(obj, container)
+                   for obj in objects]
+        batch_size = max(self._get_delete_batch_size(), 1)
+
+        # Batches can only hold objects from a single container
+        containers = {}
+        batches = []
+
+        for index, obj in enumerate(objects):
+            batch = containers.get(obj.container.name)
+
+            if batch is None or len(batch[1]) >= batch_size:
+                batch = (obj.container, [])
+                containers[obj.container.name] = batch
+                batches.append(batch)
+
+            batch[1].append((index, obj))
+
+        def delete_batch(batch):
+            (batch_container, items) = batch
+            batch_objects = [obj for (_, obj) in items]
+
+            try:
+                return self._delete_object_batch(batch_container,
+                                                 batch_objects)
+            except Exception:
+                return [sys.exc_info()[1]] * len(batch_objects)
+
+        results = [None] * len(objects)
+
+        for ((_, items), batch_results) in parallel_map(delete_batch, batches,
+                                                        workers=workers):
+            for ((index, obj), result) in zip(items, batch_results):
+                results[index] = (obj, result)
+
+        return results
+
+    def _get_object_to_delete(self, obj, container):
+        """
+        Return an Object instance for an object or an object name.
+        """
+        if isinstance(obj, Object):
+            return obj
+
+        if container is None:
+            raise ValueError('container is required when deleting objects '
+                             'by name')
+
+        return Object(name=obj, size=None, hash=None, extra=None,
+                      meta_data=None, container=container, driver=self)
+
+    def _get_delete_batch_size(self):
+        """
+        Return the maximum number of objects which can be deleted using a
+        single request.
+
+        :rtype: ``int``
+        """
+        return 1
+
+    def _delete_object_batch(self, container, objects):
+        """
+        Delete a batch of objects from a single container.
+
+        The default implementation deletes the objects one by one.
+
+        :return: A list of results in the same order as the objects. See
+                 :meth:`delete_objects`.
+        :rtype: ``list``
+        """
+        results = []
+
+        for obj in objects:
+            try:
+                if self.delete_object(obj):
+                    result = True
+                else:
+                    result = LibcloudError('Unable to delete object %s' %
+                                           (obj.name), driver=self)
+            except ObjectDoesNotExistError:
+                result = True
+            except Exception:
+                result = sys.exc_info()[1]
+
+            results.append(result)
+
+        return results
+
     def create_container(self, container_name):
         """
         Create a new container.
@@ -517,23 +953,9 @@ class StorageDriver(BaseDriver):
 
         chunk_size = chunk_size or CHUNK_SIZE
 
-        base_name = os.path.basename(destination_path)
-
-        if not base_name and not os.path.exists(destination_path):
-            raise LibcloudError(
-                value='Path %s does not exist' % (destination_path),
-                driver=self)
-
-        if not base_name:
-            file_path = pjoin(destination_path, obj.name)
-        else:
-            file_path = destination_path
-
-        if os.path.exists(file_path) and not overwrite_existing:
-            raise LibcloudError(
-                value='File %s already exists, but ' % (file_path) +
-                'overwrite_existing=False',
-                driver=self)
+        file_path = self._get_download_file_path(
+            obj=obj, destination_path=destination_path,
+            overwrite_existing=overwrite_existing)
 
         stream = libcloud.utils.files.read_in_chunks(response, chunk_size)
 
@@ -567,6 +989,254 @@ class StorageDriver(BaseDriver):
 
         return True
 
+    def _get_download_file_path(self, obj, destination_path,
+                                overwrite_existing=False):
+        """
+        Return a path of the local file an object is downloaded to.
+
+        :type obj: :class:`Object`
+        :param obj: Object instance.
+
+        :type destination_path: ``str``
+        :param destination_path: Full path to a file or a directory.
+
+        :type overwrite_existing: ``bool``
+        :param overwrite_existing: True to allow an existing file.
+
+        :rtype: ``str``
+        """
+        base_name = os.path.basename(destination_path)
+
+        if not base_name and not os.path.exists(destination_path):
+            raise LibcloudError(
+                value='Path %s does not exist' % (destination_path),
+                driver=self)
+
+        if not base_name:
+            file_path = pjoin(destination_path, obj.name)
+        else:
+            file_path = destination_path
+
+        if os.path.exists(file_path) and not overwrite_existing:
+            raise LibcloudError(
+                value='File %s already exists, but ' % (file_path) +
+                'overwrite_existing=False',
+                driver=self)
+
+        return file_path
+
+    def _get_object_range(self, obj, start_bytes, end_bytes=None):
+        """
+        Perform a raw GET request for a byte range of an object.
+
+        Drivers which support HTTP range requests implement this method.
+
+        :type obj: :class:`Object`
+        :param obj: Object instance.
+
+        :type start_bytes: ``int``
+        :param start_bytes: Offset of the first byte.
+
+        :type end_bytes: ``int``
+        :param end_bytes: Offset of the byte after the last byte which is
+                          returned (exclusive). If not provided, data up to
+                          the end of the object is returned.
+
+        :rtype: :class:`RawResponse`
+        """
+        raise NotImplementedError(
+            'range requests not implemented for this driver')
+
+    def _get_range_header(self, start_bytes, end_bytes=None):
+        """
+        Return a value of the HTTP Range header for the provided byte range.
+
+        :rtype: ``str``
+        """
+        if end_bytes is None:
+            return 'bytes=%d-' % (start_bytes)
+
+        return 'bytes=%d-%d' % (start_bytes, end_bytes - 1)
+
+    def _download_object_range_as_stream(self, obj, start_bytes,
+                                         end_bytes=None, chunk_size=None):
+        """
+        Return a generator which yields a byte range of the object data.
+
+        :type obj: :class:`Object`
+        :param obj: Object instance.
+
+        :type start_bytes: ``int``
+        :param start_bytes: Offset of the first byte.
+
+        :type end_bytes: ``int``
+        :param end_bytes: Offset of the byte after the last byte (exclusive).
+
+        :type chunk_size: ``int``
+        :param chunk_size: Optional chunk size (in bytes).
+        """
+        response = self._get_object_range(obj=obj, start_bytes=start_bytes,
+                                          end_bytes=end_bytes)
+
+        return self._get_object(
+            obj=obj, callback=libcloud.utils.files.read_in_chunks,
+            response=response,
+            callback_kwargs={'iterator': response.response,
+                             'chunk_size': chunk_size},
+            success_status_code=httplib.PARTIAL_CONTENT)
+
+    def _download_object_in_parts(self, obj, destination_path,
+                                  overwrite_existing=False,
+                                  delete_on_failure=True, part_size=None,
+                                  workers=1, resume=False):
+        """
+        Download an object using HTTP range requests.
+
+        The local file is preallocated and the parts are downloaded by
+        ``workers`` threads directly to their offsets in the file. Every
+        failed part is retried individually.
+
+        Completed parts are recorded in a ``<file>.progress`` file which is
+        removed once the download finishes. If ``resume`` is True, parts
+        which are recorded in the progress file are skipped. Without a
+        progress file, the content of an existing file can't be trusted (it
+        may be preallocated and only contain zeros), so the whole object is
+        downloaded again.
+
+        :type obj: :class:`Object`
+        :param obj: Object instance.
+
+        :type destination_path: ``str``
+        :param destination_path: Full path to a file or a directory.
+
+        :type overwrite_existing: ``bool``
+        :param overwrite_existing: True to overwrite an existing file.
+
+        :type delete_on_failure: ``bool``
+        :param delete_on_failure: True to delete the partially downloaded
+                                  file if the download fails. Use False if
+                                  you want to resume the download later.
+
+        :type part_size: ``int``
+        :param part_size: Size of a single range request (defaults to
+            ``libcloud.storage.base.DOWNLOAD_PART_SIZE``, 8 MB).
+
+        :type workers: ``int``
+        :param workers: Number of parts which are downloaded in parallel.
+
+        :type resume: ``bool``
+        :param resume: True to resume a previously failed download.
+
+        :return: ``True`` on success, ``False`` otherwise.
+        :rtype: ``bool``
+        """
+        part_size = part_size or DOWNLOAD_PART_SIZE
+        size = int(obj.size)
+
+        file_path = self._get_download_file_path(
+            obj=obj, destination_path=destination_path,
+            overwrite_existing=overwrite_existing or resume)
+        progress_path = file_path + '.progress'
+
+        completed = set()
+
+        if resume and os.path.exists(file_path) and \
+           os.path.exists(progress_path):
+            with open(progress_path, 'r') as file_handle:
+                for line in file_handle:
+                    if line.strip():
+                        completed.add(tuple(map(int, line.split())))
+
+            mode = 'r+b'
+        else:
+            mode = 'wb'
+
+        # Preallocate the file so the parts can be written in any order
+        with open(file_path, mode) as file_handle:
+            file_handle.truncate(size)
+
+        parts = []
+        for offset in range(0, size, part_size):
+            part = (offset, min(offset + part_size, size))
+
+            if part not in completed:
+                parts.append(part)
+
+        def save_part(part):
+            (part_start, part_end) = part
+            response = self._get_object_range(obj=obj, start_bytes=part_start,
+                                              end_bytes=part_end)
+
+            return self._get_object(
+                obj=obj, callback=self._save_object_part, response=response,
+                callback_kwargs={'response': response.response,
+                                 'file_path': file_path,
+                                 'start_bytes': part_start,
+                                 'end_bytes': part_end},
+                success_status_code=httplib.PARTIAL_CONTENT)
+
+        def download_part(part):
+            return retry(lambda: save_part(part),
+                         retries=DOWNLOAD_PART_RETRIES)
+
+        try:
+            with open(progress_path, 'a') as progress:
+                for (part, _) in parallel_map(download_part, parts,
+                                              workers=workers):
+                    progress.write('%d %d\n' % part)
+                    progress.flush()
+        except Exception:
+            if delete_on_failure:
+                for path in [file_path, progress_path]:
+                    try:
+                        os.unlink(path)
+                    except Exception:
+                        pass
+
+            raise
+
+        os.unlink(progress_path)
+
+        return os.path.getsize(file_path) == size
+
+    def _save_object_part(self, response, file_path, start_bytes, end_bytes):
+        """
+        Write data of a range response to the provided offset in a file.
+
+        :type response: :class:`httplib.HTTPResponse`
+        :param response: Response with the range data.
+
+        :type file_path: ``str``
+        :param file_path: Path to an existing (preallocated) file.
+
+        :type start_bytes: ``int``
+        :param start_bytes: Offset of the first byte.
+
+        :type end_bytes: ``int``
+        :param end_bytes: Offset of the byte after the last byte (exclusive).
+
+        :return: Number of bytes written.
+        :rtype: ``int``
+        """
+        bytes_transferred = 0
+
+        with open(file_path, 'r+b') as file_handle:
+            file_handle.seek(start_bytes)
+
+            for data in libcloud.utils.files.read_in_chunks(response,
+                                                            CHUNK_SIZE):
+                file_handle.write(b(data))
+                bytes_transferred += len(data)
+
+        if bytes_transferred != end_bytes - start_bytes:
+            raise LibcloudError(
+                value='Expected %d bytes for range %d-%d, got %d' %
+                      (end_bytes - start_bytes, start_bytes, end_bytes,
+                       bytes_transferred),
+                driver=self)
+
+        return bytes_transferred
+
     def _upload_object(self, object_name, content_type, upload_func,
                        upload_func_kwargs, request_path, request_method='PUT',
                        headers=None, file_path=None, iterator=None):
@@ -781,14 +1451,159 @@ class StorageDriver(BaseDriver):
                  is the number of transferred bytes.
         """
         with open(file_path, 'rb') as file_handle:
-            success, data_hash, bytes_transferred = (
-                self._stream_data(
-                    response=response,
-                    iterator=iter(file_handle),
-                    chunked=chunked,
-                    calculate_hash=calculate_hash))
-
-        return success, data_hash, bytes_transferred
+            sock = getattr(response.connection.connection, 'sock', None)
+
+            # Use zero-copy sendfile() when the body is sent as-is over a
+            # plain (not TLS-wrapped) socket. The data never reaches user
+            # space so it's only used if the hash isn't needed, otherwise
+            # the hash is calculated while the file is being streamed.
+            if (not chunked and not calculate_hash and
+                    hasattr(socket.socket, 'sendfile') and
+                    isinstance(sock, socket.socket) and
+                    not isinstance(sock, ssl.SSLSocket)):
+                return self._sendfile(sock=sock, file_handle=file_handle)
+
+            return self._stream_file(response=response,
+                                     file_handle=file_handle,
+                                     chunked=chunked,
+                                     calculate_hash=calculate_hash)
+
+    def _stream_file(self, response, file_handle, chunked=False,
+                     calculate_hash=True, chunk_size=None):
+        """
+        Stream a local file over an http connection in fixed size blocks.
+
+        Blocks are read into a single reusable buffer and sent without
+        copying (if memoryview is available).
+
+        :type response: :class:`RawResponse`
+        :param response: RawResponse object.
+
+        :type file_handle: ``file``
+        :param file_handle: File object opened in binary mode.
+
+        :type chunked: ``bool``
+        :param chunked: True if the chunked transfer encoding should be used
+                        (defauls to False).
+
+        :type calculate_hash: ``bool``
+        :param calculate_hash: True to calculate hash of the transfered data.
+                               (defauls to True).
+
+        :type chunk_size: ``int``
+        :param chunk_size: Optional block size (defaults to
+                           ``FILE_CHUNK_SIZE``)
+
+        :rtype: ``tuple``
+        :return: First item is a boolean indicator of success, second
+                 one is the uploaded data MD5 hash and the third one
+                 is the number of transferred bytes.
+        """
+        chunk_size = chunk_size or FILE_CHUNK_SIZE
+
+        if not libcloud.utils.files.HAS_MEMORYVIEW:
+            return self._stream_data(response=response, iterator=file_handle,
+                                     chunked=chunked,
+                                     calculate_hash=calculate_hash,
+                                     chunk_size=chunk_size)
+
+        send = response.connection.connection.send
+
+        data_hash = None
+        if calculate_hash:
+            data_hash = self._get_hash_function()
+
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        bytes_transferred = 0
+
+        while True:
+            read = file_handle.readinto(buf)
+
+            if not read:
+                break
+
+            chunk = view[:read]
+
+            try:
+                if chunked:
+                    send(b('%X\r\n' % (read)))
+                    send(chunk)
+                    send(b('\r\n'))
+                else:
+                    send(chunk)
+            except Exception:
+                # Timeout, etc. _upload_object reports the failed upload
+                return False, None, bytes_transferred
+
+            bytes_transferred += read
+            if calculate_hash:
+                data_hash.update(chunk)
+
+        if chunked:
+            send(b('0\r\n\r\n'))
+
+        if calculate_hash:
+            data_hash = data_hash.hexdigest()
+
+        return True, data_hash, bytes_transferred
+
+    def _sendfile(self, sock, file_handle):
+        """
+        Send a local file over a plain socket using ``sendfile()``.
+
+        File data never passes through user space while it is being sent,
+        so no hash is calculated.
+
+        :type sock: ``socket.socket``
+        :param sock: Connected socket.
+
+        :type file_handle: ``file``
+        :param file_handle: File object opened in binary mode.
+
+        :rtype: ``tuple``
+        :return: First item is a boolean indicator of success, second
+                 one is always None and the third one is the number of
+                 transferred bytes.
+        """
+        try:
+            bytes_transferred = sock.sendfile(file_handle)
+        except Exception:
+            # Timeout, etc. _upload_object reports the failed upload
+            return False, None, file_handle.tell()
+
+        return True, None, bytes_transferred
+
+    def _iterate_pages(self, pages, prefetch_depth=0):
+        """
+        Return a generator which yields the items of all the pages returned
+        by a paginated listing.
+
+        :param pages: Generator which yields the items of every page.
+        :type pages: ``generator``
+
+        :param prefetch_depth: If greater than 0, pages are requested and
+                               read into lists in a background thread and up
+                               to prefetch_depth pages are buffered while the
+                               current page is being consumed. Otherwise
+                               items are yielded as soon as they are parsed.
+        :type prefetch_depth: ``int``
+
+        :rtype: ``generator``
+        """
+        source = pages
+
+        if prefetch_depth and prefetch_depth > 0:
+            pages = prefetch((list(page) for page in source),
+                             depth=prefetch_depth)
+
+        try:
+            for page in pages:
+                for item in page:
+                    yield item
+        finally:
+            pages.close()
+            source.close()
 
     def _get_hash_function(self):
         """
@@ -15,12 +15,14 @@
 
 from __future__ import with_statement
 
+import sys
 import time
 import base64
 import hmac
 import re
 import os
 import binascii
+import threading
 
 from hashlib import sha256
 from xml.etree.ElementTree import Element, SubElement
@@ -32,7 +34,8 @@ from libcloud.utils.py3 import tostring
 from libcloud.utils.py3 import b
 
 from libcloud.utils.xml import fixxpath, findtext
-from libcloud.utils.files import read_in_chunks
+from libcloud.utils.files import read_in_chunks, get_data_ranges
+from libcloud.utils.concurrency import parallel_map, retry
 from libcloud.common.types import LibcloudError
 from libcloud.common.azure import AzureConnection
 
@@ -68,6 +71,26 @@ AZURE_CHUNK_SIZE = 4 * 1024 * 1024
 # Azure page blob must be aligned in 512 byte boundaries
 AZURE_PAGE_CHUNK_SIZE = 512
 
+# Pages of a newly created page blob are initialized with zeros, so pages
+# which only contain zeros don't need to be written
+ZERO_PAGE = b('\x00' * AZURE_PAGE_CHUNK_SIZE)
+
+# Runs of zero pages shorter than this are written along with the data
+# around them, since every skipped run costs an extra Put Page request
+AZURE_PAGE_MIN_ZERO_RUN = 64 * 1024
+
+# Number of seconds to wait between polls of the status of a pending copy.
+# The interval is doubled after every poll, up to the maximum.
+AZURE_COPY_POLL_INTERVAL = 1
+AZURE_COPY_MAX_POLL_INTERVAL = 30
+
+# Number of seconds after which a pending copy is aborted
+AZURE_COPY_TIMEOUT = 60 * 60
+
+# Number of times a single block or page range is retried before the whole
+# upload fails
+AZURE_UPLOAD_RETRIES = 3
+
 # The time period (in seconds) for which a lease must be obtained.
 # If set as -1, we get an infinite lease, but that is a bad idea. If
 # after getting an infinite lease, there was an issue in releasing the
@@ -75,12 +98,24 @@ AZURE_PAGE_CHUNK_SIZE = 512
 # released using the lease_id (which is not exposed to the user)
 AZURE_LEASE_PERIOD = 60
 
+# The lease is renewed once it is older than this many seconds, which leaves
+# enough time for a renewal request to complete before the lease expires
+AZURE_LEASE_RENEW_INTERVAL = AZURE_LEASE_PERIOD / 2
+
 
 class AzureBlobLease(object):
     """
     A class to help in leasing an azure blob and renewing the lease
+
+    The lease is only renewed when it is older than C{renew_interval}
+    seconds, so calling L{renew} before every request is cheap. While the
+    lease is held, a background thread also renews it so that it doesn't
+    expire during long running requests (e.g. a slow chunk upload). The
+    lease can safely be shared by multiple threads.
     """
-    def __init__(self, driver, object_path, use_lease):
+    def __init__(self, driver, object_path, use_lease,
+                 renew_interval=AZURE_LEASE_RENEW_INTERVAL,
+                 background_renewal=True):
         """
         @param driver: The Azure storage driver that is being used
         @type driver: L{AzureStorageDriver}
@@ -90,31 +125,65 @@ class AzureBlobLease(object):
 
         @param use_lease: Indicates if we must take a lease or not
         @type use_lease: C{bool}
+
+        @param renew_interval: Number of seconds after which the lease is
+                               renewed.
+        @type renew_interval: C{float}
+
+        @param background_renewal: Indicates if the lease must be renewed
+                                   from a background thread while it is
+                                   held.
+        @type background_renewal: C{bool}
         """
         self.object_path = object_path
         self.driver = driver
         self.use_lease = use_lease
         self.lease_id = None
         self.params = {'comp': 'lease'}
+        self.renew_interval = renew_interval
+        self.background_renewal = background_renewal
+
+        # Time at which the lease was acquired or last renewed
+        self.renewed_at = None
 
-    def renew(self):
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._renewer = None
+        self._renew_error = None
+
+    def renew(self, force=False):
         """
         Renew the lease if it is older than a predefined time period
+
+        @param force: Renew the lease even if it was renewed recently
+        @type force: C{bool}
         """
-        if self.lease_id is None:
-            return
+        with self._lock:
+            if self._renew_error is not None:
+                # The background renewal failed, so the lease might have
+                # been lost
+                raise self._renew_error
 
-        headers = {'x-ms-lease-action': 'renew',
-                   'x-ms-lease-id': self.lease_id,
-                   'x-ms-lease-duration': '60'}
+            if self.lease_id is None:
+                return
 
-        response = self.driver.connection.request(self.object_path,
-                                                  headers=headers,
-                                                  params=self.params,
-                                                  method='PUT')
+            if not force and self.renewed_at is not None and \
+               time.time() - self.renewed_at < self.renew_interval:
+                return
 
-        if response.status != httplib.OK:
-            raise LibcloudError('Unable to obtain lease', driver=self)
+            headers = {'x-ms-lease-action': 'renew',
+                       'x-ms-lease-id': self.lease_id,
+                       'x-ms-lease-duration': str(AZURE_LEASE_PERIOD)}
+
+            response = self.driver.connection.request(self.object_path,
+                                                      headers=headers,
+                                                      params=self.params,
+                                                      method='PUT')
+
+            if response.status != httplib.OK:
+                raise LibcloudError('Unable to obtain lease', driver=self)
+
+            self.renewed_at = time.time()
 
     def update_headers(self, headers):
         """
@@ -123,12 +192,29 @@ class AzureBlobLease(object):
         if self.lease_id:
             headers['x-ms-lease-id'] = self.lease_id
 
+    def _renew_in_background(self):
+        while True:
+            self._stopped.wait(self.renew_interval)
+
+            if self._stopped.is_set():
+                return
+
+            try:
+                self.renew()
+            except Exception:
+                e = sys.exc_info()[1]
+
+                with self._lock:
+                    if self._renew_error is None:
+                        self._renew_error = e
+                return
+
     def __enter__(self):
         if not self.use_lease:
             return self
 
         headers = {'x-ms-lease-action': 'acquire',
-                   'x-ms-lease-duration': '60'}
+                   'x-ms-lease-duration': str(AZURE_LEASE_PERIOD)}
 
         response = self.driver.connection.request(self.object_path,
                                                   headers=headers,
@@ -141,18 +227,33 @@ class AzureBlobLease(object):
             raise LibcloudError('Unable to obtain lease', driver=self)
 
         self.lease_id = response.headers['x-ms-lease-id']
+        self.renewed_at = time.time()
+
+        if self.background_renewal:
+            self._stopped.clear()
+            self._renewer = threading.Thread(target=self._renew_in_background)
+            self._renewer.daemon = True
+            self._renewer.start()
+
         return self
 
     def __exit__(self, type, value, traceback):
+        if self._renewer is not None:
+            self._stopped.set()
+            self._renewer.join()
+            self._renewer = None
+
         if self.lease_id is None:
             return
 
         headers = {'x-ms-lease-action': 'release',
                    'x-ms-lease-id': self.lease_id}
-        response = self.driver.connection.request(self.object_path,
-                                                  headers=headers,
-                                                  params=self.params,
-                                                  method='PUT')
+
+        with self._lock:
+            response = self.driver.connection.request(self.object_path,
+                                                      headers=headers,
+                                                      params=self.params,
+                                                      method='PUT')
 
         if response.status != httplib.OK:
             raise LibcloudError('Unable to release lease', driver=self)
@@ -383,20 +484,69 @@ class AzureBlobsStorageDriver(StorageDriver):
             if not params['marker']:
                 break
 
-    def iterate_container_objects(self, container):
+    def iterate_container_objects(self, container, ex_prefix=None,
+                                  ex_delimiter=None, ex_prefetch=0):
         """
         @inherits: L{StorageDriver.iterate_container_objects}
+
+        @param ex_prefix: Only return blobs starting with ex_prefix
+        @type ex_prefix: C{str}
+
+        @param ex_delimiter: Don't return blobs whose name contains
+                             ex_delimiter after the prefix.
+        @type ex_delimiter: C{str}
+
+        @param ex_prefetch: Number of pages which are requested in the
+                            background while the current page is being
+                            consumed (0 to disable prefetching).
+        @type ex_prefetch: C{int}
         """
         params = {'restype': 'container',
                   'comp': 'list',
                   'maxresults': RESPONSES_PER_REQUEST,
                   'include': 'metadata'}
 
+        if ex_prefix:
+            params['prefix'] = ex_prefix
+        if ex_delimiter:
+            params['delimiter'] = ex_delimiter
+
+        pages = self._iterate_container_object_pages(container, params)
+        return self._iterate_pages(pages, prefetch_depth=ex_prefetch)
+
+    def _iterate_container_level(self, container, prefix, delimiter):
+        params = {'restype': 'container',
+                  'comp': 'list',
+                  'maxresults': RESPONSES_PER_REQUEST,
+                  'include': 'metadata',
+                  'delimiter': delimiter}
+        if prefix:
+            params['prefix'] = prefix
+
+        prefixes = []
+
+        for page in self._iterate_container_object_pages(container, params,
+                                                         prefixes=prefixes):
+            objects = list(page)
+            yield objects, prefixes[:]
+            del prefixes[:]
+
+    def _iterate_container_object_pages(self, container, params,
+                                        prefixes=None):
+        """
+        Return a generator which yields a generator of the blobs for every
+        page of the listing. Blobs are parsed while the response is still
+        being read and the next page is only requested once the current
+        page has been consumed.
+
+        If a list is passed in as prefixes, blob prefixes (returned when a
+        delimiter is used) are appended to it once a page has been consumed.
+        """
         container_path = self._get_container_path(container)
 
         while True:
             response = self.connection.request(container_path,
-                                               params=params)
+                                               params=params, stream=True)
 
             if response.status == httplib.NOT_FOUND:
                 raise ContainerDoesNotExistError(value=None,
@@ -407,17 +557,31 @@ class AzureBlobsStorageDriver(StorageDriver):
                 raise LibcloudError('Unexpected status code: %s' %
                                     (response.status), driver=self)
 
-            body = response.parse_body()
-            blobs = body.find(fixxpath(xpath='Blobs'))
-            blobs = blobs.findall(fixxpath(xpath='Blob'))
+            objects = self._iterate_page_objects(response, container,
+                                                 prefixes)
+            yield objects
 
-            for blob in blobs:
-                yield self._xml_to_object(container, blob)
+            # The rest of the page is parsed if it hasn't been consumed
+            for _ in objects:
+                pass
+
+            params['marker'] = response.object.findtext('NextMarker')
 
-            params['marker'] = body.findtext('NextMarker')
             if not params['marker']:
                 break
 
+    def _iterate_page_objects(self, response, container, prefixes):
+        """
+        Return a generator which yields the blobs of a single page of the
+        listing.
+        """
+        for blob in response.iterparse(xpath='Blobs/Blob'):
+            yield self._xml_to_object(container, blob)
+
+        if prefixes is not None:
+            prefixes.extend([e.text for e in response.object.findall(
+                'Blobs/BlobPrefix/Name')])
+
     def get_container(self, container_name):
         """
         @inherits: L{StorageDriver.get_container}
@@ -540,10 +704,28 @@ class AzureBlobsStorageDriver(StorageDriver):
         return False
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
-                        delete_on_failure=True):
+                        delete_on_failure=True, ex_workers=1,
+                        ex_part_size=None, ex_resume=False):
         """
         @inherits: L{StorageDriver.download_object}
+
+        @param ex_workers: Number of parts which are downloaded in parallel
+                           using range requests.
+        @type ex_workers: C{int}
+
+        @param ex_part_size: Size of a single range request in bytes.
+        @type ex_part_size: C{int}
+
+        @param ex_resume: True to resume a previously failed download.
+        @type ex_resume: C{bool}
         """
+        if ex_workers > 1 or ex_resume:
+            return self._download_object_in_parts(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure, part_size=ex_part_size,
+                workers=ex_workers, resume=ex_resume)
+
         obj_path = self._get_object_path(obj.container, obj.name)
         response = self.connection.request(obj_path, raw=True, data=None)
 
@@ -557,10 +739,23 @@ class AzureBlobsStorageDriver(StorageDriver):
                                     'delete_on_failure': delete_on_failure},
                                 success_status_code=httplib.OK)
 
-    def download_object_as_stream(self, obj, chunk_size=None):
+    def download_object_as_stream(self, obj, chunk_size=None,
+                                  ex_start_bytes=None, ex_end_bytes=None):
         """
         @inherits: L{StorageDriver.download_object_as_stream}
+
+        @param ex_start_bytes: Offset of the first byte to return.
+        @type ex_start_bytes: C{int}
+
+        @param ex_end_bytes: Offset of the byte after the last byte to
+                             return (exclusive).
+        @type ex_end_bytes: C{int}
         """
+        if ex_start_bytes is not None or ex_end_bytes is not None:
+            return self._download_object_range_as_stream(
+                obj=obj, start_bytes=ex_start_bytes or 0,
+                end_bytes=ex_end_bytes, chunk_size=chunk_size)
+
         obj_path = self._get_object_path(obj.container, obj.name)
         response = self.connection.request(obj_path, raw=True, data=None)
 
@@ -570,11 +765,27 @@ class AzureBlobsStorageDriver(StorageDriver):
                                                  'chunk_size': chunk_size},
                                 success_status_code=httplib.OK)
 
+    def _get_object_range(self, obj, start_bytes, end_bytes=None):
+        obj_path = self._get_object_path(obj.container, obj.name)
+        headers = {'x-ms-range': self._get_range_header(start_bytes,
+                                                        end_bytes)}
+
+        return self.connection.request(obj_path, headers=headers, raw=True,
+                                       data=None)
+
     def _upload_in_chunks(self, response, data, iterator, object_path,
-                          blob_type, lease, calculate_hash=True):
+                          blob_type, lease, calculate_hash=True,
+                          chunk_size=AZURE_CHUNK_SIZE, workers=1,
+                          sparse_file=False):
         """
         Uploads data from an interator in fixed sized chunks to S3
 
+        Block blobs are uploaded as uncommitted blocks which are committed
+        once all of them have been uploaded. Page blobs are uploaded by
+        writing each chunk to its own page range, skipping pages which only
+        contain zeros. In both cases up to C{workers} chunks are uploaded in
+        parallel.
+
         @param response: Response object from the initial POST request
         @type response: L{RawResponse}
 
@@ -596,6 +807,21 @@ class AzureBlobsStorageDriver(StorageDriver):
         @keyword calculate_hash: Indicates if we must calculate the data hash
         @type calculate_hash: C{bool}
 
+        @keyword chunk_size: Size of a single block or page range in bytes
+        @type chunk_size: C{int}
+
+        @keyword workers: Number of chunks which are uploaded in parallel. At
+                          most chunk_size * workers bytes are buffered in
+                          memory.
+        @type workers: C{int}
+
+        @keyword sparse_file: Indicates that the iterator is a file object of
+                              a (possibly sparse) file which is uploaded to a
+                              page blob. Only the regions of the file which
+                              contain data are read, so the hash of the data
+                              is not calculated.
+        @type sparse_file: C{bool}
+
         @return: A tuple of (status, checksum, bytes transferred)
         @rtype: C{tuple}
         """
@@ -606,72 +832,61 @@ class AzureBlobsStorageDriver(StorageDriver):
                                 (response.status), driver=self)
 
         data_hash = None
-        if calculate_hash:
+        if calculate_hash and not sparse_file:
             data_hash = self._get_hash_function()
 
-        bytes_transferred = 0
-        count = 1
-        chunks = []
-        headers = {}
+        def read_chunks():
+            if sparse_file:
+                for chunk in self._read_sparse_chunks(iterator, chunk_size):
+                    yield chunk
+                return
 
-        lease.update_headers(headers)
+            count = 1
+            offset = 0
 
-        if blob_type == 'BlockBlob':
-            params = {'comp': 'block'}
-        else:
-            params = {'comp': 'page'}
-
-        # Read the input data in chunk sizes suitable for AWS
-        for data in read_in_chunks(iterator, AZURE_CHUNK_SIZE):
-            data = b(data)
-            content_length = len(data)
-            offset = bytes_transferred
-            bytes_transferred += content_length
-
-            if calculate_hash:
-                data_hash.update(data)
-
-            chunk_hash = self._get_hash_function()
-            chunk_hash.update(data)
-            chunk_hash = base64.b64encode(b(chunk_hash.digest()))
-
-            headers['Content-MD5'] = chunk_hash.decode('utf-8')
-            headers['Content-Length'] = content_length
-
-            if blob_type == 'BlockBlob':
-                # Block id can be any unique string that is base64 encoded
-                # A 10 digit number can hold the max value of 50000 blocks
-                # that are allowed for azure
-                block_id = base64.b64encode(b('%10d' % (count)))
-                block_id = block_id.decode('utf-8')
-                params['blockid'] = block_id
-
-                # Keep this data for a later commit
-                chunks.append(block_id)
-            else:
-                headers['x-ms-page-write'] = 'update'
-                headers['x-ms-range'] = 'bytes=%d-%d' % \
-                                            (offset, bytes_transferred-1)
+            # Read the input data in chunk sizes suitable for Azure. All the
+            # chunks except the last one are exactly chunk_size bytes long
+            # so page ranges stay aligned
+            for data in read_in_chunks(iterator, chunk_size,
+                                       fill_size=True):
+                data = b(data)
+
+                if data_hash is not None:
+                    data_hash.update(data)
+
+                yield (count, offset, data)
+                count += 1
+                offset += len(data)
 
-            # Renew lease before updating
-            lease.renew()
+        def upload_chunk(chunk):
+            return retry(lambda: self._upload_chunk(object_path, blob_type,
+                                                    lease, *chunk),
+                         retries=AZURE_UPLOAD_RETRIES)
+
+        bytes_transferred = 0
+        chunks = []
 
-            resp = self.connection.request(object_path, method='PUT',
-                                           data=data, headers=headers,
-                                           params=params)
+        for ((count, offset, data), block_id) in parallel_map(upload_chunk,
+                                                              read_chunks(),
+                                                              workers=workers):
+            bytes_transferred = max(bytes_transferred, offset + len(data))
 
-            if resp.status != httplib.CREATED:
-                resp.parse_error()
-                raise LibcloudError('Error uploading chunk %d. Code: %d' %
-                                    (count, resp.status), driver=self)
+            # Keep this data for a later commit
+            chunks.append((count, block_id))
 
-            count += 1
+        chunks.sort()
 
-        if calculate_hash:
+        if sparse_file:
+            # Holes at the end of the file are not read
+            bytes_transferred = os.fstat(iterator.fileno()).st_size
+
+        if data_hash is not None:
             data_hash = data_hash.hexdigest()
 
         if blob_type == 'BlockBlob':
-            self._commit_blocks(object_path, chunks, lease)
+            self._commit_blocks(object_path,
+                                [block_id for (_, block_id) in chunks],
+                                lease)
 
         # The Azure service does not return a hash immediately for
         # chunked uploads. It takes some time for the data to get synced
@@ -679,6 +894,177 @@ class AzureBlobsStorageDriver(StorageDriver):
 
         return (True, data_hash, bytes_transferred)
 
+    def _read_sparse_chunks(self, file_handle, chunk_size):
+        """
+        Reads the regions of a sparse file which contain data in chunks.
+
+        Regions are extended to page boundaries, so all the chunks are page
+        aligned.
+
+        @param file_handle: The file object which is being uploaded
+        @type file_handle: C{file}
+
+        @param chunk_size: Maximum size of a chunk in bytes
+        @type chunk_size: C{int}
+
+        @return: A generator of (chunk_number, offset, data) tuples
+        @rtype: C{generator}
+        """
+        count = 1
+        position = 0
+
+        for (start, end) in get_data_ranges(file_handle):
+            start = max(start - start % AZURE_PAGE_CHUNK_SIZE, position)
+            end += -end % AZURE_PAGE_CHUNK_SIZE
+
+            if start >= end:
+                continue
+
+            file_handle.seek(start)
+            position = start
+
+            while position < end:
+                data = b(file_handle.read(min(chunk_size, end - position)))
+
+                if not data:
+                    break
+
+                yield (count, position, data)
+                count += 1
+                position += len(data)
+
+    def _get_page_ranges(self, data):
+        """
+        Returns the ranges of the data which contain non-zero pages.
+
+        Runs of non-zero pages which are separated by less than
+        C{AZURE_PAGE_MIN_ZERO_RUN} bytes of zero pages are merged.
+
+        @param data: Page aligned data.
+        @type data: C{bytes}
+
+        @return: A list of (start, end) offsets of runs of non-zero pages.
+        @rtype: C{list}
+        """
+        if data.count(b('\x00')) == len(data):
+            return []
+
+        ranges = []
+        start = None
+
+        for offset in range(0, len(data), AZURE_PAGE_CHUNK_SIZE):
+            page = data[offset:offset + AZURE_PAGE_CHUNK_SIZE]
+
+            if page == ZERO_PAGE[:len(page)]:
+                if start is not None:
+                    ranges.append((start, offset))
+                    start = None
+            elif start is None:
+                if ranges and offset - ranges[-1][1] < \
+                   AZURE_PAGE_MIN_ZERO_RUN:
+                    start = ranges.pop()[0]
+                else:
+                    start = offset
+
+        if start is not None:
+            ranges.append((start, len(data)))
+
+        return ranges
+
+    def _upload_chunk(self, object_path, blob_type, lease, count, offset,
+                      data):
+        """
+        Uploads a single block of a block blob or a single page range of a
+        page blob.
+
+        Page blobs are initialized with zeros when they are created, so the
+        pages which only contain zeros are not written.
+
+        @param object_path: Server side object path.
+        @type object_path: C{str}
+
+        @param blob_type: The blob type being uploaded
+        @type blob_type: C{str}
+
+        @param lease: The lease object to be used for renewal
+        @type lease: L{AzureBlobLease}
+
+        @param count: Number of the chunk (starting with 1).
+        @type count: C{int}
+
+        @param offset: Offset of the chunk in the blob.
+        @type offset: C{int}
+
+        @param data: Chunk data.
+        @type data: C{bytes}
+
+        @return: The block id for block blobs, C{None} for page blobs.
+        @rtype: C{str}
+        """
+        if blob_type == 'BlockBlob':
+            # Block id can be any unique string that is base64 encoded
+            # A 10 digit number can hold the max value of 50000 blocks
+            # that are allowed for azure
+            block_id = base64.b64encode(b('%10d' % (count)))
+            block_id = block_id.decode('utf-8')
+            params = {'comp': 'block', 'blockid': block_id}
+
+            self._put_chunk(object_path, lease, count, data, params, {})
+            return block_id
+
+        for (start, end) in self._get_page_ranges(data):
+            headers = {'x-ms-page-write': 'update',
+                       'x-ms-range': 'bytes=%d-%d' % (offset + start,
+                                                      offset + end - 1)}
+
+            self._put_chunk(object_path, lease, count, data[start:end],
+                            {'comp': 'page'}, headers)
+
+        return None
+
+    def _put_chunk(self, object_path, lease, count, data, params, headers):
+        """
+        Sends a single block or page range.
+
+        @param object_path: Server side object path.
+        @type object_path: C{str}
+
+        @param lease: The lease object to be used for renewal
+        @type lease: L{AzureBlobLease}
+
+        @param count: Number of the chunk (starting with 1).
+        @type count: C{int}
+
+        @param data: Data to be sent.
+        @type data: C{bytes}
+
+        @param params: Request parameters.
+        @type params: C{dict}
+
+        @param headers: Request headers.
+        @type headers: C{dict}
+        """
+        chunk_hash = self._get_hash_function()
+        chunk_hash.update(data)
+        chunk_hash = base64.b64encode(b(chunk_hash.digest()))
+
+        headers['Content-MD5'] = chunk_hash.decode('utf-8')
+        headers['Content-Length'] = len(data)
+
+        lease.update_headers(headers)
+
+        # Renew lease before updating
+        lease.renew()
+
+        resp = self.connection.request(object_path, method='PUT',
+                                       data=data, headers=headers,
+                                       params=params)
+
+        if resp.status != httplib.CREATED:
+            resp.parse_error()
+            raise LibcloudError('Error uploading chunk %d. Code: %d' %
+                                (count, resp.status), driver=self)
+
     def _commit_blocks(self, object_path, chunks, lease):
         """
         Makes a final commit of the data.
@@ -710,7 +1096,8 @@ class AzureBlobsStorageDriver(StorageDriver):
         if response.status != httplib.CREATED:
             raise LibcloudError('Error in blocklist commit', driver=self)
 
-    def _check_values(self, blob_type, object_size):
+    def _check_values(self, blob_type, object_size,
+                      block_size=AZURE_CHUNK_SIZE):
         """
         Checks if extension arguments are valid
 
@@ -719,11 +1106,22 @@ class AzureBlobsStorageDriver(StorageDriver):
 
         @param object_size: The (max) size of the object being uploaded
         @type object_size: C{int}
+
+        @param block_size: The size of a single block or page range
+        @type block_size: C{int}
         """
 
         if blob_type not in ['BlockBlob', 'PageBlob']:
             raise LibcloudError('Invalid blob type', driver=self)
 
+        if block_size <= 0 or block_size > AZURE_CHUNK_SIZE:
+            raise LibcloudError('Block size must be between 1 and %d bytes' %
+                                (AZURE_CHUNK_SIZE), driver=self)
+
+        if blob_type == 'PageBlob' and block_size % AZURE_PAGE_CHUNK_SIZE:
+            raise LibcloudError('Block size is not aligned to page boundary',
+                                driver=self)
+
         if blob_type == 'PageBlob':
             if not object_size:
                 raise LibcloudError('Max blob size is mandatory for page blob',
@@ -734,7 +1132,8 @@ class AzureBlobsStorageDriver(StorageDriver):
                                     'page boundary', driver=self)
 
     def upload_object(self, file_path, container, object_name, extra=None,
-                      verify_hash=True, ex_blob_type=None, ex_use_lease=False):
+                      verify_hash=True, ex_blob_type=None, ex_use_lease=False,
+                      ex_block_size=AZURE_CHUNK_SIZE, ex_workers=1):
         """
         Upload an object currently located on a disk.
 
@@ -745,6 +1144,16 @@ class AzureBlobsStorageDriver(StorageDriver):
 
         @param ex_use_lease: Indicates if we must take a lease before upload
         @type ex_use_lease: C{bool}
+
+        @param ex_block_size: Size of a single block (or page range for page
+                              blobs) in bytes when the object is uploaded in
+                              chunks
+        @type ex_block_size: C{int}
+
+        @param ex_workers: Number of blocks which are uploaded in parallel.
+                           At most ex_block_size * ex_workers bytes are
+                           buffered in memory.
+        @type ex_workers: C{int}
         """
 
         if ex_blob_type is None:
@@ -756,10 +1165,11 @@ class AzureBlobsStorageDriver(StorageDriver):
         # The presumed size of the object
         object_size = file_size
 
-        self._check_values(ex_blob_type, file_size)
+        self._check_values(ex_blob_type, file_size, ex_block_size)
 
         with file(file_path, 'rb') as file_handle:
-            iterator = iter(file_handle)
+            # File object is read in fixed size blocks by read_in_chunks
+            iterator = file_handle
 
             # If size is greater than 64MB or type is Page, upload in chunks
             if ex_blob_type == 'PageBlob' or file_size > AZURE_BLOCK_MAX_SIZE:
@@ -770,11 +1180,17 @@ class AzureBlobsStorageDriver(StorageDriver):
 
                 object_path = self._get_object_path(container, object_name)
 
+                # Holes of sparse files (e.g. disk images) are not read
+                sparse_file = ex_blob_type == 'PageBlob'
+
                 upload_func = self._upload_in_chunks
                 upload_func_kwargs = {'iterator': iterator,
                                       'object_path': object_path,
                                       'blob_type': ex_blob_type,
-                                      'lease': None}
+                                      'lease': None,
+                                      'chunk_size': ex_block_size,
+                                      'workers': ex_workers,
+                                      'sparse_file': sparse_file}
             else:
                 upload_func = self._stream_data
                 upload_func_kwargs = {'iterator': iterator,
@@ -794,7 +1210,8 @@ class AzureBlobsStorageDriver(StorageDriver):
     def upload_object_via_stream(self, iterator, container, object_name,
                                  verify_hash=False, extra=None,
                                  ex_use_lease=False, ex_blob_type=None,
-                                 ex_page_blob_size=None):
+                                 ex_page_blob_size=None,
+                                 ex_block_size=AZURE_CHUNK_SIZE, ex_workers=1):
         """
         @inherits: L{StorageDriver.upload_object_via_stream}
 
@@ -807,12 +1224,21 @@ class AzureBlobsStorageDriver(StorageDriver):
 
         @param ex_use_lease: Indicates if we must take a lease before upload
         @type ex_use_lease: C{bool}
+
+        @param ex_block_size: Size of a single block (or page range for page
+                              blobs) in bytes
+        @type ex_block_size: C{int}
+
+        @param ex_workers: Number of blocks which are uploaded in parallel.
+                           At most ex_block_size * ex_workers bytes are
+                           buffered in memory.
+        @type ex_workers: C{int}
         """
 
         if ex_blob_type is None:
             ex_blob_type = self.ex_blob_type
 
-        self._check_values(ex_blob_type, ex_page_blob_size)
+        self._check_values(ex_blob_type, ex_page_blob_size, ex_block_size)
 
         object_path = self._get_object_path(container, object_name)
 
@@ -820,7 +1246,9 @@ class AzureBlobsStorageDriver(StorageDriver):
         upload_func_kwargs = {'iterator': iterator,
                               'object_path': object_path,
                               'blob_type': ex_blob_type,
-                              'lease': None}
+                              'lease': None,
+                              'chunk_size': ex_block_size,
+                              'workers': ex_workers}
 
         return self._put_object(container=container,
                                 object_name=object_name,
@@ -846,6 +1274,108 @@ class AzureBlobsStorageDriver(StorageDriver):
 
         return False
 
+    def _copy_object(self, obj, container, object_name, extra):
+        """
+        Copy a blob using the Copy Blob operation
+
+        Copies within a storage account usually complete immediately,
+        otherwise the status of the copy is polled until it completes. A
+        copy which doesn't complete within AZURE_COPY_TIMEOUT seconds is
+        aborted.
+
+        @param obj: The blob to copy
+        @type obj: L{Object}
+
+        @param container: The destination container
+        @type container: L{Container}
+
+        @param object_name: The name of the copy
+        @type object_name: C{str}
+
+        @param extra: If it contains meta data, it replaces the meta data
+                      of the source blob
+        @type extra: C{dict}
+
+        @return: The copy
+        @rtype: L{Object}
+        """
+        extra = extra or {}
+        meta_data = extra.get('meta_data', None)
+
+        scheme = self.connection.secure and 'https' or 'http'
+        source_url = '%s://%s%s' % (scheme, self.connection.host,
+                                    self._get_object_path(obj.container,
+                                                          obj.name))
+        headers = {'x-ms-copy-source': source_url}
+
+        if meta_data:
+            self._update_metadata(headers, meta_data)
+
+        object_path = self._get_object_path(container, object_name)
+        response = self.connection.request(object_path, method='PUT',
+                                           headers=headers)
+
+        if response.status == httplib.NOT_FOUND:
+            raise ObjectDoesNotExistError(value=None, driver=self,
+                                          object_name=obj.name)
+        elif response.status != httplib.ACCEPTED:
+            response.parse_error()
+            raise LibcloudError('Unexpected status code, status_code=%s' %
+                                (response.status), driver=self)
+
+        headers = response.headers
+        status = headers.get('x-ms-copy-status', 'success')
+        copy_id = headers.get('x-ms-copy-id', None)
+
+        deadline = time.time() + AZURE_COPY_TIMEOUT
+        interval = AZURE_COPY_POLL_INTERVAL
+
+        while status == 'pending':
+            if time.time() >= deadline:
+                self._abort_copy(object_path, copy_id)
+                raise LibcloudError('Copy of blob %s did not complete '
+                                    'within %s seconds' %
+                                    (obj.name, AZURE_COPY_TIMEOUT),
+                                    driver=self)
+
+            time.sleep(interval)
+            interval = min(interval * 2, AZURE_COPY_MAX_POLL_INTERVAL)
+
+            response = self.connection.request(object_path, method='HEAD')
+            headers = response.headers
+            status = headers.get('x-ms-copy-status', 'success')
+
+        if status != 'success':
+            raise LibcloudError('Unable to copy blob %s: %s' %
+                                (obj.name, status), driver=self)
+
+        return Object(name=object_name, size=obj.size,
+                      hash=headers.get('etag', None),
+                      extra={'last_modified': headers.get('last-modified',
+                                                          None)},
+                      meta_data=meta_data or obj.meta_data,
+                      container=container, driver=self)
+
+    def _abort_copy(self, object_path, copy_id):
+        """
+        Abort a pending copy using the Abort Copy Blob operation
+
+        @param object_path: The path of the destination blob
+        @type object_path: C{str}
+
+        @param copy_id: The id of the copy
+        @type copy_id: C{str}
+        """
+        params = {'comp': 'copy', 'copyid': copy_id}
+        headers = {'x-ms-copy-action': 'abort'}
+
+        response = self.connection.request(object_path, method='PUT',
+                                           params=params, headers=headers)
+
+        if response.status != httplib.NO_CONTENT:
+            raise LibcloudError('Unable to abort the copy, status_code=%s' %
+                                (response.status), driver=self)
+
     def _update_metadata(self, headers, meta_data):
         """
         Update the given metadata in the headers
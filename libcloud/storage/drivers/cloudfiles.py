@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
 from hashlib import sha1
 import hmac
 import os
@@ -29,13 +31,17 @@ except ImportError:
 from libcloud.utils.py3 import PY3
 from libcloud.utils.py3 import b
 from libcloud.utils.py3 import urlquote
+from libcloud.utils.py3 import urlunquote
 
 if PY3:
     from io import FileIO as file
 
-from libcloud.utils.files import read_in_chunks
+from libcloud.utils.files import read_in_chunks, pread
+from libcloud.utils.concurrency import parallel_map, retry
 from libcloud.common.types import MalformedResponseError, LibcloudError
+from libcloud.common.types import InvalidCredsError
 from libcloud.common.base import Response, RawResponse
+from libcloud.common.base import RequestStateAttribute
 
 from libcloud.storage.providers import Provider
 from libcloud.storage.base import Object, Container, StorageDriver
@@ -53,12 +59,31 @@ from libcloud.common.rackspace import AUTH_URL_US, AUTH_URL_UK
 CDN_HOST = 'cdn.clouddrive.com'
 API_VERSION = 'v1.0'
 
+# Size of the blocks in which segments are read to verify their hash
+CHUNK_SIZE = 1024 * 1024
+
+# Maximum number of objects which can be deleted using a single bulk delete
+# request (the default limit of the Swift bulk middleware)
+BULK_DELETE_BATCH_SIZE = 10000
+
+# Number of times a single segment of a multipart upload is retried before
+# the whole upload fails
+SEGMENT_UPLOAD_RETRIES = 3
+
 
 class CloudFilesResponse(Response):
-    valid_response_codes = [httplib.NOT_FOUND, httplib.CONFLICT]
+    # 501 is returned for requests to middleware which isn't available (e.g.
+    # bulk delete)
+    valid_response_codes = [httplib.NOT_FOUND, httplib.CONFLICT,
+                            httplib.NOT_IMPLEMENTED]
 
     def success(self):
         i = int(self.status)
+
+        if i == httplib.UNAUTHORIZED:
+            # Token has been revoked or has expired
+            raise InvalidCredsError(self.body)
+
         return i >= 200 and i <= 299 or i in self.valid_response_codes
 
     def parse_body(self):
@@ -103,6 +128,8 @@ class CloudFilesConnection(OpenStackBaseConnection):
     responseCls = CloudFilesResponse
     rawResponseCls = CloudFilesRawResponse
 
+    cdn_request = RequestStateAttribute('cdn_request', False)
+
     def __init__(self, user_id, key, secure=True, auth_url=AUTH_URL_US,
                  **kwargs):
         super(CloudFilesConnection, self).__init__(user_id, key, secure=secure,
@@ -202,6 +229,8 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
     connectionCls = CloudFilesConnection
     hash_type = 'md5'
     supports_chunked_encoding = True
+    supports_list_marker = True
+    supports_bulk_delete = True
 
     def __init__(self, key, secret=None, secure=True, host=None, port=None,
                  region='ord', **kwargs):
@@ -342,7 +371,28 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
                                            container_name=name, driver=self)
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
-                        delete_on_failure=True):
+                        delete_on_failure=True, ex_workers=1,
+                        ex_part_size=None, ex_resume=False):
+        """
+        @inherits: L{StorageDriver.download_object}
+
+        @param ex_workers: Number of parts which are downloaded in parallel
+                           using range requests.
+        @type ex_workers: C{int}
+
+        @param ex_part_size: Size of a single range request in bytes.
+        @type ex_part_size: C{int}
+
+        @param ex_resume: True to resume a previously failed download.
+        @type ex_resume: C{bool}
+        """
+        if ex_workers > 1 or ex_resume:
+            return self._download_object_in_parts(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure, part_size=ex_part_size,
+                workers=ex_workers, resume=ex_resume)
+
         container_name = obj.container.name
         object_name = obj.name
         response = self.connection.request('/%s/%s' % (container_name,
@@ -358,7 +408,23 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
                              'delete_on_failure': delete_on_failure},
             success_status_code=httplib.OK)
 
-    def download_object_as_stream(self, obj, chunk_size=None):
+    def download_object_as_stream(self, obj, chunk_size=None,
+                                  ex_start_bytes=None, ex_end_bytes=None):
+        """
+        @inherits: L{StorageDriver.download_object_as_stream}
+
+        @param ex_start_bytes: Offset of the first byte to return.
+        @type ex_start_bytes: C{int}
+
+        @param ex_end_bytes: Offset of the byte after the last byte to
+                             return (exclusive).
+        @type ex_end_bytes: C{int}
+        """
+        if ex_start_bytes is not None or ex_end_bytes is not None:
+            return self._download_object_range_as_stream(
+                obj=obj, start_bytes=ex_start_bytes or 0,
+                end_bytes=ex_end_bytes, chunk_size=chunk_size)
+
         container_name = obj.container.name
         object_name = obj.name
         response = self.connection.request('/%s/%s' % (container_name,
@@ -371,6 +437,16 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
                                                  'chunk_size': chunk_size},
                                 success_status_code=httplib.OK)
 
+    def _get_object_range(self, obj, start_bytes, end_bytes=None):
+        container_name = obj.container.name
+        object_name = obj.name
+        headers = {'Range': self._get_range_header(start_bytes, end_bytes)}
+
+        return self.connection.request('/%s/%s' % (container_name,
+                                                   object_name),
+                                       method='GET', headers=headers,
+                                       raw=True)
+
     def upload_object(self, file_path, container, object_name, extra=None,
                       verify_hash=True):
         """
@@ -379,7 +455,8 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
         Note: This will override file with a same name if it already exists.
         """
         upload_func = self._upload_file
-        upload_func_kwargs = {'file_path': file_path}
+        upload_func_kwargs = {'file_path': file_path,
+                              'calculate_hash': verify_hash}
 
         return self._put_object(container=container, object_name=object_name,
                                 upload_func=upload_func,
@@ -415,6 +492,102 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
 
         raise LibcloudError('Unexpected status code: %s' % (response.status))
 
+    def _copy_object(self, obj, container, object_name, extra):
+        """
+        Copy an object using a PUT request with the X-Copy-From header.
+
+        Meta data from extra is added to the meta data of the source object.
+        """
+        extra = extra or {}
+        source_container = self._encode_container_name(obj.container.name)
+        source_path = '/%s/%s' % (source_container,
+                                  self._encode_object_name(obj.name))
+        headers = {'X-Copy-From': source_path, 'Content-Length': '0'}
+        content_type = extra.get('content_type', None)
+        meta_data = extra.get('meta_data', None)
+
+        if content_type:
+            headers['Content-Type'] = content_type
+
+        for key, value in list((meta_data or {}).items()):
+            headers['X-Object-Meta-%s' % (key)] = value
+
+        request_path = '/%s/%s' % (self._encode_container_name(container.name),
+                                   self._encode_object_name(object_name))
+        response = self.connection.request(request_path, method='PUT',
+                                           data='', headers=headers)
+
+        if response.status == httplib.NOT_FOUND:
+            raise ObjectDoesNotExistError(value='', object_name=obj.name,
+                                          driver=self)
+        elif response.status != httplib.CREATED:
+            raise LibcloudError('Unexpected status code: %s' %
+                                (response.status), driver=self)
+
+        return Object(name=object_name, size=obj.size,
+                      hash=response.headers.get('etag', obj.hash),
+                      extra={'last_modified':
+                             response.headers.get('last-modified', None)},
+                      meta_data=meta_data or obj.meta_data,
+                      container=container, driver=self)
+
+    def _get_delete_batch_size(self):
+        if self.supports_bulk_delete:
+            return BULK_DELETE_BATCH_SIZE
+
+        return 1
+
+    def _delete_object_batch(self, container, objects):
+        """
+        Delete objects using a single request to the bulk delete middleware.
+
+        If the middleware isn't available (the request returns 404 or 501,
+        or it's handled as an account update), objects are deleted one by
+        one and bulk delete isn't used anymore by this driver instance.
+        Other failures only fail the objects of this batch.
+        """
+        if not self.supports_bulk_delete or len(objects) == 1:
+            return super(CloudFilesStorageDriver, self)._delete_object_batch(
+                container, objects)
+
+        container_name = self._encode_container_name(container.name)
+        paths = ['/%s/%s' % (container_name,
+                             self._encode_object_name(obj.name))
+                 for obj in objects]
+
+        headers = {'Content-Type': 'text/plain',
+                   'Accept': 'application/json'}
+        response = self.connection.request('', method='POST',
+                                           params={'bulk-delete': 'true'},
+                                           data='\n'.join(paths),
+                                           headers=headers)
+        body = response.object
+        status = int(response.status)
+
+        if status in [httplib.NOT_FOUND, httplib.NOT_IMPLEMENTED] or \
+           (status // 100 == 2 and
+                not (isinstance(body, dict) and 'Number Deleted' in body)):
+            self.supports_bulk_delete = False
+            return super(CloudFilesStorageDriver, self)._delete_object_batch(
+                container, objects)
+        elif status != httplib.OK:
+            raise LibcloudError('Unexpected status code: %s' % (status),
+                                driver=self)
+
+        errors = {}
+        for (path, status) in body.get('Errors', []):
+            errors[urlunquote(path)] = LibcloudError(
+                'Unable to delete object %s: %s' % (path, status),
+                driver=self)
+
+        response_status = body.get('Response Status', '200 OK')
+
+        if not errors and not response_status.startswith('2'):
+            raise LibcloudError('Bulk delete failed: %s' % (response_status),
+                                driver=self)
+
+        return [errors.get(urlunquote(path), True) for path in paths]
+
     def ex_purge_object_from_cdn(self, obj, email=None):
         """
         Purge edge cache for the specified object.
@@ -462,26 +635,113 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
 
     def ex_multipart_upload_object(self, file_path, container, object_name,
                                    chunk_size=33554432, extra=None,
-                                   verify_hash=True):
+                                   verify_hash=True, ex_workers=1,
+                                   ex_resume=False):
+        """
+        Upload a large object as a set of segments and a manifest object
+        which joins them.
+
+        Segments are read directly from their offsets in the file and up to
+        ``ex_workers`` of them are uploaded in parallel. A segment whose
+        upload fails (including an ETag mismatch if ``verify_hash`` is
+        True) is retried up to ``SEGMENT_UPLOAD_RETRIES`` times.
+
+        :param ex_workers: Number of segments which are uploaded in
+                           parallel.
+        :type ex_workers: ``int``
+
+        :param ex_resume: Skip segments which have already been uploaded
+                          by a previous (interrupted) call. A segment is
+                          only skipped if its size and hash match the local
+                          data.
+        :type ex_resume: ``bool``
+        """
         object_size = os.path.getsize(file_path)
         if object_size < chunk_size:
             return self.upload_object(file_path, container, object_name,
                                       extra=extra, verify_hash=verify_hash)
 
-        iter_chunk_reader = FileChunkReader(file_path, chunk_size)
-
-        for index, iterator in enumerate(iter_chunk_reader):
-            self._upload_object_part(container=container,
-                                     object_name=object_name,
-                                     part_number=index,
-                                     iterator=iterator,
-                                     verify_hash=verify_hash)
+        with open(file_path, 'rb') as file_handle:
+            fileno = file_handle.fileno()
+            iter_chunk_reader = FileChunkReader(file_path, chunk_size,
+                                                fileno=fileno)
+            segments = [(index, iterator.start_block, iterator.end_block)
+                        for (index, iterator) in enumerate(iter_chunk_reader)]
+
+            if ex_resume:
+                uploaded = self._get_uploaded_segments(container, object_name)
+                segments = [segment for segment in segments
+                            if not self._is_segment_uploaded(
+                                fileno, segment, uploaded.get(segment[0]))]
+
+            def upload_segment(segment):
+                (index, start_block, end_block) = segment
+
+                def upload():
+                    iterator = ChunkStreamReader(file_path=file_path,
+                                                 start_block=start_block,
+                                                 end_block=end_block,
+                                                 chunk_size=8192,
+                                                 fileno=fileno)
+                    return self._upload_object_part(container=container,
+                                                    object_name=object_name,
+                                                    part_number=index,
+                                                    iterator=iterator,
+                                                    verify_hash=verify_hash)
+
+                return retry(upload, retries=SEGMENT_UPLOAD_RETRIES)
+
+            for _ in parallel_map(upload_segment, segments,
+                                  workers=ex_workers):
+                pass
 
         return self._upload_object_manifest(container=container,
                                             object_name=object_name,
                                             extra=extra,
                                             verify_hash=verify_hash)
 
+    def _get_uploaded_segments(self, container, object_name):
+        """
+        Return the segments of an object which have already been uploaded.
+
+        :return: A dictionary which maps segment numbers to objects.
+        :rtype: ``dict``
+        """
+        prefix = object_name + '/'
+        segments = {}
+
+        for obj in self.iterate_container_objects(container,
+                                                  ex_prefix=prefix):
+            part_number = obj.name[len(prefix):]
+
+            if len(part_number) == 8 and part_number.isdigit():
+                segments[int(part_number)] = obj
+
+        return segments
+
+    def _is_segment_uploaded(self, fileno, segment, obj):
+        """
+        Check if an uploaded segment object matches the local data.
+        """
+        (index, start_block, end_block) = segment
+
+        if obj is None or obj.size != end_block - start_block:
+            return False
+
+        hash_function = self._get_hash_function()
+        offset = start_block
+
+        while offset < end_block:
+            data = pread(fileno, min(CHUNK_SIZE, end_block - offset), offset)
+
+            if not data:
+                return False
+
+            hash_function.update(data)
+            offset += len(data)
+
+        return hash_function.hexdigest() == obj.hash
+
     def ex_enable_static_website(self, container, index_file='index.html'):
         """
         Enable serving a static website.
@@ -644,7 +904,8 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
 
         return obj
 
-    def list_container_objects(self, container, ex_prefix=None):
+    def list_container_objects(self, container, ex_prefix=None,
+                               ex_delimiter=None):
         """
         Return a list of objects for the given container.
 
@@ -654,13 +915,19 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
         :param ex_prefix: Only get objects with names starting with ex_prefix
         :type ex_prefix: ``str``
 
+        :param ex_delimiter: Don't return objects whose name contains
+                             ex_delimiter after the prefix.
+        :type ex_delimiter: ``str``
+
         :return: A list of Object instances.
         :rtype: ``list`` of :class:`Object`
         """
         return list(self.iterate_container_objects(container,
-            ex_prefix=ex_prefix))
+            ex_prefix=ex_prefix, ex_delimiter=ex_delimiter))
 
-    def iterate_container_objects(self, container, ex_prefix=None):
+    def iterate_container_objects(self, container, ex_prefix=None,
+                                  ex_delimiter=None, ex_prefetch=0,
+                                  ex_marker=None):
         """
         Return a generator of objects for the given container.
 
@@ -670,13 +937,55 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
         :param ex_prefix: Only get objects with names starting with ex_prefix
         :type ex_prefix: ``str``
 
+        :param ex_delimiter: Don't return objects whose name contains
+                             ex_delimiter after the prefix.
+        :type ex_delimiter: ``str``
+
+        :param ex_prefetch: Number of pages which are requested in the
+                            background while the current page is being
+                            consumed (0 to disable prefetching).
+        :type ex_prefetch: ``int``
+
+        :param ex_marker: Only return objects whose names are greater than
+                          ex_marker.
+        :type ex_marker: ``str``
+
         :return: A generator of Object instances.
         :rtype: ``generator`` of :class:`Object`
         """
         params = {}
         if ex_prefix:
             params['prefix'] = ex_prefix
+        if ex_delimiter:
+            params['delimiter'] = ex_delimiter
+        if ex_marker:
+            params['marker'] = ex_marker
+
+        pages = self._iterate_container_object_pages(container, params)
+        return self._iterate_pages(pages, prefetch_depth=ex_prefetch)
+
+    def _iterate_container_level(self, container, prefix, delimiter):
+        params = {'delimiter': delimiter}
+        if prefix:
+            params['prefix'] = prefix
 
+        prefixes = []
+
+        for page in self._iterate_container_object_pages(container, params,
+                                                         prefixes=prefixes):
+            objects = list(page)
+            yield objects, prefixes[:]
+            del prefixes[:]
+
+    def _iterate_container_object_pages(self, container, params,
+                                        prefixes=None):
+        """
+        Return a generator which yields a generator of the objects for every
+        page of the listing.
+
+        If a list is passed in as prefixes, pseudo-directories (returned
+        when a delimiter is used) are appended to it.
+        """
         while True:
             response = self.connection.request('/%s' % (container.name),
                                                params=params)
@@ -685,15 +994,22 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
                 # Empty or non-existent container
                 break
             elif response.status == httplib.OK:
-                objects = self._to_object_list(json.loads(response.body),
-                                               container)
+                entries = json.loads(response.body)
 
-                if len(objects) == 0:
+                if len(entries) == 0:
                     break
 
-                for obj in objects:
-                    yield obj
-                params['marker'] = obj.name
+                # Entries for pseudo-directories (returned when a delimiter
+                # is used) only have a subdir attribute
+                last_entry = entries[-1]
+                params['marker'] = last_entry.get('name',
+                                                  last_entry.get('subdir'))
+
+                if prefixes is not None:
+                    prefixes.extend([e['subdir'] for e in entries
+                                     if 'subdir' in e])
+
+                yield self._iterate_objects(entries, container)
 
             else:
                 raise LibcloudError('Unexpected status code: %s' %
@@ -779,20 +1095,18 @@ class CloudFilesStorageDriver(StorageDriver, OpenStackDriverMixin):
                      'size': int(container['bytes'])}
             yield Container(name=container['name'], extra=extra, driver=self)
 
-    def _to_object_list(self, response, container):
-        objects = []
-
+    def _iterate_objects(self, response, container):
         for obj in response:
+            if 'subdir' in obj:
+                continue
+
             name = obj['name']
             size = int(obj['bytes'])
             hash = obj['hash']
             extra = {'content_type': obj['content_type'],
                      'last_modified': obj['last_modified']}
-            objects.append(Object(
-                name=name, size=size, hash=hash, extra=extra,
-                meta_data=None, container=container, driver=self))
-
-        return objects
+            yield Object(name=name, size=size, hash=hash, extra=extra,
+                         meta_data=None, container=container, driver=self)
 
     def _headers_to_container(self, name, headers):
         size = int(headers.get('x-container-bytes-used', 0))
@@ -873,10 +1187,11 @@ class CloudFilesUKStorageDriver(CloudFilesStorageDriver):
 
 
 class FileChunkReader(object):
-    def __init__(self, file_path, chunk_size):
+    def __init__(self, file_path, chunk_size, fileno=None):
         self.file_path = file_path
         self.total = os.path.getsize(file_path)
         self.chunk_size = chunk_size
+        self.fileno = fileno
         self.bytes_read = 0
         self.stop_iteration = False
 
@@ -896,16 +1211,31 @@ class FileChunkReader(object):
         return ChunkStreamReader(file_path=self.file_path,
                                  start_block=start_block,
                                  end_block=end_block,
-                                 chunk_size=8192)
+                                 chunk_size=8192,
+                                 fileno=self.fileno)
 
     def __next__(self):
         return self.next()
 
 
 class ChunkStreamReader(object):
-    def __init__(self, file_path, start_block, end_block, chunk_size):
-        self.fd = open(file_path, 'rb')
-        self.fd.seek(start_block)
+    """
+    Iterator over a part of a file.
+
+    If a file descriptor is provided, data is read with positional reads so
+    a single descriptor can be shared by readers in multiple threads.
+    Otherwise the file is opened by the reader.
+    """
+
+    def __init__(self, file_path, start_block, end_block, chunk_size,
+                 fileno=None):
+        self.fd = None
+
+        if fileno is None:
+            self.fd = open(file_path, 'rb')
+            fileno = self.fd.fileno()
+
+        self.fileno = fileno
         self.start_block = start_block
         self.end_block = end_block
         self.chunk_size = chunk_size
@@ -917,7 +1247,8 @@ class ChunkStreamReader(object):
 
     def next(self):
         if self.stop_iteration:
-            self.fd.close()
+            if self.fd is not None:
+                self.fd.close()
             raise StopIteration
 
         block_size = self.chunk_size
@@ -926,7 +1257,8 @@ class ChunkStreamReader(object):
             block_size = self.end_block - self.start_block - self.bytes_read
             self.stop_iteration = True
 
-        block = self.fd.read(block_size)
+        block = pread(self.fileno, block_size,
+                      self.start_block + self.bytes_read)
         self.bytes_read += block_size
         return block
 
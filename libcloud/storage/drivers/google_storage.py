@@ -134,3 +134,4 @@ class GoogleStorageDriver(S3StorageDriver):
     namespace = NAMESPACE
     supports_chunked_encoding = False
     supports_s3_multipart_upload = False
+    supports_s3_multi_delete = False
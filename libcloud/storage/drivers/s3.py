@@ -29,8 +29,9 @@ from libcloud.utils.py3 import urlencode
 from libcloud.utils.py3 import b
 from libcloud.utils.py3 import tostring
 
-from libcloud.utils.xml import fixxpath, findtext
+from libcloud.utils.xml import fixxpath, findtext, findall
 from libcloud.utils.files import read_in_chunks
+from libcloud.utils.concurrency import parallel_map, retry
 from libcloud.common.types import InvalidCredsError, LibcloudError
 from libcloud.common.base import ConnectionUserAndKey, RawResponse
 from libcloud.common.aws import AWSBaseResponse
@@ -59,6 +60,25 @@ NAMESPACE = 'http://s3.amazonaws.com/doc/%s/' % (API_VERSION)
 # AWS multi-part chunks must be minimum 5MB
 CHUNK_SIZE = 5 * 1024 * 1024
 
+# Maximum number of keys which can be deleted using a single Multi-Object
+# Delete request
+DELETE_BATCH_SIZE = 1000
+
+# Number of times a single multipart upload part is retried before the whole
+# upload is aborted
+PART_UPLOAD_RETRIES = 3
+
+# Objects larger than 5 GB can't be copied using a single PUT request and are
+# copied in parts using Upload Part - Copy requests instead
+MAX_COPY_SIZE = 5 * 1024 * 1024 * 1024
+
+# Size of a single part of a multipart copy (S3 allows at most 10000 parts,
+# which is enough for the largest possible object of 5 TB)
+COPY_PART_SIZE = 1024 * 1024 * 1024
+
+# Number of parts which are copied in parallel
+COPY_PART_WORKERS = 4
+
 # Desired number of items in each response inside a paginated request in
 # ex_iterate_multipart_uploads.
 RESPONSES_PER_REQUEST = 100
@@ -214,6 +234,8 @@ class S3StorageDriver(StorageDriver):
     hash_type = 'md5'
     supports_chunked_encoding = False
     supports_s3_multipart_upload = True
+    supports_list_marker = True
+    supports_s3_multi_delete = True
     ex_location_name = ''
     namespace = NAMESPACE
 
@@ -227,7 +249,8 @@ class S3StorageDriver(StorageDriver):
         raise LibcloudError('Unexpected status code: %s' % (response.status),
                             driver=self)
 
-    def list_container_objects(self, container, ex_prefix=None):
+    def list_container_objects(self, container, ex_prefix=None,
+                               ex_delimiter=None):
         """
         Return a list of objects for the given container.
 
@@ -237,13 +260,19 @@ class S3StorageDriver(StorageDriver):
         :param ex_prefix: Only return objects starting with ex_prefix
         :type ex_prefix: ``str``
 
+        :param ex_delimiter: Don't return objects whose name contains
+                             ex_delimiter after the prefix.
+        :type ex_delimiter: ``str``
+
         :return: A list of Object instances.
         :rtype: ``list`` of :class:`Object`
         """
         return list(self.iterate_container_objects(container,
-            ex_prefix=ex_prefix))
+            ex_prefix=ex_prefix, ex_delimiter=ex_delimiter))
 
-    def iterate_container_objects(self, container, ex_prefix=None):
+    def iterate_container_objects(self, container, ex_prefix=None,
+                                  ex_delimiter=None, ex_prefetch=0,
+                                  ex_marker=None):
         """
         Return a generator of objects for the given container.
 
@@ -253,13 +282,57 @@ class S3StorageDriver(StorageDriver):
         :param ex_prefix: Only return objects starting with ex_prefix
         :type ex_prefix: ``str``
 
+        :param ex_delimiter: Don't return objects whose name contains
+                             ex_delimiter after the prefix.
+        :type ex_delimiter: ``str``
+
+        :param ex_prefetch: Number of pages which are requested in the
+                            background while the current page is being
+                            consumed (0 to disable prefetching).
+        :type ex_prefetch: ``int``
+
+        :param ex_marker: Only return objects whose names are greater than
+                          ex_marker.
+        :type ex_marker: ``str``
+
         :return: A generator of Object instances.
         :rtype: ``generator`` of :class:`Object`
         """
         params = {}
         if ex_prefix:
             params['prefix'] = ex_prefix
+        if ex_delimiter:
+            params['delimiter'] = ex_delimiter
+        if ex_marker:
+            params['marker'] = ex_marker
+
+        pages = self._iterate_container_object_pages(container, params)
+        return self._iterate_pages(pages, prefetch_depth=ex_prefetch)
 
+    def _iterate_container_level(self, container, prefix, delimiter):
+        params = {'delimiter': delimiter}
+        if prefix:
+            params['prefix'] = prefix
+
+        prefixes = []
+
+        for page in self._iterate_container_object_pages(container, params,
+                                                         prefixes=prefixes):
+            objects = list(page)
+            yield objects, prefixes[:]
+            del prefixes[:]
+
+    def _iterate_container_object_pages(self, container, params,
+                                        prefixes=None):
+        """
+        Return a generator which yields a generator of the objects for every
+        page of the listing. Objects are parsed while the response is still
+        being read and the next page is only requested once the current
+        page has been consumed.
+
+        If a list is passed in as prefixes, common prefixes (returned when a
+        delimiter is used) are appended to it once a page has been consumed.
+        """
         last_key = None
         exhausted = False
         container_path = self._get_container_path(container)
@@ -269,22 +342,52 @@ class S3StorageDriver(StorageDriver):
                 params['marker'] = last_key
 
             response = self.connection.request(container_path,
-                                               params=params)
+                                               params=params, stream=True)
 
             if response.status != httplib.OK:
                 raise LibcloudError('Unexpected status code: %s' %
                                     (response.status), driver=self)
 
-            objects = self._to_objs(obj=response.object,
-                                    xpath='Contents', container=container)
+            page = {}
+            objects = self._iterate_page_objects(response, container, page,
+                                                 prefixes)
+            yield objects
+
+            # The rest of the page is parsed if it hasn't been consumed
+            for _ in objects:
+                pass
+
             is_truncated = response.object.findtext(fixxpath(
                 xpath='IsTruncated', namespace=self.namespace)).lower()
             exhausted = (is_truncated == 'false')
 
-            last_key = None
-            for obj in objects:
-                last_key = obj.name
-                yield obj
+            # NextMarker is only returned if a delimiter is used
+            last_key = response.object.findtext(fixxpath(
+                xpath='NextMarker', namespace=self.namespace))
+
+            if not last_key:
+                last_key = page.get('last_key', None)
+
+            # Guard against looping over the same page forever
+            exhausted = exhausted or not last_key
+
+    def _iterate_page_objects(self, response, container, page, prefixes):
+        """
+        Return a generator which yields the objects of a single page of the
+        listing.
+
+        The name of the last object is stored in page['last_key'].
+        """
+        for element in response.iterparse(xpath='Contents',
+                                          namespace=self.namespace):
+            obj = self._to_obj(element, container)
+            page['last_key'] = obj.name
+            yield obj
+
+        if prefixes is not None:
+            prefixes.extend([e.text for e in response.object.findall(
+                fixxpath(xpath='CommonPrefixes/Prefix',
+                         namespace=self.namespace))])
 
     def get_container(self, container_name):
         # This is very inefficient, but afaik it's the only way to do it
@@ -391,7 +494,28 @@ class S3StorageDriver(StorageDriver):
         return False
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
-                        delete_on_failure=True):
+                        delete_on_failure=True, ex_workers=1,
+                        ex_part_size=None, ex_resume=False):
+        """
+        @inherits: L{StorageDriver.download_object}
+
+        @param ex_workers: Number of parts which are downloaded in parallel
+                           using range requests.
+        @type ex_workers: C{int}
+
+        @param ex_part_size: Size of a single range request in bytes.
+        @type ex_part_size: C{int}
+
+        @param ex_resume: True to resume a previously failed download.
+        @type ex_resume: C{bool}
+        """
+        if ex_workers > 1 or ex_resume:
+            return self._download_object_in_parts(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure, part_size=ex_part_size,
+                workers=ex_workers, resume=ex_resume)
+
         obj_path = self._get_object_path(obj.container, obj.name)
 
         response = self.connection.request(obj_path, method='GET', raw=True)
@@ -406,7 +530,23 @@ class S3StorageDriver(StorageDriver):
                                     'delete_on_failure': delete_on_failure},
                                 success_status_code=httplib.OK)
 
-    def download_object_as_stream(self, obj, chunk_size=None):
+    def download_object_as_stream(self, obj, chunk_size=None,
+                                  ex_start_bytes=None, ex_end_bytes=None):
+        """
+        @inherits: L{StorageDriver.download_object_as_stream}
+
+        @param ex_start_bytes: Offset of the first byte to return.
+        @type ex_start_bytes: C{int}
+
+        @param ex_end_bytes: Offset of the byte after the last byte to
+                             return (exclusive).
+        @type ex_end_bytes: C{int}
+        """
+        if ex_start_bytes is not None or ex_end_bytes is not None:
+            return self._download_object_range_as_stream(
+                obj=obj, start_bytes=ex_start_bytes or 0,
+                end_bytes=ex_end_bytes, chunk_size=chunk_size)
+
         obj_path = self._get_object_path(obj.container, obj.name)
         response = self.connection.request(obj_path, method='GET', raw=True)
 
@@ -416,6 +556,13 @@ class S3StorageDriver(StorageDriver):
                                                  'chunk_size': chunk_size},
                                 success_status_code=httplib.OK)
 
+    def _get_object_range(self, obj, start_bytes, end_bytes=None):
+        obj_path = self._get_object_path(obj.container, obj.name)
+        headers = {'Range': self._get_range_header(start_bytes, end_bytes)}
+
+        return self.connection.request(obj_path, method='GET',
+                                       headers=headers, raw=True)
+
     def upload_object(self, file_path, container, object_name, extra=None,
                       verify_hash=True, ex_storage_class=None):
         """
@@ -425,7 +572,8 @@ class S3StorageDriver(StorageDriver):
         @type ex_storage_class: C{str}
         """
         upload_func = self._upload_file
-        upload_func_kwargs = {'file_path': file_path}
+        upload_func_kwargs = {'file_path': file_path,
+                              'calculate_hash': verify_hash}
 
         return self._put_object(container=container, object_name=object_name,
                                 upload_func=upload_func,
@@ -435,7 +583,8 @@ class S3StorageDriver(StorageDriver):
                                 storage_class=ex_storage_class)
 
     def _upload_multipart(self, response, data, iterator, container,
-                          object_name, calculate_hash=True):
+                          object_name, calculate_hash=True,
+                          part_size=CHUNK_SIZE, workers=1):
         """
         Callback invoked for uploading data to S3 using Amazon's
         multipart upload mechanism
@@ -459,6 +608,12 @@ class S3StorageDriver(StorageDriver):
         @keyword calculate_hash: Indicates if we must calculate the data hash
         @type calculate_hash: C{bool}
 
+        @keyword part_size: Size of a single part in bytes
+        @type part_size: C{int}
+
+        @keyword workers: Number of parts which are uploaded in parallel
+        @type workers: C{int}
+
         @return: A tuple of (status, checksum, bytes transferred)
         @rtype: C{tuple}
         """
@@ -474,7 +629,9 @@ class S3StorageDriver(StorageDriver):
         try:
             # Upload the data through the iterator
             result = self._upload_from_iterator(iterator, object_path,
-                                                upload_id, calculate_hash)
+                                                upload_id, calculate_hash,
+                                                part_size=part_size,
+                                                workers=workers)
             (chunks, data_hash, bytes_transferred) = result
 
             # Commit the chunk info and complete the upload
@@ -492,7 +649,8 @@ class S3StorageDriver(StorageDriver):
         return (True, data_hash, bytes_transferred)
 
     def _upload_from_iterator(self, iterator, object_path, upload_id,
-                              calculate_hash=True):
+                              calculate_hash=True, part_size=CHUNK_SIZE,
+                              workers=1):
         """
         Uploads data from an interator in fixed sized chunks to S3
 
@@ -508,6 +666,14 @@ class S3StorageDriver(StorageDriver):
         @keyword calculate_hash: Indicates if we must calculate the data hash
         @type calculate_hash: C{bool}
 
+        @keyword part_size: Size of a single part in bytes
+        @type part_size: C{int}
+
+        @keyword workers: Number of parts which are uploaded in parallel. At
+                          most part_size * workers bytes are buffered in
+                          memory.
+        @type workers: C{int}
+
         @return: A tuple of (chunk info, checksum, bytes transferred)
         @rtype: C{tuple}
         """
@@ -516,45 +682,79 @@ class S3StorageDriver(StorageDriver):
         if calculate_hash:
             data_hash = self._get_hash_function()
 
+        def read_parts():
+            count = 1
+
+            # Read the input data in chunk sizes suitable for AWS
+            for data in read_in_chunks(iterator, chunk_size=part_size,
+                                       fill_size=True):
+                if calculate_hash:
+                    data_hash.update(data)
+
+                yield (count, data)
+                count += 1
+
+        def upload_part(part):
+            (count, data) = part
+            return retry(lambda: self._upload_part(object_path, upload_id,
+                                                   count, data),
+                         retries=PART_UPLOAD_RETRIES)
+
         bytes_transferred = 0
-        count = 1
         chunks = []
-        params = {'uploadId': upload_id}
 
-        # Read the input data in chunk sizes suitable for AWS
-        for data in read_in_chunks(iterator, chunk_size=CHUNK_SIZE):
+        for ((count, data), server_hash) in parallel_map(upload_part,
+                                                         read_parts(),
+                                                         workers=workers):
             bytes_transferred += len(data)
 
-            if calculate_hash:
-                data_hash.update(data)
+            # Keep this data for a later commit
+            chunks.append((count, server_hash))
 
-            chunk_hash = self._get_hash_function()
-            chunk_hash.update(data)
-            chunk_hash = base64.b64encode(chunk_hash.digest()).decode('utf-8')
+        chunks.sort()
 
-            # This provides an extra level of data check and is recommended
-            # by amazon
-            headers = {'Content-MD5': chunk_hash}
-            params['partNumber'] = count
+        if calculate_hash:
+            data_hash = data_hash.hexdigest()
 
-            request_path = '?'.join((object_path, urlencode(params)))
+        return (chunks, data_hash, bytes_transferred)
 
-            resp = self.connection.request(request_path, method='PUT',
-                                           data=data, headers=headers)
+    def _upload_part(self, object_path, upload_id, part_number, data):
+        """
+        Uploads a single part of a multipart upload.
 
-            if resp.status != httplib.OK:
-                raise LibcloudError('Error uploading chunk', driver=self)
+        @param object_path: Server side object path.
+        @type object_path: C{str}
 
-            server_hash = resp.headers['etag']
+        @param upload_id: ID of the multipart upload.
+        @type upload_id: C{str}
 
-            # Keep this data for a later commit
-            chunks.append((count, server_hash))
-            count += 1
+        @param part_number: Number of the part (starting with 1).
+        @type part_number: C{int}
 
-        if calculate_hash:
-            data_hash = data_hash.hexdigest()
+        @param data: Part data.
+        @type data: C{bytes}
 
-        return (chunks, data_hash, bytes_transferred)
+        @return: Server side ETag of the part.
+        @rtype: C{str}
+        """
+        chunk_hash = self._get_hash_function()
+        chunk_hash.update(data)
+        chunk_hash = base64.b64encode(chunk_hash.digest()).decode('utf-8')
+
+        # This provides an extra level of data check and is recommended
+        # by amazon
+        headers = {'Content-MD5': chunk_hash}
+        params = {'uploadId': upload_id, 'partNumber': part_number}
+
+        request_path = '?'.join((object_path, urlencode(params)))
+
+        resp = self.connection.request(request_path, method='PUT',
+                                       data=data, headers=headers)
+
+        if resp.status != httplib.OK:
+            raise LibcloudError('Error uploading chunk', driver=self)
+
+        return resp.headers['etag']
 
     def _commit_multipart(self, object_path, upload_id, chunks):
         """
@@ -616,12 +816,24 @@ class S3StorageDriver(StorageDriver):
                                 (resp.status), driver=self)
 
     def upload_object_via_stream(self, iterator, container, object_name,
-                                 extra=None, ex_storage_class=None):
+                                 extra=None, ex_storage_class=None,
+                                 ex_part_size=CHUNK_SIZE, ex_workers=1):
         """
         @inherits: L{StorageDriver.upload_object_via_stream}
 
         @param ex_storage_class: Storage class
         @type ex_storage_class: C{str}
+
+        @param ex_part_size: Size of a single part in bytes when the
+                             multipart upload is used (S3 requires at least
+                             5 MB for all parts except the last one)
+        @type ex_part_size: C{int}
+
+        @param ex_workers: Number of parts which are uploaded in parallel
+                           when the multipart upload is used. At most
+                           ex_part_size * ex_workers bytes are buffered in
+                           memory.
+        @type ex_workers: C{int}
         """
 
         method = 'PUT'
@@ -633,9 +845,14 @@ class S3StorageDriver(StorageDriver):
         if self.supports_s3_multipart_upload:
             # Initiate the multipart request and get an upload id
             upload_func = self._upload_multipart
+            # Hash of the whole object is not verified for multipart
+            # uploads so don't waste time calculating it
             upload_func_kwargs = {'iterator': iterator,
                                   'container': container,
-                                  'object_name': object_name}
+                                  'object_name': object_name,
+                                  'calculate_hash': False,
+                                  'part_size': ex_part_size,
+                                  'workers': ex_workers}
             method = 'POST'
             iterator = iter('')
             params = 'uploads'
@@ -667,6 +884,238 @@ class S3StorageDriver(StorageDriver):
 
         return False
 
+    def _copy_object(self, obj, container, object_name, extra):
+        """
+        Copy an object using a PUT request with the x-amz-copy-source
+        header.
+
+        If extra is provided, the content type and meta data of the copy are
+        replaced, otherwise they are copied from the source object.
+
+        Objects larger than 5 GB are copied using a multipart upload.
+        """
+        if int(obj.size) > MAX_COPY_SIZE:
+            if not self.supports_s3_multipart_upload:
+                # copy_object falls back to a download and an upload
+                raise NotImplementedError(
+                    'objects larger than 5 GB can only be copied using a '
+                    'multipart upload')
+
+            return self._copy_object_multipart(obj, container, object_name,
+                                               extra)
+
+        source_path = self._get_object_path(obj.container, obj.name)
+        headers = {'x-amz-copy-source': source_path}
+        meta_data = obj.meta_data
+
+        if extra is not None:
+            headers['x-amz-metadata-directive'] = 'REPLACE'
+            meta_data = extra.get('meta_data', None)
+            content_type = extra.get('content_type', None)
+
+            if content_type:
+                headers['Content-Type'] = content_type
+
+            for key, value in list((meta_data or {}).items()):
+                headers['x-amz-meta-%s' % (key)] = value
+
+        request_path = self._get_object_path(container, object_name)
+        response = self.connection.request(request_path, method='PUT',
+                                           headers=headers)
+
+        # The copy can fail after the response status has been sent, in
+        # which case the body contains an error instead of the result
+        body = response.object
+
+        if response.status != httplib.OK or \
+           not getattr(body, 'tag', '').endswith('CopyObjectResult'):
+            raise LibcloudError('Unable to copy object %s: %s' %
+                                (obj.name, response.status), driver=self)
+
+        etag = findtext(element=body, xpath='ETag', namespace=self.namespace)
+        last_modified = findtext(element=body, xpath='LastModified',
+                                 namespace=self.namespace)
+        etag = (etag or '').replace('"', '')
+
+        return Object(name=object_name, size=obj.size, hash=etag,
+                      extra={'last_modified': last_modified},
+                      meta_data=meta_data, container=container, driver=self)
+
+    def _copy_object_multipart(self, obj, container, object_name, extra):
+        """
+        Copy an object using a multipart upload whose parts are copied from
+        ranges of the source object with Upload Part - Copy requests.
+
+        The upload is aborted if copying any of the parts fails.
+        """
+        if extra is None:
+            # Meta data isn't copied from the source object by a multipart
+            # upload
+            extra = {'meta_data': obj.meta_data,
+                     'content_type': (obj.extra or {}).get('content_type',
+                                                           None)}
+
+        meta_data = extra.get('meta_data', None)
+        content_type = extra.get('content_type', None)
+        headers = {}
+
+        if content_type:
+            headers['Content-Type'] = content_type
+
+        for key, value in list((meta_data or {}).items()):
+            headers['x-amz-meta-%s' % (key)] = value
+
+        source_path = self._get_object_path(obj.container, obj.name)
+        object_path = self._get_object_path(container, object_name)
+        response = self.connection.request('?'.join((object_path,
+                                                     'uploads')),
+                                           method='POST', headers=headers)
+
+        if response.status != httplib.OK:
+            raise LibcloudError('Unable to copy object %s: %s' %
+                                (obj.name, response.status), driver=self)
+
+        upload_id = findtext(element=response.object, xpath='UploadId',
+                             namespace=self.namespace)
+        size = int(obj.size)
+        parts = [(index // COPY_PART_SIZE + 1, index,
+                  min(index + COPY_PART_SIZE, size) - 1)
+                 for index in range(0, size, COPY_PART_SIZE)]
+
+        def copy_part(part):
+            (part_number, start, end) = part
+            return retry(lambda: self._copy_part(object_path, upload_id,
+                                                 part_number, source_path,
+                                                 start, end),
+                         retries=PART_UPLOAD_RETRIES)
+
+        try:
+            chunks = [(part[0], etag) for (part, etag) in
+                      parallel_map(copy_part, parts,
+                                   workers=COPY_PART_WORKERS)]
+            chunks.sort()
+            etag = self._commit_multipart(object_path, upload_id, chunks)
+        except Exception:
+            exc = sys.exc_info()[1]
+            self._abort_multipart(object_path, upload_id)
+            raise exc
+
+        return Object(name=object_name, size=obj.size,
+                      hash=(etag or '').replace('"', ''), extra={},
+                      meta_data=meta_data, container=container, driver=self)
+
+    def _copy_part(self, object_path, upload_id, part_number, source_path,
+                   start, end):
+        """
+        Copies a range of an object to a part of a multipart upload.
+
+        @param object_path: Server side object path.
+        @type object_path: C{str}
+
+        @param upload_id: ID of the multipart upload.
+        @type upload_id: C{str}
+
+        @param part_number: Number of the part (starting with 1).
+        @type part_number: C{int}
+
+        @param source_path: Server side path of the source object.
+        @type source_path: C{str}
+
+        @param start: Offset of the first byte of the range.
+        @type start: C{int}
+
+        @param end: Offset of the last byte of the range.
+        @type end: C{int}
+
+        @return: Server side ETag of the part.
+        @rtype: C{str}
+        """
+        headers = {'x-amz-copy-source': source_path,
+                   'x-amz-copy-source-range': 'bytes=%d-%d' % (start, end)}
+        params = {'uploadId': upload_id, 'partNumber': part_number}
+
+        request_path = '?'.join((object_path, urlencode(params)))
+
+        response = self.connection.request(request_path, method='PUT',
+                                           headers=headers)
+        body = response.object
+
+        # As with a single copy, the status can be sent before the copy
+        # fails
+        if response.status != httplib.OK or \
+           not getattr(body, 'tag', '').endswith('CopyPartResult'):
+            raise LibcloudError('Error copying part', driver=self)
+
+        return findtext(element=body, xpath='ETag', namespace=self.namespace)
+
+    def _get_delete_batch_size(self):
+        if self.supports_s3_multi_delete:
+            return DELETE_BATCH_SIZE
+
+        return 1
+
+    def _delete_object_batch(self, container, objects):
+        """
+        Delete up to 1000 objects using a single Multi-Object Delete
+        request.
+
+        @param container: The container holding the objects
+        @type container: L{Container}
+
+        @param objects: The objects to delete
+        @type objects: C{list} of L{Object}
+
+        @return: A list of results (C{True} or an exception) in the same
+                 order as the objects
+        @rtype: C{list}
+        """
+        if not self.supports_s3_multi_delete or len(objects) == 1:
+            return super(S3StorageDriver, self)._delete_object_batch(
+                container, objects)
+
+        root = Element('Delete')
+
+        # Only report the keys which couldn't be deleted
+        quiet = SubElement(root, 'Quiet')
+        quiet.text = 'true'
+
+        for obj in objects:
+            item = SubElement(root, 'Object')
+            key = SubElement(item, 'Key')
+            key.text = obj.name
+
+        data = tostring(root)
+
+        # Content-MD5 is required for Multi-Object Delete requests
+        data_hash = self._get_hash_function()
+        data_hash.update(b(data))
+        headers = {'Content-MD5':
+                   base64.b64encode(data_hash.digest()).decode('utf-8'),
+                   'Content-Type': 'application/xml'}
+
+        request_path = self._get_container_path(container) + '?delete'
+        response = self.connection.request(request_path, data=data,
+                                           headers=headers, method='POST')
+
+        if response.status != httplib.OK:
+            raise LibcloudError('Unexpected status code: %s' %
+                                (response.status), driver=self)
+
+        errors = {}
+
+        for error in findall(element=response.object, xpath='Error',
+                             namespace=self.namespace):
+            key = findtext(element=error, xpath='Key',
+                           namespace=self.namespace)
+            code = findtext(element=error, xpath='Code',
+                            namespace=self.namespace)
+            message = findtext(element=error, xpath='Message',
+                               namespace=self.namespace)
+            errors[key] = LibcloudError('Unable to delete object %s: %s (%s)' %
+                                        (key, message, code), driver=self)
+
+        return [errors.get(obj.name, True) for obj in objects]
+
     def ex_iterate_multipart_uploads(self, container, prefix=None,
                                      delimiter=None):
         """
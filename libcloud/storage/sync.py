@@ -0,0 +1,361 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Synchronize a local directory or a container with a destination container.
+
+Similar to ``rsync``, only the objects which are missing from the
+destination or which differ from their source are transferred.
+"""
+
+from __future__ import with_statement
+
+import os
+import re
+import sys
+import time
+import hashlib
+import calendar
+
+from email.utils import parsedate_tz, mktime_tz
+
+from libcloud.utils.py3 import relpath
+from libcloud.utils.concurrency import parallel_map
+
+__all__ = [
+    'COMPARE_SIZE',
+    'COMPARE_MTIME',
+    'COMPARE_HASH',
+    'sync_directory',
+    'sync_containers'
+]
+
+# Objects are only compared by size
+COMPARE_SIZE = 'size'
+
+# Objects are compared by size and the source is transferred if it has been
+# modified after the destination
+COMPARE_MTIME = 'mtime'
+
+# Objects are compared by size and MD5 hash. Objects whose hash isn't an MD5
+# hash (e.g. objects uploaded using multipart uploads) are compared by
+# modification time instead.
+COMPARE_HASH = 'hash'
+
+# Default number of concurrent transfers
+SYNC_WORKERS = 8
+
+# Size of a block which is read from a local file when calculating its hash
+HASH_CHUNK_SIZE = 1024 * 1024
+
+ISO8601_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})')
+MD5_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class SyncEntry(object):
+    """
+    An object (or a local file) which is synchronized to the destination.
+    """
+
+    def __init__(self, name, size, mtime, hash=None, source=None):
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.hash = hash
+        self.source = source
+
+    def get_hash(self):
+        return _normalize_hash(self.hash)
+
+
+class FileSyncEntry(SyncEntry):
+    """
+    A local file. Its hash is only calculated when it's needed.
+    """
+
+    def get_hash(self):
+        if self.hash is None:
+            data_hash = hashlib.md5()
+
+            with open(self.source, 'rb') as file_handle:
+                while True:
+                    data = file_handle.read(HASH_CHUNK_SIZE)
+
+                    if not data:
+                        break
+
+                    data_hash.update(data)
+
+            self.hash = data_hash.hexdigest()
+
+        return self.hash
+
+
+def sync_directory(path, container, prefix='', compare=COMPARE_MTIME,
+                   delete=False, workers=SYNC_WORKERS, dry_run=False):
+    """
+    Upload the files of a local directory (recursively) which are missing
+    from a container or which differ from the uploaded objects.
+
+    :param path: Local directory.
+    :type path: ``str``
+
+    :param container: Destination container.
+    :type container: :class:`Container`
+
+    :param prefix: Prefix which is prepended to the relative paths of the
+                   files to get the object names.
+    :type prefix: ``str``
+
+    :param compare: How files are compared with existing objects. One of
+                    ``COMPARE_SIZE``, ``COMPARE_MTIME`` and ``COMPARE_HASH``.
+    :type compare: ``str``
+
+    :param delete: Delete objects under the prefix which don't have a
+                   matching local file.
+    :type delete: ``bool``
+
+    :param workers: Maximum number of concurrent transfers.
+    :type workers: ``int``
+
+    :param dry_run: Only return the actions which would be performed.
+    :type dry_run: ``bool``
+
+    :return: A list of (object name, action, result) tuples, where action is
+             ``'upload'`` or ``'delete'`` and result is ``True`` on success,
+             the exception which describes the failure or ``None`` for a
+             dry run.
+    :rtype: ``list`` of ``tuple``
+    """
+    entries = {}
+
+    for (root, _, files) in os.walk(path):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            relative_path = relpath(file_path, path)
+            name = prefix + relative_path.replace(os.sep, '/')
+            stat = os.stat(file_path)
+
+            entries[name] = FileSyncEntry(name=name, size=stat.st_size,
+                                          mtime=stat.st_mtime,
+                                          source=file_path)
+
+    def upload(entry, object_name):
+        container.driver.upload_object(entry.source, container, object_name)
+
+    return _sync(entries, container, prefix, compare, delete, workers,
+                 dry_run, 'upload', upload)
+
+
+def sync_containers(source, destination, prefix='', destination_prefix=None,
+                    compare=COMPARE_HASH, delete=False, workers=SYNC_WORKERS,
+                    dry_run=False):
+    """
+    Copy the objects of a container which are missing from another
+    container or which differ from the objects in it.
+
+    Objects are copied using :meth:`StorageDriver.copy_object`, so they are
+    copied on the server side if both containers belong to the same driver
+    and the provider supports it.
+
+    :param source: Source container.
+    :type source: :class:`Container`
+
+    :param destination: Destination container.
+    :type destination: :class:`Container`
+
+    :param prefix: Only synchronize objects with this prefix.
+    :type prefix: ``str``
+
+    :param destination_prefix: Prefix which replaces ``prefix`` in the names
+                               of the copies. Defaults to ``prefix``.
+    :type destination_prefix: ``str``
+
+    :param compare: How objects are compared. One of ``COMPARE_SIZE``,
+                    ``COMPARE_MTIME`` and ``COMPARE_HASH``.
+    :type compare: ``str``
+
+    :param delete: Delete objects under the destination prefix which don't
+                   have a matching source object.
+    :type delete: ``bool``
+
+    :param workers: Maximum number of concurrent transfers.
+    :type workers: ``int``
+
+    :param dry_run: Only return the actions which would be performed.
+    :type dry_run: ``bool``
+
+    :return: A list of (object name, action, result) tuples, where action is
+             ``'copy'`` or ``'delete'``. See :func:`sync_directory`.
+    :rtype: ``list`` of ``tuple``
+    """
+    if destination_prefix is None:
+        destination_prefix = prefix
+
+    entries = {}
+
+    for obj in _iterate_objects(source, prefix):
+        name = destination_prefix + obj.name[len(prefix):]
+        entries[name] = SyncEntry(name=name, size=obj.size,
+                                  mtime=_get_mtime(obj), hash=obj.hash,
+                                  source=obj)
+
+    def copy(entry, object_name):
+        source.driver.copy_object(entry.source, destination,
+                                  object_name=object_name)
+
+    return _sync(entries, destination, destination_prefix, compare, delete,
+                 workers, dry_run, 'copy', copy)
+
+
+def _sync(entries, container, prefix, compare, delete, workers, dry_run,
+          action, transfer):
+    """
+    Transfer the entries which differ from the objects in the destination
+    container and optionally delete the extraneous objects.
+    """
+    if compare not in (COMPARE_SIZE, COMPARE_MTIME, COMPARE_HASH):
+        raise ValueError('Invalid compare value: %s' % (compare))
+
+    existing = {}
+    for obj in _iterate_objects(container, prefix):
+        existing[obj.name] = obj
+
+    names = [name for name in sorted(entries)
+             if _is_changed(entries[name], existing.get(name), compare)]
+    extraneous = []
+
+    if delete:
+        extraneous = [existing[name] for name in sorted(existing)
+                      if name not in entries]
+
+    if dry_run:
+        return [(name, action, None) for name in names] + \
+            [(obj.name, 'delete', None) for obj in extraneous]
+
+    def transfer_entry(name):
+        try:
+            transfer(entries[name], name)
+        except Exception:
+            return sys.exc_info()[1]
+
+        return True
+
+    results = [(name, action, result) for (name, result) in
+               parallel_map(transfer_entry, names, workers=workers,
+                            ordered=True)]
+
+    if extraneous:
+        deleted = container.driver.delete_objects(extraneous,
+                                                  workers=workers)
+        results.extend([(obj.name, 'delete', result)
+                        for (obj, result) in deleted])
+
+    return results
+
+
+def _is_changed(entry, obj, compare):
+    """
+    Return True if the entry must be transferred.
+    """
+    if obj is None or obj.size != entry.size:
+        return True
+
+    if compare == COMPARE_SIZE:
+        return False
+
+    if compare == COMPARE_HASH:
+        remote_hash = _normalize_hash(obj.hash)
+
+        if remote_hash is not None and entry.get_hash() is not None:
+            return remote_hash != entry.get_hash()
+
+    source_mtime = entry.mtime
+    destination_mtime = _get_mtime(obj)
+
+    if source_mtime is None or destination_mtime is None:
+        # Objects which can't be compared are always transferred
+        return True
+
+    # Most providers only return the modification time with a resolution of
+    # a second
+    return int(source_mtime) > int(destination_mtime)
+
+
+def _iterate_objects(container, prefix):
+    """
+    Return a generator of the objects in a container with a prefix.
+    """
+    driver = container.driver
+
+    if prefix:
+        try:
+            return driver.iterate_container_objects(container,
+                                                    ex_prefix=prefix)
+        except TypeError:
+            # Driver doesn't support listing objects with a prefix
+            pass
+
+    return (obj for obj in driver.iterate_container_objects(container)
+            if obj.name.startswith(prefix))
+
+
+def _normalize_hash(value):
+    """
+    Return an MD5 hash in lower case hex or None if the value isn't one.
+    """
+    if not value:
+        return None
+
+    value = str(value).strip('"').lower()
+
+    if not MD5_RE.match(value):
+        return None
+
+    return value
+
+
+def _get_mtime(obj):
+    """
+    Return the modification time of an object as a UNIX timestamp.
+    """
+    extra = obj.extra or {}
+    value = extra.get('last_modified', extra.get('modify_time', None))
+
+    return _parse_date(value)
+
+
+def _parse_date(value):
+    """
+    Parse a RFC 1123 or ISO 8601 (UTC) date to a UNIX timestamp.
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    match = ISO8601_RE.match(value)
+
+    if match is not None:
+        parsed = time.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S')
+        return float(calendar.timegm(parsed))
+
+    parsed = parsedate_tz(value)
+
+    if parsed is not None:
+        return float(mktime_tz(parsed))
+
+    return None
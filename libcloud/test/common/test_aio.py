@@ -0,0 +1,291 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import gzip
+import time
+import threading
+import unittest
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from libcloud.utils.py3 import b
+from libcloud.common.base import Connection, JsonResponse, PollingConnection
+from libcloud.common.types import LibcloudError
+
+HAS_ASYNCIO = sys.version_info >= (3, 7)
+
+if HAS_ASYNCIO:
+    import asyncio
+    from io import BytesIO
+    from concurrent.futures import ThreadPoolExecutor
+    from socketserver import ThreadingMixIn
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    from libcloud.common.aio import AsyncConnection, AsyncNodeDriver
+    from libcloud.compute.drivers.dummy import DummyNodeDriver
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args, **kwargs):
+            pass
+
+        def setup(self):
+            BaseHTTPRequestHandler.setup(self)
+            self.server.connection_count += 1
+
+        def do_GET(self):
+            self.server.paths.append(self.path)
+            path = self.path.split('?')[0]
+            body = b(json.dumps({'path': path}))
+
+            if path == '/gzip':
+                buf = BytesIO()
+                gzip.GzipFile(fileobj=buf, mode='wb').write(body)
+                self.send_response(200)
+                self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(buf.getvalue())))
+                self.end_headers()
+                self.wfile.write(buf.getvalue())
+            elif path == '/chunked':
+                self.send_response(200)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in (body[:5], body[5:]):
+                    self.wfile.write(b('%X\r\n' % (len(chunk))))
+                    self.wfile.write(chunk + b('\r\n'))
+                self.wfile.write(b('0\r\n\r\n'))
+            elif path == '/job':
+                self.server.polls += 1
+                completed = self.server.polls >= 3
+                body = b(json.dumps({'completed': completed}))
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif path == '/slow':
+                time.sleep(1)
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif path == '/error':
+                self.send_response(500)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+            self.do_GET()
+
+
+class PollingTestConnection(PollingConnection):
+    responseCls = JsonResponse
+    poll_interval = 0
+    timeout = 10
+
+    def get_poll_request_kwargs(self, response, context, request_kwargs):
+        return {'action': '/job'}
+
+    def has_completed(self, response):
+        return response.object['completed']
+
+
+@unittest.skipIf(not HAS_ASYNCIO, 'asyncio is not available')
+class AsyncConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self.server.connection_count = 0
+        self.server.polls = 0
+        self.server.paths = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.port = self.server.server_address[1]
+
+        self.connection = Connection(secure=False, host='127.0.0.1',
+                                     port=self.port)
+        self.connection.responseCls = JsonResponse
+        self.async_connection = AsyncConnection(self.connection)
+
+    def tearDown(self):
+        self.async_connection.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_request(self):
+        response = self.loop.run_until_complete(
+            self.async_connection.request('/test', params={'a': 'b'}))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.object, {'path': '/test'})
+        self.assertEqual(self.server.paths, ['/test?a=b'])
+
+    def test_gzip_and_chunked_responses(self):
+        response = self.loop.run_until_complete(
+            self.async_connection.request('/gzip'))
+        self.assertEqual(response.object, {'path': '/gzip'})
+
+        response = self.loop.run_until_complete(
+            self.async_connection.request('/chunked'))
+        self.assertEqual(response.object, {'path': '/chunked'})
+
+    def test_error_response(self):
+        self.assertRaises(Exception, self.loop.run_until_complete,
+                          self.async_connection.request('/error'))
+
+    def test_concurrent_requests_reuse_connections(self):
+        requests = [self.async_connection.request('/test/%s' % (index))
+                    for index in range(10)]
+        responses = self.loop.run_until_complete(
+            asyncio.gather(*requests))
+
+        paths = sorted([response.object['path'] for response in responses])
+        self.assertEqual(paths, sorted(['/test/%s' % (index)
+                                        for index in range(10)]))
+
+        count = self.server.connection_count
+
+        for index in range(3):
+            self.loop.run_until_complete(
+                self.async_connection.request('/test'))
+
+        self.assertEqual(self.server.connection_count, count)
+
+    def test_request_is_prepared_outside_of_event_loop(self):
+        threads = []
+
+        def morph_action_hook(action):
+            threads.append(threading.current_thread())
+            return action
+
+        self.connection.morph_action_hook = morph_action_hook
+        self.loop.run_until_complete(self.async_connection.request('/test'))
+
+        self.assertEqual(len(threads), 1)
+        self.assertFalse(threads[0] is threading.current_thread())
+
+    def test_timed_out_connection_is_closed(self):
+        streams = []
+        open_stream = self.async_connection._open_stream
+
+        async def _open_stream(**kwargs):
+            stream = await open_stream(**kwargs)
+            streams.append(stream)
+            return stream
+
+        self.async_connection._open_stream = _open_stream
+        self.connection.timeout = 0.2
+
+        self.assertRaises(asyncio.TimeoutError, self.loop.run_until_complete,
+                          self.async_connection.request('/slow'))
+
+        self.assertEqual(len(streams), 1)
+        self.assertTrue(streams[0].writer.is_closing())
+        self.assertEqual(self.async_connection.connection_pool._idle, {})
+
+    def test_driver_request(self):
+        driver = DummyNodeDriver(0)
+        driver.connection = self.connection
+
+        async def request():
+            async with AsyncNodeDriver(driver) as async_driver:
+                return await async_driver.request('/test')
+
+        response = self.loop.run_until_complete(request())
+        self.assertEqual(response.object, {'path': '/test'})
+
+    def test_post_uses_new_connection(self):
+        self.loop.run_until_complete(self.async_connection.request('/test'))
+        count = self.server.connection_count
+
+        response = self.loop.run_until_complete(
+            self.async_connection.request('/test', method='POST', data='a'))
+
+        self.assertEqual(response.object, {'path': '/test'})
+        self.assertEqual(self.server.connection_count, count + 1)
+
+    def test_async_request(self):
+        connection = PollingTestConnection(secure=False, host='127.0.0.1',
+                                           port=self.port)
+        async_connection = AsyncConnection(connection)
+
+        response = self.loop.run_until_complete(
+            async_connection.async_request('/start'))
+        async_connection.close()
+
+        self.assertTrue(response.object['completed'])
+        self.assertEqual(self.server.paths, ['/start', '/job', '/job',
+                                             '/job'])
+
+    def test_async_request_not_polling_connection(self):
+        self.assertRaises(LibcloudError, self.loop.run_until_complete,
+                          self.async_connection.async_request('/start'))
+
+
+@unittest.skipIf(not HAS_ASYNCIO, 'asyncio is not available')
+class AsyncNodeDriverTestCase(unittest.TestCase):
+    def test_list_nodes(self):
+        loop = asyncio.new_event_loop()
+        driver = AsyncNodeDriver(DummyNodeDriver(0))
+
+        nodes = loop.run_until_complete(driver.list_nodes())
+        loop.close()
+        driver.close()
+
+        self.assertEqual(nodes, driver.driver.list_nodes())
+
+    def test_owned_executor_is_shut_down(self):
+        loop = asyncio.new_event_loop()
+
+        async def list_nodes():
+            async with AsyncNodeDriver(DummyNodeDriver(0)) as driver:
+                return driver, await driver.list_nodes()
+
+        driver, nodes = loop.run_until_complete(list_nodes())
+        loop.close()
+
+        self.assertEqual(len(nodes), 2)
+        self.assertRaises(RuntimeError, driver.executor.submit, len, [])
+
+    def test_external_executor_is_not_shut_down(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        driver = AsyncNodeDriver(DummyNodeDriver(0), executor=executor)
+        driver.close()
+
+        self.assertEqual(executor.submit(len, []).result(), 0)
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
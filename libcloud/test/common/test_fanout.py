@@ -0,0 +1,102 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+import threading
+import unittest
+
+from libcloud.common.types import LibcloudError
+from libcloud.common.fanout import fan_out, fan_out_all, DriverTimeoutError
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+
+
+class FakeDriver(object):
+    def __init__(self, name, delay=0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.event = threading.Event()
+
+    def list_nodes(self, prefix=''):
+        if self.delay:
+            self.event.wait(self.delay)
+
+        if self.error:
+            raise self.error
+
+        return [prefix + self.name]
+
+
+class FanOutTests(unittest.TestCase):
+    def test_results_are_streamed_as_calls_complete(self):
+        drivers = [FakeDriver('slow', delay=0.5), FakeDriver('fast')]
+
+        results = fan_out(drivers, 'list_nodes', kwargs={'prefix': 'node-'},
+                          workers=2)
+        result = next(results)
+
+        # The slow driver is still running
+        self.assertEqual(result.driver.name, 'fast')
+        self.assertEqual(result.result, ['node-fast'])
+        self.assertTrue(result.success)
+
+        drivers[0].event.set()
+        result = next(results)
+        self.assertEqual(result.result, ['node-slow'])
+        self.assertRaises(StopIteration, next, results)
+
+    def test_partial_failure(self):
+        drivers = [FakeDriver('a'), FakeDriver('b', error=ValueError('b')),
+                   FakeDriver('c')]
+
+        succeeded, failed = fan_out_all(drivers, 'list_nodes', workers=2)
+
+        self.assertEqual([r.result for r in succeeded], [['a'], ['c']])
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].driver.name, 'b')
+        self.assertTrue(isinstance(failed[0].error, ValueError))
+
+    def test_timeout(self):
+        drivers = [FakeDriver('stuck', delay=5)] + \
+            [FakeDriver(str(index)) for index in range(4)]
+
+        start = time.time()
+        succeeded, failed = fan_out_all(drivers, 'list_nodes', workers=1,
+                                        timeout=0.2)
+        drivers[0].event.set()
+
+        self.assertTrue(time.time() - start < 2)
+        self.assertEqual(len(succeeded), 4)
+        self.assertEqual(failed[0].driver.name, 'stuck')
+        self.assertTrue(isinstance(failed[0].error, DriverTimeoutError))
+        self.assertTrue(isinstance(failed[0].error, LibcloudError))
+
+    def test_callable_and_real_drivers(self):
+        drivers = [DummyNodeDriver(0), DummyNodeDriver(0)]
+
+        succeeded, failed = fan_out_all(
+            drivers, lambda driver: len(driver.list_nodes()))
+
+        self.assertEqual(failed, [])
+        self.assertEqual([r.result for r in succeeded], [2, 2])
+        self.assertEqual(succeeded[0].method, '<lambda>')
+
+    def test_no_drivers(self):
+        self.assertEqual(list(fan_out([], 'list_nodes')), [])
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
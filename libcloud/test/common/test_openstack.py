@@ -13,12 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
+import datetime
+import tempfile
 import unittest
 
-from mock import Mock
+from mock import Mock, patch
 
+from libcloud.common.base import Connection
+from libcloud.common.types import InvalidCredsError
 from libcloud.common.openstack import OpenStackBaseConnection
+from libcloud.common.openstack import OpenStackAuthConnection
+from libcloud.common.openstack import OpenStackAuthToken
+from libcloud.common.openstack import MemoryAuthTokenCache
+from libcloud.common.openstack import FileAuthTokenCache
+from libcloud.utils.iso8601 import UTC
 from libcloud.utils.py3 import PY25
 
 
@@ -45,5 +55,140 @@ class OpenStackBaseConnectionTest(unittest.TestCase):
                                                                timeout=10)
 
 
+class OpenStackAuthTokenCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.authenticated = []
+
+        def authenticate(osa):
+            self.authenticated.append(osa.user_id)
+            osa.auth_token = 'token-%s' % (len(self.authenticated))
+            osa.auth_token_expires = self._get_expires(hours=1)
+            osa.urls = {'cloudServers': [{'publicURL':
+                                          'https://127.0.0.2/v1.1/1'}]}
+            return osa
+
+        patcher = patch.object(OpenStackAuthConnection, 'authenticate',
+                               authenticate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_expires(self, **kwargs):
+        now = datetime.datetime.utcnow().replace(tzinfo=UTC)
+        return now + datetime.timedelta(**kwargs)
+
+    def _get_connection(self, cache, key='bar'):
+        connection = OpenStackBaseConnection(
+            'foo', key, ex_force_auth_url='https://127.0.0.1',
+            ex_force_auth_version='1.1', ex_auth_cache=cache)
+        connection.service_name = 'cloudServers'
+        connection.conn_classes = (None, Mock())
+        connection.driver = Mock()
+        return connection
+
+    def test_token_is_shared_between_connections(self):
+        cache = MemoryAuthTokenCache()
+
+        conn1 = self._get_connection(cache)
+        conn1._populate_hosts_and_request_paths()
+        conn2 = self._get_connection(cache)
+        conn2._populate_hosts_and_request_paths()
+
+        self.assertEqual(self.authenticated, ['foo'])
+        self.assertEqual(conn2.auth_token, 'token-1')
+        self.assertEqual(conn2.host, '127.0.0.2')
+        self.assertTrue(conn1.service_catalog is conn2.service_catalog)
+
+        # Different credentials never share a token
+        conn3 = self._get_connection(cache, key='other')
+        conn3._populate_hosts_and_request_paths()
+        self.assertEqual(conn3.auth_token, 'token-2')
+
+    def test_expired_token_is_not_used(self):
+        cache = MemoryAuthTokenCache()
+        conn = self._get_connection(cache)
+        token = OpenStackAuthToken(auth_token='expired',
+                                   auth_token_expires=self._get_expires(
+                                       seconds=2),
+                                   urls={}, auth_version='1.1')
+        cache.put(conn._get_auth_cache_key(), token)
+
+        conn._populate_hosts_and_request_paths()
+        self.assertEqual(conn.auth_token, 'token-1')
+
+    def test_file_cache(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+
+        conn1 = self._get_connection(FileAuthTokenCache(path))
+        conn1._populate_hosts_and_request_paths()
+        conn2 = self._get_connection(FileAuthTokenCache(path))
+        conn2._populate_hosts_and_request_paths()
+
+        self.assertEqual(self.authenticated, ['foo'])
+        self.assertEqual(conn2.auth_token, 'token-1')
+        self.assertEqual(conn2.auth_token_expires, conn1.auth_token_expires)
+
+        conn2._invalidate_auth_token()
+        self.assertEqual(FileAuthTokenCache(path).get(
+            conn2._get_auth_cache_key()), None)
+
+    def test_reauthenticate_on_unauthorized(self):
+        cache = MemoryAuthTokenCache()
+        conn = self._get_connection(cache)
+        conn._populate_hosts_and_request_paths()
+
+        def request(self, **kwargs):
+            self.morph_action_hook(kwargs['action'])
+            if self.auth_token == 'token-1':
+                raise InvalidCredsError()
+            return self.auth_token
+
+        with patch.object(Connection, 'request', request):
+            self.assertEqual(conn.request(action='/'), 'token-2')
+
+        self.assertEqual(cache.get(conn._get_auth_cache_key()).auth_token,
+                         'token-2')
+
+    def test_reauthenticate_on_unauthorized_cached_token(self):
+        cache = MemoryAuthTokenCache()
+        token = OpenStackAuthToken(auth_token='revoked',
+                                   auth_token_expires=self._get_expires(
+                                       hours=1),
+                                   urls={'cloudServers': [{
+                                       'publicURL':
+                                       'https://127.0.0.2/v1.1/1'}]},
+                                   auth_version='1.1')
+        conn = self._get_connection(cache)
+        cache.put(conn._get_auth_cache_key(), token)
+
+        def request(self, **kwargs):
+            self.morph_action_hook(kwargs['action'])
+            if self.auth_token == 'revoked':
+                raise InvalidCredsError()
+            return self.auth_token
+
+        # First request of a fresh connection uses the revoked cached token
+        with patch.object(Connection, 'request', request):
+            self.assertEqual(conn.request(action='/'), 'token-1')
+
+        self.assertEqual(self.authenticated, ['foo'])
+        self.assertEqual(cache.get(conn._get_auth_cache_key()).auth_token,
+                         'token-1')
+
+    def test_forced_token_is_not_replaced(self):
+        conn = OpenStackBaseConnection(
+            'foo', 'bar', ex_force_auth_token='forced',
+            ex_force_base_url='https://127.0.0.2/v1.1/1')
+
+        def request(self, **kwargs):
+            raise InvalidCredsError()
+
+        with patch.object(Connection, 'request', request):
+            self.assertRaises(InvalidCredsError, conn.request, action='/')
+
+        self.assertEqual(self.authenticated, [])
+
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
@@ -212,6 +212,73 @@ class CloudStackNodeDriverTest(unittest.TestCase, TestCaseMixin):
         node = self.driver.list_nodes()[0]
         self.assertEquals('test', node.name)
 
+    def test_list_nodes_fetches_rules_once(self):
+        responses = {
+            'listVirtualMachines': {'count': 2, 'virtualmachine': [
+                {'id': 'vm1', 'state': 'Running', 'nic': [], 'zoneid': 1,
+                 'created': ''},
+                {'id': 'vm2', 'state': 'Running', 'nic': [], 'zoneid': 1,
+                 'created': ''}]},
+            'listPublicIpAddresses': {'count': 2, 'publicipaddress': [
+                {'id': 'ip1', 'ipaddress': '1.1.1.1',
+                 'virtualmachineid': 'vm1'},
+                {'id': 'ip2', 'ipaddress': '1.1.1.2',
+                 'virtualmachineid': 'vm2'}]},
+            'listIpForwardingRules': {'count': 1, 'ipforwardingrule': [
+                {'id': 'r1', 'virtualmachineid': 'vm1', 'ipaddressid': 'ip1',
+                 'ipaddress': '1.1.1.1', 'protocol': 'tcp',
+                 'startport': 22, 'endport': 22}]},
+            'listPortForwardingRules': {'count': 2, 'portforwardingrule': [
+                {'id': 'r2', 'virtualmachineid': 'vm2', 'ipaddressid': 'ip2',
+                 'ipaddress': '1.1.1.2', 'protocol': 'tcp',
+                 'publicport': 80, 'privateport': 8080},
+                {'id': 'r3', 'virtualmachineid': 'vm2', 'ipaddressid': 'ip2',
+                 'ipaddress': '1.1.1.2', 'protocol': 'udp',
+                 'publicport': 53, 'privateport': 53}]}
+        }
+        calls = []
+
+        def sync_request(command, **kwargs):
+            calls.append(command)
+            return responses[command]
+
+        self.driver.connection._sync_request = sync_request
+
+        nodes = self.driver.list_nodes()
+        self.assertEqual(sorted(calls), sorted(responses.keys()))
+        self.assertEqual(nodes[0].extra['ip_addresses'][0].id, 'ip1')
+        self.assertEqual(len(nodes[0].extra['ip_forwarding_rules']), 1)
+        self.assertEqual(nodes[0].extra['port_forwarding_rules'], [])
+        rule = nodes[0].extra['ip_forwarding_rules'][0]
+        self.assertEqual(rule.address.address, '1.1.1.1')
+        self.assertEqual(nodes[1].extra['ip_forwarding_rules'], [])
+        self.assertEqual(len(nodes[1].extra['port_forwarding_rules']), 2)
+        self.assertEqual(nodes[1].extra['port_forwarding_rules'][1].protocol,
+                         'UDP')
+
+        calls = []
+        nodes = self.driver.list_nodes(ex_fetch_forwarding_rules=False)
+        self.assertEqual(calls, ['listVirtualMachines',
+                                 'listPublicIpAddresses'])
+        self.assertEqual(nodes[0].public_ips, ['1.1.1.1'])
+        self.assertFalse('port_forwarding_rules' in nodes[0].extra)
+
+    def test_sync_request_all_follows_pages(self):
+        pages = []
+
+        def sync_request(command, page, pagesize, **kwargs):
+            pages.append(page)
+            start = (page - 1) * pagesize
+            return {'count': 5,
+                    'virtualmachine': list(range(5))[start:start + pagesize]}
+
+        self.driver.connection._sync_request = sync_request
+
+        items = self.driver._sync_request_all('listVirtualMachines',
+                                              'virtualmachine', page_size=2)
+        self.assertEqual(items, [0, 1, 2, 3, 4])
+        self.assertEqual(pages, [1, 2, 3])
+
     def test_list_locations(self):
         location = self.driver.list_locations()[0]
         self.assertEquals('Sydney', location.name)
@@ -19,6 +19,7 @@ from __future__ import with_statement
 import os
 import sys
 import time
+import threading
 import unittest
 
 from libcloud.utils.py3 import httplib
@@ -86,6 +87,68 @@ class DeploymentTests(unittest.TestCase):
 
         self.assertEqual(self.node, msd.run(node=self.node, client=None))
 
+    def test_multi_step_deployment_runs_independent_steps_concurrently(self):
+        events = []
+        lock = threading.Lock()
+        barrier = threading.Event()
+
+        class WaitingDeployment(Deployment):
+            def __init__(self, name, wait=False):
+                self.name = name
+                self.wait = wait
+                self.released = None
+
+            def run(self, node, client):
+                with lock:
+                    events.append(self.name)
+
+                if self.wait:
+                    # Only released if the other upload runs concurrently
+                    barrier.wait(5)
+                    self.released = barrier.is_set()
+                else:
+                    barrier.set()
+
+                return node
+
+        first = WaitingDeployment('upload1', wait=True)
+        second = WaitingDeployment('upload2')
+        script = ScriptDeployment(script='foobar')
+
+        msd = MultiStepDeployment([first, second], workers=4)
+        msd.add(script, depends_on=[first, second])
+
+        client = MockClient(hostname='localhost')
+        client.stdout = 'output'
+        self.assertEqual(self.node, msd.run(node=self.node, client=client))
+
+        self.assertEqual(sorted(events), ['upload1', 'upload2'])
+        self.assertTrue(first.released)
+        self.assertEqual(script.stdout, 'output')
+        self.assertEqual(script.exit_status, 0)
+
+        self.assertEqual([r.step for r in msd.results],
+                         [first, second, script])
+        self.assertTrue(all([r.success for r in msd.results]))
+        self.assertEqual(msd.results[2].stdout, 'output')
+        self.assertTrue(msd.results[0].elapsed >= 0)
+
+    def test_multi_step_deployment_failure_stops_dependent_steps(self):
+        failing = Mock()
+        failing.run.side_effect = Exception('foo')
+        dependent = Mock()
+
+        msd = MultiStepDeployment(failing, workers=2)
+        msd.add(dependent, depends_on=failing)
+
+        self.assertRaises(Exception, msd.run, node=self.node, client=None)
+        self.assertFalse(dependent.run.called)
+        self.assertEqual(str(msd.results[0].error), 'foo')
+        self.assertEqual(msd.results[1].elapsed, None)
+
+        # Dependencies must be added first
+        self.assertRaises(ValueError, msd.add, Mock(), depends_on=Mock())
+
     def test_ssh_key_deployment(self):
         sshd = SSHKeyDeployment(key='1234')
 
@@ -101,6 +164,16 @@ class DeploymentTests(unittest.TestCase):
         self.assertEqual(self.node, fd.run(
                 node=self.node, client=MockClient(hostname='localhost')))
 
+    def test_file_deployment_streams_file(self):
+        client = Mock()
+        fd = FileDeployment(__file__, '/tmp/target')
+        fd.run(node=self.node, client=client)
+
+        kwargs = client.putfo.call_args[1]
+        self.assertEqual(kwargs['path'], '/tmp/target')
+        self.assertEqual(kwargs['fo'].name, __file__)
+        self.assertFalse(client.put.called)
+
     def test_script_deployment(self):
         sd1 = ScriptDeployment(script='foobar', delete=True)
         sd2 = ScriptDeployment(script='foobar', delete=False)
@@ -250,6 +323,40 @@ class DeploymentTests(unittest.TestCase):
         self.assertEqual(['67.23.21.33'], nodes[0][1])
         self.assertEqual(['67.23.21.34'], nodes[1][1])
 
+    def test_iterate_running_nodes_yields_nodes_incrementally(self):
+        pending = Node(id=12345, name='test', state=NodeState.PENDING,
+                       public_ips=[], private_ips=[], driver=Rackspace)
+        running = [Node(id=node.id, name='test', state=NodeState.RUNNING,
+                        public_ips=['1.2.3.4'], private_ips=[],
+                        driver=Rackspace)
+                   for node in (self.node, self.node2)]
+        get_nodes = Mock(side_effect=[[pending, running[1]],
+                                      [pending], [running[0]]])
+        sleep = Mock()
+
+        with patch.object(self.driver, '_get_nodes', get_nodes):
+            with patch('time.sleep', sleep):
+                nodes = self.driver.iterate_running_nodes(
+                    nodes=[self.node, self.node2], wait_period=1,
+                    timeout=60, backoff=2, jitter=0)
+
+                node, ips = next(nodes)
+                self.assertEqual(node.uuid, self.node2.uuid)
+                self.assertEqual(ips, ['1.2.3.4'])
+                self.assertEqual(get_nodes.call_count, 1)
+
+                node, ips = next(nodes)
+                self.assertEqual(node.uuid, self.node.uuid)
+                self.assertRaises(StopIteration, next, nodes)
+
+        # Only the nodes which are not running yet are polled
+        self.assertEqual([len(args[0]) for (args, _) in
+                          get_nodes.call_args_list], [2, 1, 1])
+
+        # The wait period is reset when a node becomes ready
+        self.assertEqual([args[0] for (args, _) in sleep.call_args_list],
+                         [1, 2])
+
     def test_ssh_client_connect_success(self):
         mock_ssh_client = Mock()
         mock_ssh_client.return_value = None
@@ -384,6 +491,95 @@ class DeploymentTests(unittest.TestCase):
         node = self.driver.deploy_node(deploy=Mock())
         self.assertEqual(self.node.id, node.id)
 
+    @patch('libcloud.compute.base.SSHClient')
+    @patch('libcloud.compute.ssh')
+    def test_deploy_nodes(self, mock_ssh_module, _):
+        RackspaceMockHttp.type = 'MULTIPLE_NODES'
+        mock_ssh_module.have_paramiko = True
+
+        def create_node(name, **kwargs):
+            if name == 'error':
+                raise Exception('create failed')
+
+            return {'first': self.node, 'second': self.node2}[name]
+
+        def run(node, ssh_client):
+            if node.uuid == self.node2.uuid:
+                raise Exception('deployment failed')
+
+            return node
+
+        self.driver.create_node = Mock(side_effect=create_node)
+        deploy = Mock()
+        deploy.run = Mock(side_effect=run)
+
+        results = self.driver.deploy_nodes([{'name': 'first'},
+                                            {'name': 'error'},
+                                            {'name': 'second'}],
+                                           deploy=deploy, max_tries=1,
+                                           workers=2)
+
+        self.assertEqual(results[0][0].uuid, self.node.uuid)
+        self.assertEqual(results[0][1], True)
+
+        self.assertEqual(results[1][0], None)
+        self.assertTrue(isinstance(results[1][1], DeploymentError))
+        self.assertEqual(str(results[1][1].value), 'create failed')
+
+        self.assertEqual(results[2][0].uuid, self.node2.uuid)
+        self.assertTrue(isinstance(results[2][1], DeploymentError))
+
+    @patch('libcloud.compute.base.SSHClient')
+    @patch('libcloud.compute.ssh')
+    def test_deploy_nodes_wait_timeout(self, mock_ssh_module, _):
+        RackspaceMockHttp.type = 'MISSING'
+        mock_ssh_module.have_paramiko = True
+
+        self.driver.create_node = Mock(return_value=self.node)
+        deploy = Mock()
+
+        results = self.driver.deploy_nodes([{}], deploy=deploy, timeout=0.5)
+
+        self.assertEqual(results[0][0], self.node)
+        self.assertTrue(isinstance(results[0][1], DeploymentError))
+        self.assertTrue(str(results[0][1].value).find('Timed out') != -1)
+        self.assertFalse(deploy.run.called)
+
+    @patch('libcloud.compute.base.SSHClient')
+    @patch('libcloud.compute.ssh')
+    def test_deploy_nodes_wait_is_not_suspended(self, mock_ssh_module, _):
+        mock_ssh_module.have_paramiko = True
+        nodes = [Node(id=str(index), name='node%d' % (index),
+                      state=NodeState.RUNNING, public_ips=['127.0.0.1'],
+                      private_ips=[], driver=self.driver)
+                 for index in range(4)]
+
+        def iterate_running_nodes(nodes, timeout, **kwargs):
+            start = time.time()
+
+            for node in nodes:
+                # Times out if it's resumed after the timeout, even though
+                # all the nodes are running
+                if time.time() - start > timeout:
+                    raise LibcloudError(value='Timed out after %s seconds' %
+                                        (timeout), driver=self.driver)
+
+                yield (node, node.public_ips)
+
+        def deploy_to_node(node, ip_addresses, password, kwargs):
+            time.sleep(0.3)
+            return node
+
+        self.driver.create_node = Mock(side_effect=nodes)
+        self.driver.iterate_running_nodes = iterate_running_nodes
+        self.driver._deploy_to_node = deploy_to_node
+
+        results = self.driver.deploy_nodes([{}] * 4, deploy=Mock(),
+                                           workers=1, timeout=0.5)
+
+        self.assertEqual([result for (_, result) in results],
+                         [True, True, True, True])
+
     @patch('libcloud.compute.base.SSHClient')
     @patch('libcloud.compute.ssh')
     def test_exception_is_thrown_is_paramiko_is_not_available(self,
@@ -166,6 +166,15 @@ class EC2Tests(LibcloudTestCase, TestCaseMixin):
                                         '2009-08-07T05:47:04.000Z')
         self.assertTrue('instancetype' in ret_node2.extra)
 
+    def test_get_nodes_filters_by_node_ids(self):
+        nodes = [Node(id=node_id, name=None, state=None, public_ips=[],
+                      private_ips=[], driver=self.driver)
+                 for node_id in ('i-4382922a', 'i-8474834a')]
+
+        found = self.driver._get_nodes(nodes)
+        self.assertEqual([node.uuid for node in found],
+                         [node.uuid for node in nodes])
+
     def test_list_nodes_with_name_tag(self):
         EC2MockHttp.type = 'WITH_TAGS'
         node = self.driver.list_nodes()[0]
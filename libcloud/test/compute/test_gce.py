@@ -19,12 +19,15 @@ import sys
 import unittest
 import datetime
 
+from mock import Mock
+
 from libcloud.utils.py3 import httplib
 from libcloud.compute.drivers.gce import (GCENodeDriver, API_VERSION,
                                           timestamp_to_datetime,
                                           GCEAddress, GCEFirewall, GCENetwork,
                                           GCENodeSize, GCEProject, GCEZone,
                                           GCEError, ResourceExistsError,
+                                          ResourceNotFoundError,
                                           QuotaExceededError)
 from libcloud.common.google import (GoogleBaseAuthConnection,
                                     GoogleInstalledAppAuthConnection,
@@ -247,6 +250,22 @@ class GCENodeDriverTest(LibcloudTestCase, TestCaseMixin):
         reboot = self.driver.reboot_node(node)
         self.assertTrue(reboot)
 
+    def test_get_nodes(self):
+        node = self.driver.ex_get_node('node-name')
+        nodes = self.driver._get_nodes([node])
+        self.assertEqual([n.uuid for n in nodes], [node.uuid])
+
+    def test_get_nodes_skips_missing_nodes(self):
+        node = self.driver.ex_get_node('node-name')
+        missing = Node(id='1234', name='missing-node', state=node.state,
+                       public_ips=[], private_ips=[], driver=self.driver,
+                       extra={'zone': node.extra['zone']})
+        self.assertRaises(ResourceNotFoundError, self.driver.ex_get_node,
+                          'missing-node', node.extra['zone'])
+
+        nodes = self.driver._get_nodes([missing, node])
+        self.assertEqual([n.uuid for n in nodes], [node.uuid])
+
     def test_ex_set_node_tags(self):
         new_tags = ['libcloud']
         node = self.driver.ex_get_node('node-name')
@@ -368,6 +387,58 @@ class GCENodeDriverTest(LibcloudTestCase, TestCaseMixin):
         self.assertEqual(zone.time_until_mw, expected_time_until)
         self.assertEqual(zone.next_mw_duration, expected_duration)
 
+    def test_converters_use_zone_and_network_cache(self):
+        self.driver.connection.request = Mock(
+            wraps=self.driver.connection.request)
+
+        nodes = self.driver.list_nodes(ex_zone='all')
+        self.assertEqual(len(nodes), 8)
+        self.assertTrue(isinstance(nodes[0].extra['zone'], GCEZone))
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+
+        self.driver.connection.request.reset_mock()
+        firewalls = self.driver.ex_list_firewalls()
+        self.assertEqual(len(firewalls), 4)
+        # One request for firewalls and one to seed the network cache
+        self.assertEqual(self.driver.connection.request.call_count, 2)
+
+        self.driver.connection.request.reset_mock()
+        self.driver.ex_list_firewalls()
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+
+    def test_size_cache(self):
+        self.driver.connection.request = Mock(
+            wraps=self.driver.connection.request)
+
+        size = self.driver.ex_get_size('n1-standard-1')
+        self.assertTrue(self.driver.ex_get_size('n1-standard-1') is size)
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+
+        # Listing the sizes of a zone refreshes the cache
+        self.driver.connection.request.reset_mock()
+        sizes = self.driver.list_sizes()
+        size = self.driver.ex_get_size(sizes[0].name)
+        self.assertTrue(size is sizes[0])
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+
+        # Expired entries are requested again
+        self.driver.connection.request.reset_mock()
+        for key, (size, _) in list(self.driver.size_dict.items()):
+            self.driver.size_dict[key] = (size, 0)
+        self.driver.ex_get_size('n1-standard-1')
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+
+    def test_expired_zone_cache_is_refreshed(self):
+        self.driver.zone_cache_expires = 0
+        self.driver.connection.request = Mock(
+            wraps=self.driver.connection.request)
+
+        self.driver.ex_get_zone('us-central1-a')
+        self.driver.ex_get_zone('europe-west1-a')
+        self.assertEqual(self.driver.connection.request.call_count, 1)
+        self.assertEqual(self.driver.connection.request.call_args[0][0],
+                         '/zones')
+
 
 class GCEMockHttp(MockHttpTestCase):
     fixtures = ComputeFileFixtures('gce')
@@ -624,6 +695,12 @@ class GCEMockHttp(MockHttpTestCase):
             body = self.fixtures.load('zones_us-central1-a_instances.json')
         return (httplib.OK, body, self.json_hdr, httplib.responses[httplib.OK])
 
+    def _zones_us_central1_a_instances_missing_node(self, method, url, body,
+                                                    headers):
+        body = '{"error": {"code": 404, "message": "Not found"}}'
+        return (httplib.NOT_FOUND, body, self.json_hdr,
+                httplib.responses[httplib.NOT_FOUND])
+
     def _zones_us_central1_a_instances_node_name(self, method, url, body,
                                                  headers):
         if method == 'DELETE':
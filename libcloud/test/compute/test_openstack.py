@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
 import sys
 import unittest
 import datetime
@@ -22,7 +24,7 @@ try:
 except ImportError:
     import json
 
-from mock import Mock
+from mock import Mock, patch
 
 from libcloud.utils.py3 import httplib
 from libcloud.utils.py3 import method_type
@@ -1022,6 +1024,18 @@ class OpenStack_1_1_Tests(unittest.TestCase, TestCaseMixin):
         self.assertEqual(node.id, '12064')
         self.assertEqual(node.name, 'lc-test')
 
+    def test_wait_until_running_looks_up_nodes(self):
+        node = Node(id='12064', name=None, state=None, public_ips=[],
+                    private_ips=[], driver=self.driver)
+
+        with patch.object(self.driver, 'list_nodes') as list_nodes:
+            nodes = self.driver.wait_until_running([node], wait_period=0.1,
+                                                   timeout=5)
+
+        self.assertFalse(list_nodes.called)
+        self.assertEqual(nodes[0][0].id, '12064')
+        self.assertEqual(nodes[0][1], ['50.57.94.30'])
+
     def test_ex_get_size(self):
         size_id = '7'
         size = self.driver.ex_get_size(size_id)
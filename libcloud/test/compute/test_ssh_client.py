@@ -20,9 +20,13 @@ from __future__ import with_statement
 import sys
 import unittest
 
+from io import BytesIO
+
 from libcloud.compute.ssh import ParamikoSSHClient
 from libcloud.compute.ssh import ShellOutSSHClient
 from libcloud.compute.ssh import have_paramiko
+from libcloud.compute.ssh import SFTP_CHUNK_SIZE
+from libcloud.utils.py3 import b
 
 from mock import patch, Mock
 
@@ -107,9 +111,7 @@ class ParamikoSSHClientTests(unittest.TestCase):
 
         mock.put(sd)
         # Make assertions over 'put' method
-        mock_cli.open_sftp().chdir.assert_called_with('root')
-        mock_cli.open_sftp().file.assert_called_once_with('random_script.sh',
-                                                          mode='w')
+        mock_cli.open_sftp().file.assert_called_once_with(sd, mode='w')
 
         mock.run(sd)
         # Make assertions over 'run' method
@@ -134,6 +136,85 @@ class ParamikoSSHClientTests(unittest.TestCase):
 
         mock.close()
 
+    def test_sftp_session_and_directories_are_reused(self):
+        mock = self.ssh_cli
+        mock.connect()
+
+        sftp = mock.client.open_sftp.return_value
+        sftp.normalize.return_value = '/home/ubuntu'
+
+        def stat(path):
+            if path.startswith('/opt') or path.endswith('relative'):
+                raise IOError('No such file')
+
+        sftp.stat.side_effect = stat
+
+        mock.put('/opt/app/a.sh', contents='a')
+        mock.put('/opt/app/b.sh', contents='b')
+        path = mock.put('relative/c.sh', contents='c')
+        mock.delete('/opt/app/a.sh')
+
+        self.assertEqual(path, '/home/ubuntu/relative/c.sh')
+        self.assertEqual(mock.client.open_sftp.call_count, 1)
+        self.assertEqual([args[0] for (args, _) in sftp.mkdir.call_args_list],
+                         ['/opt', '/opt/app', '/home/ubuntu/relative'])
+        self.assertEqual(sftp.stat.call_count, 4)
+
+        mock.close()
+        sftp.close.assert_called_once_with()
+
+    def test_connect_resets_sftp_session(self):
+        mock = self.ssh_cli
+        mock.connect()
+
+        sftp = mock.client.open_sftp.return_value
+        sftp.normalize.return_value = '/home/ubuntu'
+        mock.put('dir/a.sh', contents='a')
+
+        mock.connect()
+
+        sftp.close.assert_called_once_with()
+        self.assertEqual(mock.sftp, None)
+        self.assertEqual(mock._home, None)
+        self.assertEqual(mock._directories, set())
+
+        mock.put('dir/b.sh', contents='b')
+        self.assertEqual(mock.client.open_sftp.call_count, 2)
+        self.assertEqual(sftp.normalize.call_count, 2)
+
+    def test_removed_directory_is_created_again(self):
+        mock = self.ssh_cli
+        mock.connect()
+
+        sftp = mock.client.open_sftp.return_value
+        mock.put('/opt/app/a.sh', contents='a')
+
+        # The directory has been removed after it has been cached
+        sftp.file.side_effect = [IOError('No such file'), Mock()]
+        sftp.stat.side_effect = IOError('No such file')
+
+        self.assertEqual(mock.put('/opt/app/b.sh', contents='b'),
+                         '/opt/app/b.sh')
+        self.assertEqual(sftp.file.call_count, 3)
+        self.assertEqual([args[0] for (args, _) in sftp.mkdir.call_args_list],
+                         ['/opt', '/opt/app'])
+
+    def test_putfo_streams_file(self):
+        mock = self.ssh_cli
+        mock.connect()
+
+        sftp = mock.client.open_sftp.return_value
+        remote_file = sftp.file.return_value
+        data = b('a' * (SFTP_CHUNK_SIZE + 1))
+
+        path = mock.putfo('/root/file', BytesIO(data), chmod=420)
+
+        self.assertEqual(path, '/root/file')
+        remote_file.set_pipelined.assert_called_once_with(True)
+        self.assertEqual(remote_file.write.call_count, 2)
+        remote_file.chmod.assert_called_once_with(420)
+        remote_file.close.assert_called_once_with()
+
 
 if not ParamikoSSHClient:
     class ParamikoSSHClientTests(unittest.TestCase):
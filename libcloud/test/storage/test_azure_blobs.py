@@ -17,11 +17,16 @@ from __future__ import with_statement
 
 import os
 import sys
+import base64
+import hashlib
 import unittest
 import tempfile
 
+from mock import Mock, patch
+
 from xml.etree import ElementTree as ET
 from libcloud.utils.py3 import httplib
+from libcloud.utils.py3 import b
 from libcloud.utils.py3 import urlparse
 from libcloud.utils.py3 import parse_qs
 
@@ -35,6 +40,7 @@ from libcloud.storage.types import InvalidContainerNameError
 from libcloud.storage.types import ObjectDoesNotExistError
 from libcloud.storage.types import ObjectHashMismatchError
 from libcloud.storage.drivers.azure_blobs import AzureBlobsStorageDriver
+from libcloud.storage.drivers.azure_blobs import AzureBlobLease
 from libcloud.storage.drivers.azure_blobs import AZURE_BLOCK_MAX_SIZE
 from libcloud.storage.drivers.azure_blobs import AZURE_PAGE_CHUNK_SIZE
 from libcloud.storage.drivers.dummy import DummyIterator
@@ -246,6 +252,43 @@ class AzureBlobsMockHttp(StorageMockHttp, MockHttpTestCase):
                 headers,
                 httplib.responses[httplib.ACCEPTED])
 
+    def _foo_bar_container_copy_COPY(self, method, url, body, headers):
+        # test_copy_object
+        if method == 'PUT':
+            self.assertEqual(headers['x-ms-copy-source'],
+                             'https://%s/foo_bar_container/foo_bar_object' %
+                             (self.host))
+            status = httplib.ACCEPTED
+            headers = {'x-ms-copy-status': 'pending'}
+        else:
+            self.assertEqual(method, 'HEAD')
+            status = httplib.OK
+            headers = {'x-ms-copy-status': 'success', 'etag': '0x8CFB877'}
+
+        return (status, '', headers, httplib.responses[status])
+
+    def _foo_bar_container_copy_COPY_TIMEOUT(self, method, url, body,
+                                             headers):
+        # test_copy_object_timeout
+        query = parse_qs(urlparse.urlparse(url).query)
+
+        if method == 'PUT' and 'comp' in query:
+            self.assertEqual(query['comp'], ['copy'])
+            self.assertEqual(query['copyid'], ['1f812371-a41d'])
+            self.assertEqual(headers['x-ms-copy-action'], 'abort')
+            status = httplib.NO_CONTENT
+            headers = {}
+        elif method == 'PUT':
+            status = httplib.ACCEPTED
+            headers = {'x-ms-copy-status': 'pending',
+                       'x-ms-copy-id': '1f812371-a41d'}
+        else:
+            self.assertEqual(method, 'HEAD')
+            status = httplib.OK
+            headers = {'x-ms-copy-status': 'pending'}
+
+        return (status, '', headers, httplib.responses[status])
+
     def _foo_bar_container_foo_test_upload(self, method, url, body, headers):
         # test_upload_object_success
         body = ''
@@ -912,6 +955,211 @@ class AzureBlobsTests(unittest.TestCase):
         self.assertEqual(obj.name, object_name)
         self.assertEqual(obj.size, blob_size)
 
+    def _mock_chunk_requests(self, fail_once=None):
+        requests = []
+        failed = []
+
+        def request(action, method=None, data=None, headers=None,
+                    params=None):
+            requests.append((dict(params), dict(headers), data))
+
+            response = Mock()
+            response.status = httplib.CREATED
+
+            if fail_once is not None and not failed and \
+               params.get('blockid') == fail_once:
+                failed.append(True)
+                response.status = httplib.INTERNAL_SERVER_ERROR
+
+            return response
+
+        self.driver.connection.request = request
+        return requests
+
+    def test_upload_block_blob_in_parallel(self):
+        requests = self._mock_chunk_requests()
+        data = b('a' * 1024 * 10 + 'b' * 100)
+        response = Mock(status=httplib.CREATED, headers={})
+        lease = AzureBlobLease(self.driver, '/foo/bar', False)
+
+        result = self.driver._upload_in_chunks(response, None, iter([data]),
+                                               '/foo/bar', 'BlockBlob',
+                                               lease, calculate_hash=True,
+                                               chunk_size=1024, workers=4)
+
+        self.assertEqual(result, (True, hashlib.md5(data).hexdigest(),
+                                  len(data)))
+
+        blocks = [(params['blockid'], len(body))
+                  for (params, _, body) in requests
+                  if params['comp'] == 'block']
+        self.assertEqual(len(blocks), 11)
+        self.assertEqual(sorted(size for (_, size) in blocks),
+                         [100] + [1024] * 10)
+
+        # Blocks are committed in the same order in which they were read
+        params, _, body = requests[-1]
+        self.assertEqual(params, {'comp': 'blocklist'})
+        block_list = [item.text for item in ET.XML(body)]
+        expected = [base64.b64encode(b('%10d' % (count))).decode('utf-8')
+                    for count in range(1, 12)]
+        self.assertEqual(block_list, expected)
+
+    def test_upload_page_blob_in_parallel(self):
+        requests = self._mock_chunk_requests()
+        data = b('a' * AZURE_PAGE_CHUNK_SIZE * 8)
+        response = Mock(status=httplib.CREATED, headers={})
+        lease = AzureBlobLease(self.driver, '/foo/bar', False)
+
+        result = self.driver._upload_in_chunks(response, None, iter([data]),
+                                               '/foo/bar', 'PageBlob',
+                                               lease, calculate_hash=False,
+                                               chunk_size=1024, workers=3)
+
+        self.assertEqual(result, (True, None, len(data)))
+
+        ranges = sorted(headers['x-ms-range']
+                        for (params, headers, _) in requests)
+        expected = sorted('bytes=%d-%d' % (offset, offset + 1023)
+                          for offset in range(0, len(data), 1024))
+        self.assertEqual(ranges, expected)
+
+    def test_upload_page_blob_skips_zero_pages(self):
+        requests = self._mock_chunk_requests()
+        zeros = '\x00' * AZURE_PAGE_CHUNK_SIZE
+        data = b(zeros * 3 + 'a' * AZURE_PAGE_CHUNK_SIZE + zeros * 2 +
+                 'b' * AZURE_PAGE_CHUNK_SIZE * 2 + zeros * 4)
+        response = Mock(status=httplib.CREATED, headers={})
+        lease = AzureBlobLease(self.driver, '/foo/bar', False)
+
+        result = self.driver._upload_in_chunks(response, None, iter([data]),
+                                               '/foo/bar', 'PageBlob',
+                                               lease, calculate_hash=False,
+                                               chunk_size=2048, workers=2)
+
+        self.assertEqual(result, (True, None, len(data)))
+
+        writes = sorted((headers['x-ms-range'], body)
+                        for (_, headers, body) in requests)
+        self.assertEqual(writes,
+                         [('bytes=1536-2047', b('a' * 512)),
+                          ('bytes=3072-4095', b('b' * 1024))])
+
+    def test_get_page_ranges_merges_short_zero_runs(self):
+        page = AZURE_PAGE_CHUNK_SIZE
+        data = b('\x00' * page + 'a' * page + '\x00' * page * 2 +
+                 'b' * page + '\x00' * 64 * 1024 + 'c' * page +
+                 '\x00' * page)
+
+        self.assertEqual(self.driver._get_page_ranges(data),
+                         [(page, page * 5),
+                          (page * 5 + 64 * 1024, page * 6 + 64 * 1024)])
+        self.assertEqual(self.driver._get_page_ranges(b('\x00' * page)), [])
+
+    def test_upload_sparse_page_blob(self):
+        requests = self._mock_chunk_requests()
+        response = Mock(status=httplib.CREATED, headers={})
+        lease = AzureBlobLease(self.driver, '/foo/bar', False)
+        size = 4 * 1024 * 1024
+
+        with tempfile.TemporaryFile() as file_obj:
+            file_obj.write(b('a' * 512))
+            file_obj.seek(2 * 1024 * 1024)
+            file_obj.write(b('b' * 512))
+            file_obj.truncate(size)
+            file_obj.flush()
+            file_obj.seek(0)
+
+            result = self.driver._upload_in_chunks(response, None, file_obj,
+                                                   '/foo/bar', 'PageBlob',
+                                                   lease, chunk_size=65536,
+                                                   workers=2,
+                                                   sparse_file=True)
+
+        self.assertEqual(result, (True, None, size))
+
+        writes = sorted((headers['x-ms-range'], body)
+                        for (_, headers, body) in requests)
+        self.assertEqual(writes,
+                         [('bytes=0-511', b('a' * 512)),
+                          ('bytes=2097152-2097663', b('b' * 512))])
+
+    def test_upload_block_blob_in_parallel_retries_failed_block(self):
+        block_id = base64.b64encode(b('%10d' % (2))).decode('utf-8')
+        requests = self._mock_chunk_requests(fail_once=block_id)
+        data = b('a' * 1024 * 4)
+        response = Mock(status=httplib.CREATED, headers={})
+        lease = AzureBlobLease(self.driver, '/foo/bar', False)
+
+        result = self.driver._upload_in_chunks(response, None, iter([data]),
+                                               '/foo/bar', 'BlockBlob',
+                                               lease, calculate_hash=False,
+                                               chunk_size=1024, workers=2)
+
+        self.assertEqual(result, (True, None, len(data)))
+
+        block_ids = [params['blockid'] for (params, _, _) in requests
+                     if params['comp'] == 'block']
+        self.assertEqual(len(block_ids), 5)
+        self.assertEqual(block_ids.count(block_id), 2)
+
+    def test_upload_object_invalid_block_size(self):
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        invalid = [('BlockBlob', 0), ('BlockBlob', AZURE_BLOCK_MAX_SIZE + 1),
+                   ('PageBlob', 1000)]
+
+        for (blob_type, block_size) in invalid:
+            self.assertRaises(LibcloudError,
+                              self.driver.upload_object_via_stream,
+                              iterator=iter([]), container=container,
+                              object_name='foo_test_upload',
+                              ex_blob_type=blob_type,
+                              ex_page_blob_size=AZURE_PAGE_CHUNK_SIZE,
+                              ex_block_size=block_size)
+
+    def test_copy_object(self):
+        self.mock_response_klass.type = 'COPY'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=1234, hash=None, extra={},
+                     meta_data={}, container=container, driver=self.driver)
+
+        with patch('libcloud.storage.drivers.azure_blobs.'
+                   'AZURE_COPY_POLL_INTERVAL', 0):
+            copy = obj.copy(container, object_name='copy')
+
+        self.assertEqual(copy.name, 'copy')
+        self.assertEqual(copy.size, 1234)
+        self.assertEqual(copy.hash, '0x8CFB877')
+
+    def test_copy_object_timeout(self):
+        self.mock_response_klass.type = 'COPY_TIMEOUT'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=1234, hash=None, extra={},
+                     meta_data={}, container=container, driver=self.driver)
+
+        clock = [0]
+        sleeps = []
+
+        def sleep(interval):
+            sleeps.append(interval)
+            clock[0] += interval
+
+        with patch('time.sleep', sleep):
+            with patch('time.time', lambda: clock[0]):
+                with patch('libcloud.storage.drivers.azure_blobs.'
+                           'AZURE_COPY_TIMEOUT', 6):
+                    with patch('libcloud.storage.drivers.azure_blobs.'
+                               'AZURE_COPY_MAX_POLL_INTERVAL', 4):
+                        self.assertRaises(LibcloudError, obj.copy,
+                                          container, object_name='copy')
+
+        # The poll interval grows up to the maximum
+        self.assertEqual(sleeps, [1, 2, 4])
+
     def test_delete_object_not_found(self):
         self.mock_response_klass.type = 'NOT_FOUND'
         container = Container(name='foo_bar_container', extra={},
@@ -934,5 +1182,87 @@ class AzureBlobsTests(unittest.TestCase):
         result = self.driver.delete_object(obj=obj)
         self.assertTrue(result)
 
+
+class AzureBlobLeaseTests(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = Mock()
+        self.driver.connection.request.side_effect = self._request
+        self.actions = []
+
+    def _request(self, action, headers=None, params=None, method=None):
+        lease_action = headers['x-ms-lease-action']
+        self.actions.append(lease_action)
+
+        response = Mock()
+        response.headers = {'x-ms-lease-id': 'someleaseid'}
+
+        if lease_action == 'acquire':
+            response.status = httplib.CREATED
+        else:
+            response.status = httplib.OK
+
+        return response
+
+    def test_renew_only_when_nearing_expiry(self):
+        lease = AzureBlobLease(self.driver, '/foo/bar', True,
+                               background_renewal=False)
+
+        with lease:
+            lease.renew()
+            lease.renew()
+            self.assertEqual(self.actions, ['acquire'])
+
+            lease.renewed_at -= lease.renew_interval
+            lease.renew()
+            lease.renew()
+            self.assertEqual(self.actions, ['acquire', 'renew'])
+
+            lease.renew(force=True)
+
+        self.assertEqual(self.actions,
+                         ['acquire', 'renew', 'renew', 'release'])
+
+    def test_renew_without_lease(self):
+        with AzureBlobLease(self.driver, '/foo/bar', False) as lease:
+            lease.renew(force=True)
+
+        self.assertEqual(self.actions, [])
+
+    def test_background_renewal(self):
+        lease = AzureBlobLease(self.driver, '/foo/bar', True,
+                               renew_interval=0.01)
+
+        with lease:
+            while self.actions.count('renew') < 2:
+                lease._stopped.wait(0.01)
+
+        self.assertEqual(self.actions[0], 'acquire')
+        self.assertEqual(self.actions[-1], 'release')
+        self.assertTrue(lease._renewer is None)
+
+        # No renewals happen once the lease has been released
+        count = len(self.actions)
+        lease._stopped.wait(0.05)
+        self.assertEqual(len(self.actions), count)
+
+    def test_background_renewal_failure_is_raised(self):
+        lease = AzureBlobLease(self.driver, '/foo/bar', True,
+                               renew_interval=0.01)
+
+        def request(action, headers=None, params=None, method=None):
+            response = self._request(action, headers, params, method)
+
+            if headers['x-ms-lease-action'] == 'renew':
+                response.status = httplib.CONFLICT
+
+            return response
+
+        self.driver.connection.request.side_effect = request
+
+        with lease:
+            lease._renewer.join()
+            self.assertRaises(LibcloudError, lease.renew)
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
@@ -13,20 +13,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
+import os
 import sys
 import unittest
+import socket
 import hashlib
+import tempfile
+import threading
 
 from mock import Mock
 
 from libcloud.utils.py3 import StringIO
 from libcloud.utils.py3 import PY3
 from libcloud.utils.py3 import b
+from libcloud.utils.py3 import httplib
 
 if PY3:
     from io import FileIO as file
 
-from libcloud.storage.base import StorageDriver
+import libcloud.storage.base
+import libcloud.utils.files
+
+from libcloud.common.types import LibcloudError
+from libcloud.storage.base import StorageDriver, Container, Object
+from libcloud.storage.types import ObjectDoesNotExistError
 
 from libcloud.test import StorageMockHttp # pylint: disable-msg=E0611
 
@@ -148,5 +160,477 @@ class BaseStorageTests(unittest.TestCase):
         else:
             self.fail('Invalid hash type but exception was not thrown')
 
+    def _create_file(self, data):
+        fd, file_path = tempfile.mkstemp()
+        os.write(fd, b(data))
+        os.close(fd)
+        self.addCleanup(os.unlink, file_path)
+        return file_path
+
+    def test__upload_file_reads_blocks(self):
+        data = 'a' * 100 + '\n' * 10 + 'b' * 100
+        file_path = self._create_file(data)
+        sent = []
+
+        response = Mock()
+        response.connection.connection.send = lambda d: sent.append(bytes(d))
+        response.connection.connection.sock = None
+
+        old_chunk_size = libcloud.storage.base.FILE_CHUNK_SIZE
+        libcloud.storage.base.FILE_CHUNK_SIZE = 64
+
+        try:
+            success, data_hash, bytes_transferred = \
+                self.driver1._upload_file(response=response,
+                                          file_path=file_path)
+        finally:
+            libcloud.storage.base.FILE_CHUNK_SIZE = old_chunk_size
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, hashlib.md5(b(data)).hexdigest())
+        self.assertEqual(bytes_transferred, len(data))
+        self.assertEqual(sent, [b(data[i:i + 64])
+                                for i in range(0, len(data), 64)])
+
+    @unittest.skipIf(not hasattr(socket.socket, 'sendfile'),
+                     'socket.sendfile is not available')
+    def test__upload_file_hash_is_calculated_while_sending(self):
+        data = '0123456789' * 10
+        file_path = self._create_file(data)
+        sock, peer = socket.socketpair()
+        self.addCleanup(sock.close)
+        self.addCleanup(peer.close)
+        sent = []
+
+        response = Mock()
+        response.connection.connection.sock = sock
+        response.connection.connection.send = lambda d: sent.append(bytes(d))
+
+        success, data_hash, bytes_transferred = \
+            self.driver1._upload_file(response=response, file_path=file_path)
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, hashlib.md5(b(data)).hexdigest())
+        self.assertEqual(b('').join(sent), b(data))
+
+    def test__stream_file_without_memoryview(self):
+        data = '0123456789' * 10
+        file_path = self._create_file(data)
+        sent = []
+
+        response = Mock()
+        response.connection.connection.send = lambda d: sent.append(bytes(d))
+        libcloud.utils.files.HAS_MEMORYVIEW = False
+
+        try:
+            with open(file_path, 'rb') as file_handle:
+                success, data_hash, bytes_transferred = \
+                    self.driver1._stream_file(response=response,
+                                              file_handle=file_handle,
+                                              chunk_size=32)
+        finally:
+            libcloud.utils.files.HAS_MEMORYVIEW = True
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, hashlib.md5(b(data)).hexdigest())
+        self.assertEqual(sent, [b(data[i:i + 32])
+                                for i in range(0, len(data), 32)])
+
+    def test__upload_file_chunked(self):
+        data = '1234567890'
+        file_path = self._create_file(data)
+        sent = []
+
+        response = Mock()
+        response.connection.connection.send = lambda d: sent.append(bytes(d))
+
+        with open(file_path, 'rb') as file_handle:
+            success, data_hash, bytes_transferred = \
+                self.driver1._stream_file(response=response,
+                                          file_handle=file_handle,
+                                          chunked=True, chunk_size=8)
+
+        self.assertTrue(success)
+        self.assertEqual(bytes_transferred, len(data))
+        self.assertEqual(b('').join(sent),
+                         b('8\r\n12345678\r\n2\r\n90\r\n0\r\n\r\n'))
+
+    @unittest.skipIf(not hasattr(socket.socket, 'sendfile'),
+                     'socket.sendfile is not available')
+    def test__upload_file_sendfile(self):
+        data = '0123456789' * 1000
+        file_path = self._create_file(data)
+        sock, peer = socket.socketpair()
+        self.addCleanup(sock.close)
+        self.addCleanup(peer.close)
+
+        response = Mock()
+        response.connection.connection.sock = sock
+
+        success, data_hash, bytes_transferred = \
+            self.driver1._upload_file(response=response, file_path=file_path,
+                                      calculate_hash=False)
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, None)
+        self.assertEqual(bytes_transferred, len(data))
+        self.assertFalse(response.connection.connection.send.called)
+
+        received = b('')
+        while len(received) < len(data):
+            received += peer.recv(len(data))
+
+        self.assertEqual(received, b(data))
+
+
+class RangeStorageDriver(StorageDriver):
+    """
+    Driver which serves range requests from an in-memory object.
+    """
+
+    def __init__(self, data, *args, **kwargs):
+        super(RangeStorageDriver, self).__init__(*args, **kwargs)
+        self.data = data
+        self.ranges = []
+        self.failures = set()
+        self.lock = threading.Lock()
+
+    def _get_object_range(self, obj, start_bytes, end_bytes=None):
+        with self.lock:
+            self.ranges.append((start_bytes, end_bytes))
+
+        if start_bytes in self.failures:
+            self.failures.remove(start_bytes)
+            # Connection dropped in the middle of the response
+            end_bytes = start_bytes + 1
+
+        response = Mock()
+        response.status = httplib.PARTIAL_CONTENT
+        response.response = iter([self.data[start_bytes:end_bytes]])
+        return response
+
+
+class DownloadObjectInPartsTests(unittest.TestCase):
+    def setUp(self):
+        self.data = '0123456789' * 10
+        self.driver = RangeStorageDriver(self.data, 'username', 'key',
+                                         host='localhost')
+        container = Container(name='container', extra={}, driver=self.driver)
+        self.obj = Object(name='object', size=len(self.data), hash=None,
+                          extra={}, meta_data=None, container=container,
+                          driver=self.driver)
+
+        fd, self.file_path = tempfile.mkstemp()
+        os.close(fd)
+        os.unlink(self.file_path)
+
+    def tearDown(self):
+        for path in [self.file_path, self.file_path + '.progress']:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _read_file(self):
+        with open(self.file_path, 'rb') as file_handle:
+            return file_handle.read()
+
+    def test_parallel_download(self):
+        result = self.driver._download_object_in_parts(
+            obj=self.obj, destination_path=self.file_path, part_size=15,
+            workers=4)
+
+        self.assertTrue(result)
+        self.assertEqual(self._read_file(), b(self.data))
+        self.assertEqual(len(self.driver.ranges), 7)
+        self.assertFalse(os.path.exists(self.file_path + '.progress'))
+
+    def test_failed_part_is_retried(self):
+        self.driver.failures.add(30)
+        result = self.driver._download_object_in_parts(
+            obj=self.obj, destination_path=self.file_path, part_size=15,
+            workers=2)
+
+        self.assertTrue(result)
+        self.assertEqual(self._read_file(), b(self.data))
+        self.assertEqual(self.driver.ranges.count((30, 45)), 2)
+
+    def test_resume_from_progress_file(self):
+        with open(self.file_path, 'wb') as file_handle:
+            file_handle.write(b(self.data[:50]))
+
+        with open(self.file_path + '.progress', 'w') as file_handle:
+            file_handle.write('0 25\n25 50\n')
+
+        result = self.driver._download_object_in_parts(
+            obj=self.obj, destination_path=self.file_path, part_size=25,
+            resume=True)
+
+        self.assertTrue(result)
+        self.assertEqual(self._read_file(), b(self.data))
+        self.assertEqual(self.driver.ranges, [(50, 75), (75, 100)])
+
+    def test_resume_without_progress_file_starts_from_zero(self):
+        # Preallocated file whose content was never downloaded
+        with open(self.file_path, 'wb') as file_handle:
+            file_handle.write(b('\x00' * 42))
+
+        result = self.driver._download_object_in_parts(
+            obj=self.obj, destination_path=self.file_path, part_size=50,
+            resume=True)
+
+        self.assertTrue(result)
+        self.assertEqual(self._read_file(), b(self.data))
+        self.assertEqual(self.driver.ranges, [(0, 50), (50, 100)])
+
+    def test_existing_file_without_overwrite_or_resume(self):
+        open(self.file_path, 'wb').close()
+
+        self.assertRaises(LibcloudError,
+                          self.driver._download_object_in_parts,
+                          obj=self.obj, destination_path=self.file_path)
+
+    def test_range_as_stream(self):
+        stream = self.driver._download_object_range_as_stream(
+            obj=self.obj, start_bytes=10, end_bytes=20)
+
+        self.assertEqual(b('').join(stream), b(self.data[10:20]))
+        self.assertEqual(self.driver.ranges, [(10, 20)])
+
+    def test_get_range_header(self):
+        self.assertEqual(self.driver._get_range_header(0, 10), 'bytes=0-9')
+        self.assertEqual(self.driver._get_range_header(10), 'bytes=10-')
+
+
+class ShardedStorageDriver(StorageDriver):
+    """
+    Driver which lists objects from an in-memory list of names.
+    """
+
+    supports_list_marker = True
+
+    def __init__(self, names, page_size=1000, *args, **kwargs):
+        super(ShardedStorageDriver, self).__init__(*args, **kwargs)
+        self.names = sorted(names)
+        self.page_size = page_size
+        self.prefixes = []
+        self.markers = []
+        self.page_listed = None
+
+    def _to_obj(self, name, container):
+        return Object(name=name, size=0, hash=None, extra={}, meta_data=None,
+                      container=container, driver=self)
+
+    def iterate_container_objects(self, container, ex_prefix=None,
+                                  ex_marker=None):
+        if ex_marker is not None:
+            self.markers.append(ex_marker)
+
+        for name in self.names:
+            if name.startswith(ex_prefix or '') and name > (ex_marker or ''):
+                yield self._to_obj(name, container)
+
+    def _iterate_container_level(self, container, prefix, delimiter):
+        self.prefixes.append(prefix)
+        entries = []
+
+        for obj in self.iterate_container_objects(container, prefix):
+            rest = obj.name[len(prefix):]
+
+            if delimiter in rest:
+                common = prefix + rest[:rest.index(delimiter) + 1]
+
+                if (None, common) not in entries:
+                    entries.append((None, common))
+            else:
+                entries.append((obj, None))
+
+        for index in range(0, len(entries), self.page_size):
+            if index and self.page_listed is not None:
+                self.page_listed.wait()
+
+            page = entries[index:index + self.page_size]
+            yield ([obj for (obj, _) in page if obj is not None],
+                   [common for (_, common) in page if common is not None])
+
+
+class ParallelListingTests(unittest.TestCase):
+    def setUp(self):
+        self.names = ['a.txt', 'a/1', 'a/2', 'a0', 'b/c/1', 'b/c/2', 'b/d/1',
+                      'b/e', 'c/1', 'd']
+        self.driver = ShardedStorageDriver(self.names, 1000, 'username',
+                                           'key', host='localhost')
+        self.container = Container(name='container', extra={},
+                                   driver=self.driver)
+
+    def test_ordered(self):
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=3, ordered=True)
+        self.assertEqual([o.name for o in objects], sorted(self.names))
+        self.assertEqual(self.driver.prefixes, [''])
+
+        # There are not enough prefixes so all the levels are listed
+        self.driver.prefixes = []
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=4, ordered=True)
+        self.assertEqual([o.name for o in objects], sorted(self.names))
+        self.assertEqual(sorted(self.driver.prefixes),
+                         ['', 'a/', 'b/', 'b/c/', 'b/d/', 'c/'])
+
+    def test_unordered(self):
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=100, workers=3)
+        self.assertEqual(sorted([o.name for o in objects]),
+                         sorted(self.names))
+
+    def test_prefix_and_explicit_shards(self):
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=2, prefix='b/', ordered=True)
+        self.assertEqual([o.name for o in objects],
+                         ['b/c/1', 'b/c/2', 'b/d/1', 'b/e'])
+
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=['a/', 'b/c/', 'd'], ordered=True)
+        self.assertEqual([o.name for o in objects],
+                         ['a/1', 'a/2', 'b/c/1', 'b/c/2', 'd'])
+
+    def test_explicit_shards_are_clipped_to_prefix(self):
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=['', 'b', 'c/'], prefix='b/c/',
+            ordered=True)
+        self.assertEqual([o.name for o in objects], ['b/c/1', 'b/c/2'])
+
+    def test_flat_keyspace_is_split_by_key_range(self):
+        names = ['%03d' % (index) for index in range(50)] + \
+            ['A', 'Z', 'a', 'm', 'z', 'zz', '~']
+        self.driver.names = sorted(names)
+        self.driver.page_size = 10
+
+        for ordered in [True, False]:
+            self.driver.prefixes = []
+            self.driver.markers = []
+            objects = self.driver.ex_iterate_container_objects_parallel(
+                self.container, shards=4, ordered=ordered)
+            objects = [o.name for o in objects]
+
+            if not ordered:
+                objects.sort()
+
+            self.assertEqual(objects, sorted(names))
+            self.assertEqual(self.driver.prefixes, [''])
+            # The rest of the level follows the first two pages
+            self.assertEqual(sorted(self.driver.markers),
+                             ['019', '1', 'L', 'f'])
+
+    def test_flat_keyspace_without_marker_support(self):
+        self.driver.supports_list_marker = False
+        self.driver.names = ['%03d' % (index) for index in range(50)]
+        self.driver.page_size = 10
+
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=4, ordered=True)
+
+        self.assertEqual([o.name for o in objects], self.driver.names)
+        self.assertEqual(self.driver.markers, [])
+
+    def test_discovered_objects_are_yielded_as_they_are_listed(self):
+        self.driver.supports_list_marker = False
+        self.driver.page_size = 2
+        self.driver.page_listed = threading.Event()
+
+        objects = self.driver.ex_iterate_container_objects_parallel(
+            self.container, shards=100)
+
+        # The second page of the first level hasn't been listed yet
+        self.assertEqual(next(objects).name, 'a.txt')
+
+        self.driver.page_listed.set()
+        self.assertEqual(sorted([o.name for o in objects]),
+                         sorted(self.names[1:]))
+
+
+class BulkDeleteStorageDriver(StorageDriver):
+    """
+    Driver which deletes objects from an in-memory set of names.
+    """
+
+    def __init__(self, names, batch_size=1, *args, **kwargs):
+        super(BulkDeleteStorageDriver, self).__init__(*args, **kwargs)
+        self.names = set(names)
+        self.batch_size = batch_size
+        self.batches = []
+
+    def delete_object(self, obj):
+        if obj.name == 'error':
+            raise LibcloudError('Delete failed', driver=self)
+        elif obj.name == 'false':
+            return False
+        elif obj.name not in self.names:
+            raise ObjectDoesNotExistError(value=None, driver=self,
+                                          object_name=obj.name)
+
+        self.names.remove(obj.name)
+        return True
+
+    def _get_delete_batch_size(self):
+        return self.batch_size
+
+    def _delete_object_batch(self, container, objects):
+        self.batches.append((container.name, [obj.name for obj in objects]))
+        return super(BulkDeleteStorageDriver, self)._delete_object_batch(
+            container, objects)
+
+
+class BulkDeleteTests(unittest.TestCase):
+    def setUp(self):
+        self.driver = BulkDeleteStorageDriver(['a', 'b', 'c'], 1, 'username',
+                                              'key', host='localhost')
+        self.container = Container(name='container', extra={},
+                                   driver=self.driver)
+
+    def test_delete_objects_by_name(self):
+        results = self.container.delete_objects(['a', 'missing', 'error',
+                                                 'false', 'b'])
+
+        self.assertEqual([obj.name for (obj, _) in results],
+                         ['a', 'missing', 'error', 'false', 'b'])
+        self.assertEqual([result for (_, result) in results][:2],
+                         [True, True])
+        self.assertTrue(isinstance(results[2][1], LibcloudError))
+        self.assertTrue(isinstance(results[3][1], LibcloudError))
+        self.assertEqual(results[4][1], True)
+        self.assertEqual(self.driver.names, set(['c']))
+
+    def test_delete_objects_requires_container_for_names(self):
+        self.assertRaises(ValueError, self.driver.delete_objects, ['a'])
+
+    def test_delete_objects_batches_by_container(self):
+        self.driver.batch_size = 2
+        other = Container(name='other', extra={}, driver=self.driver)
+        objects = [Object(name=name, size=0, hash=None, extra={},
+                          meta_data=None, container=container,
+                          driver=self.driver)
+                   for (name, container) in [('a', self.container),
+                                             ('x', other),
+                                             ('b', self.container),
+                                             ('c', self.container)]]
+
+        results = self.driver.delete_objects(objects, workers=1)
+
+        self.assertEqual([obj for (obj, _) in results], objects)
+        self.assertEqual(sorted(self.driver.batches),
+                         [('container', ['a', 'b']), ('container', ['c']),
+                          ('other', ['x'])])
+
+    def test_failed_batch_is_reported_for_each_object(self):
+        def delete_object_batch(container, objects):
+            raise LibcloudError('Batch failed')
+
+        self.driver._delete_object_batch = delete_object_batch
+        results = self.container.delete_objects(['a', 'b'])
+
+        self.assertEqual(len(results), 2)
+        for (_, result) in results:
+            self.assertTrue(isinstance(result, LibcloudError))
+
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
@@ -13,6 +13,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from __future__ import with_statement
+
 from hashlib import sha1
 import hmac
 import os
@@ -21,9 +23,15 @@ import math
 import sys
 import copy
 import unittest
+import threading
 
 import mock
 
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
 import libcloud.utils.files
 
 from libcloud.utils.py3 import PY3
@@ -218,6 +226,15 @@ class CloudFilesTests(unittest.TestCase):
         self.assertEqual(obj.size, 1160520)
         self.assertEqual(obj.container.name, 'test_container')
 
+    def test_iterate_container_objects_prefetch(self):
+        CloudFilesMockHttp.type = 'ITERATOR'
+        container = Container(
+            name='test_container', extra={}, driver=self.driver)
+        objects = list(self.driver.iterate_container_objects(
+            container=container, ex_prefetch=1))
+        self.assertEqual(len(objects), 5)
+        self.assertEqual(objects[0].name, 'foo-test-1')
+
     def test_get_container(self):
         container = self.driver.get_container(container_name='test_container')
         self.assertEqual(container.name, 'test_container')
@@ -585,6 +602,66 @@ class CloudFilesTests(unittest.TestCase):
         self.assertTrue(self.driver.ex_purge_object_from_cdn(obj=obj,
                                                        email='test@test.com'))
 
+    def test_delete_objects_bulk_delete(self):
+        CloudFilesMockHttp.type = 'BULK_DELETE'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        results = container.delete_objects(['obj1', 'obj 2', 'obj3'])
+
+        self.assertEqual([obj.name for (obj, _) in results],
+                         ['obj1', 'obj 2', 'obj3'])
+        self.assertEqual(results[0][1], True)
+        self.assertTrue(isinstance(results[1][1], LibcloudError))
+        self.assertEqual(results[2][1], True)
+        self.assertTrue(self.driver.supports_bulk_delete)
+
+    def test_delete_objects_without_bulk_delete_middleware(self):
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        results = container.delete_objects(['foo_bar_object',
+                                            'foo_bar_object'])
+
+        self.assertEqual([result for (_, result) in results], [True, True])
+        self.assertFalse(self.driver.supports_bulk_delete)
+
+    def test_delete_objects_bulk_delete_not_implemented(self):
+        CloudFilesMockHttp.type = 'NOT_IMPLEMENTED'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        results = container.delete_objects(['foo_bar_object',
+                                            'foo_bar_object'])
+
+        self.assertEqual([result for (_, result) in results], [True, True])
+        self.assertFalse(self.driver.supports_bulk_delete)
+
+    def test_delete_objects_bulk_delete_failure_fails_batch(self):
+        CloudFilesMockHttp.type = 'UNAVAILABLE'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        results = container.delete_objects(['obj1', 'obj2'])
+
+        self.assertTrue(isinstance(results[0][1], Exception))
+        self.assertTrue(isinstance(results[1][1], Exception))
+        self.assertTrue(self.driver.supports_bulk_delete)
+
+    def test_copy_object(self):
+        CloudFilesMockHttp.type = 'COPY'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo bar object', size=1, hash=None, extra={},
+                     container=container, meta_data=None, driver=self.driver)
+
+        copy = obj.copy(container, object_name='copy',
+                        extra={'meta_data': {'foo': 'bar'}})
+
+        self.assertEqual(copy.name, 'copy')
+        self.assertEqual(copy.hash, '0cc175b9c0f1b6a831c399e269772661')
+        self.assertEqual(copy.meta_data, {'foo': 'bar'})
+
     @mock.patch('os.path.getsize')
     def test_ex_multipart_upload_object_for_small_files(self, getsize_mock):
         getsize_mock.return_value = 0
@@ -627,6 +704,75 @@ class CloudFilesTests(unittest.TestCase):
         self.assertEqual(mocked__upload_object_part.call_count, parts)
         self.assertTrue(mocked__upload_object_manifest.call_count, 1)
 
+    def _upload_segments(self, fail_parts=None, uploaded=None, **kwargs):
+        fail_parts = set(fail_parts or [])
+        segments = {}
+        lock = threading.Lock()
+
+        def upload_object_part(container, object_name, part_number,
+                               iterator, verify_hash=True):
+            data = b('').join(iterator)
+
+            with lock:
+                if part_number in fail_parts:
+                    fail_parts.remove(part_number)
+                    raise LibcloudError('Segment upload failed')
+
+                segments.setdefault(part_number, []).append(data)
+
+        file_path = os.path.abspath(__file__)
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        with mock.patch.object(self.driver, '_upload_object_part',
+                               upload_object_part):
+            with mock.patch.object(self.driver, '_upload_object_manifest',
+                                   mock.Mock(return_value='manifest')):
+                with mock.patch.object(self.driver,
+                                       'iterate_container_objects',
+                                       mock.Mock(return_value=uploaded or [])):
+                    result = self.driver.ex_multipart_upload_object(
+                        file_path=file_path, container=container,
+                        object_name='foo_test_upload', **kwargs)
+
+        self.assertEqual(result, 'manifest')
+        return segments
+
+    def test_ex_multipart_upload_object_parallel(self):
+        with open(os.path.abspath(__file__), 'rb') as fp:
+            data = fp.read()
+
+        segments = self._upload_segments(fail_parts=[2], chunk_size=1000,
+                                         ex_workers=3)
+
+        parts = int(math.ceil(len(data) / 1000.0))
+        self.assertEqual(sorted(segments.keys()), list(range(parts)))
+        self.assertEqual(b('').join(segments[index][0]
+                                    for index in range(parts)), data)
+
+    def test_ex_multipart_upload_object_resume(self):
+        with open(os.path.abspath(__file__), 'rb') as fp:
+            data = fp.read()
+
+        def segment(index, segment_data):
+            hash_function = self.driver._get_hash_function()
+            hash_function.update(segment_data)
+            return Object(name='foo_test_upload/%08d' % index,
+                          size=len(segment_data),
+                          hash=hash_function.hexdigest(), extra={},
+                          meta_data=None, container=None, driver=self.driver)
+
+        uploaded = [segment(0, data[:1000]),
+                    segment(1, data[1000:2000]),
+                    # Partially uploaded segment
+                    segment(2, data[2000:2500])]
+
+        segments = self._upload_segments(uploaded=uploaded, chunk_size=1000,
+                                         ex_workers=2, ex_resume=True)
+
+        parts = int(math.ceil(len(data) / 1000.0))
+        self.assertEqual(sorted(segments.keys()), list(range(2, parts)))
+
     def test__upload_object_part(self):
         _put_object = CloudFilesStorageDriver._put_object
         mocked__put_object = mock.Mock(return_value="test")
@@ -836,6 +982,56 @@ class CloudFilesMockHttp(StorageMockHttp, MockHttpTestCase):
             status_code = httplib.NO_CONTENT
         return (status_code, body, headers, httplib.responses[httplib.OK])
 
+    def _v1_MossoCloudFS_BULK_DELETE(self, method, url, body, headers):
+        # test_delete_objects_bulk_delete
+        self.assertEqual(method, 'POST')
+        self.assertEqual(headers['Content-Type'], 'text/plain')
+        self.assertTrue('bulk-delete' in url)
+        self.assertEqual(body.split('\n'), ['/foo_bar_container/obj1',
+                                             '/foo_bar_container/obj%202',
+                                             '/foo_bar_container/obj3'])
+
+        body = json.dumps({'Number Deleted': 1,
+                           'Number Not Found': 1,
+                           'Response Status': '400 Bad Request',
+                           'Response Body': '',
+                           'Errors': [['/foo_bar_container/obj%202',
+                                       '409 Conflict']]})
+        return (httplib.OK, body, self.base_headers,
+                httplib.responses[httplib.OK])
+
+    def _v1_MossoCloudFS_NOT_IMPLEMENTED(self, method, url, body, headers):
+        # test_delete_objects_bulk_delete_not_implemented
+        self.assertEqual(method, 'POST')
+        return (httplib.NOT_IMPLEMENTED, '', {'content-type': 'text/plain'},
+                httplib.responses[httplib.NOT_IMPLEMENTED])
+
+    def _v1_MossoCloudFS_foo_bar_container_foo_bar_object_NOT_IMPLEMENTED(
+            self, method, url, body, headers):
+        # test_delete_objects_bulk_delete_not_implemented
+        self.assertEqual(method, 'DELETE')
+        return (httplib.NO_CONTENT, '', self.base_headers,
+                httplib.responses[httplib.NO_CONTENT])
+
+    def _v1_MossoCloudFS_UNAVAILABLE(self, method, url, body, headers):
+        # test_delete_objects_bulk_delete_failure_fails_batch
+        self.assertEqual(method, 'POST')
+        return (httplib.SERVICE_UNAVAILABLE, '',
+                {'content-type': 'text/plain'},
+                httplib.responses[httplib.SERVICE_UNAVAILABLE])
+
+    def _v1_MossoCloudFS_foo_bar_container_copy_COPY(self, method, url,
+                                                     body, headers):
+        # test_copy_object
+        self.assertEqual(method, 'PUT')
+        self.assertEqual(headers['X-Copy-From'],
+                         '/foo_bar_container/foo%20bar%20object')
+        self.assertEqual(headers['X-Object-Meta-foo'], 'bar')
+
+        headers = {'etag': '0cc175b9c0f1b6a831c399e269772661'}
+        return (httplib.CREATED, '', headers,
+                httplib.responses[httplib.CREATED])
+
     def _v1_MossoCloudFS_not_found(self, method, url, body, headers):
         # test_get_object_not_found
         if method == 'HEAD':
@@ -16,6 +16,7 @@
 import sys
 import unittest
 
+from libcloud.storage.base import Container, Object
 from libcloud.storage.drivers.google_storage import GoogleStorageDriver
 from libcloud.test.storage.test_s3 import S3Tests, S3MockHttp
 
@@ -36,6 +37,21 @@ class GoogleStorageTests(S3Tests):
         # TODO
         pass
 
+    def test_copy_object_multipart(self):
+        # Multipart uploads aren't supported, copy_object falls back to a
+        # download and an upload
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=5 * 1024 ** 3 + 1,
+                     hash=None, extra={}, container=container,
+                     meta_data={}, driver=self.driver)
+
+        self.assertRaises(NotImplementedError, self.driver._copy_object,
+                          obj, container, 'copy', None)
+
+    def test_copy_object_multipart_failure(self):
+        pass
+
 
 if __name__ == '__main__':
     sys.exit(unittest.main())
@@ -13,14 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
 import os
 import sys
 import unittest
 
+from mock import Mock, patch
+
 from xml.etree import ElementTree as ET
 from libcloud.utils.py3 import httplib
 from libcloud.utils.py3 import urlparse
 from libcloud.utils.py3 import parse_qs
+from libcloud.utils.py3 import b
 
 from libcloud.common.types import InvalidCredsError
 from libcloud.common.types import LibcloudError
@@ -31,12 +36,13 @@ from libcloud.storage.types import InvalidContainerNameError
 from libcloud.storage.types import ObjectDoesNotExistError
 from libcloud.storage.types import ObjectHashMismatchError
 from libcloud.storage.drivers.s3 import S3StorageDriver, S3USWestStorageDriver
-from libcloud.storage.drivers.s3 import S3EUWestStorageDriver
+from libcloud.storage.drivers.s3 import S3EUWestStorageDriver, NAMESPACE
 from libcloud.storage.drivers.s3 import S3APSEStorageDriver
 from libcloud.storage.drivers.s3 import S3APNEStorageDriver
 from libcloud.storage.drivers.dummy import DummyIterator
 
 from libcloud.test import StorageMockHttp, MockRawResponse # pylint: disable-msg=E0611
+from libcloud.test import MockResponse # pylint: disable-msg=E0611
 from libcloud.test import MockHttpTestCase # pylint: disable-msg=E0611
 from libcloud.test.file_fixtures import StorageFileFixtures # pylint: disable-msg=E0611
 from libcloud.test.secrets import STORAGE_S3_PARAMS
@@ -87,6 +93,13 @@ class S3MockHttp(StorageMockHttp, MockHttpTestCase):
                 self.base_headers,
                 httplib.responses[httplib.OK])
 
+    def _test_container_PREFIXES(self, method, url, body, headers):
+        body = self.fixtures.load('list_container_objects_prefixes.xml')
+        return (httplib.OK,
+                body,
+                self.base_headers,
+                httplib.responses[httplib.OK])
+
     def _test_container_ITERATOR(self, method, url, body, headers):
         if url.find('3.zip') == -1:
             # First part of the response (first 3 objects)
@@ -163,6 +176,41 @@ class S3MockHttp(StorageMockHttp, MockHttpTestCase):
                 headers,
                 httplib.responses[httplib.OK])
 
+    def _foo_bar_container_MULTI_DELETE(self, method, url, body, headers):
+        # test_delete_objects
+        self.assertEqual(method, 'POST')
+        self.assertTrue('Content-MD5' in headers)
+
+        keys = [key.text for key in ET.XML(body).findall('Object/Key')]
+        self.assertEqual(keys, ['obj1', 'obj2'])
+
+        body = self.fixtures.load('delete_objects_errors.xml')
+        return (httplib.OK,
+                body,
+                headers,
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_obj1_MULTI_DELETE(self, method, url, body,
+                                             headers):
+        return (httplib.NO_CONTENT,
+                body,
+                headers,
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_obj2_MULTI_DELETE(self, method, url, body,
+                                             headers):
+        return (httplib.FORBIDDEN,
+                body,
+                headers,
+                httplib.responses[httplib.FORBIDDEN])
+
+    def _foo_bar_container_obj3_MULTI_DELETE(self, method, url, body,
+                                             headers):
+        return (httplib.NOT_FOUND,
+                body,
+                headers,
+                httplib.responses[httplib.OK])
+
     def _foo_bar_container_NOT_FOUND(self, method, url, body, headers):
         # test_delete_container_not_found
         return (httplib.NOT_FOUND,
@@ -185,6 +233,84 @@ class S3MockHttp(StorageMockHttp, MockHttpTestCase):
                 headers,
                 httplib.responses[httplib.OK])
 
+    def _foo_bar_container_copy_COPY(self, method, url, body, headers):
+        # test_copy_object
+        self.assertEqual(method, 'PUT')
+        self.assertEqual(headers['x-amz-copy-source'],
+                         '/foo_bar_container/foo_bar_object')
+        self.assertEqual(headers['x-amz-metadata-directive'], 'REPLACE')
+        self.assertEqual(headers['x-amz-meta-foo'], 'bar')
+
+        body = self.fixtures.load('copy_object.xml')
+        return (httplib.OK,
+                body,
+                {},
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_copy_COPY_FAILED(self, method, url, body,
+                                            headers):
+        # test_copy_object_failure
+        body = '<Error><Code>InternalError</Code></Error>'
+        return (httplib.OK,
+                body,
+                {},
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_copy_COPY_MULTIPART(self, method, url, body,
+                                               headers):
+        # test_copy_object_multipart
+        query = parse_qs(urlparse.urlsplit(url).query)
+
+        if method == 'POST' and '?uploads' in url:
+            self.assertEqual(headers['x-amz-meta-old'], 'value')
+            body = self.fixtures.load('initiate_multipart.xml')
+        elif method == 'PUT':
+            self.assertEqual(headers['x-amz-copy-source'],
+                             '/foo_bar_container/foo_bar_object')
+            part_number = int(query['partNumber'][0])
+            start = (part_number - 1) * 1024 * 1024 * 1024
+            end = min(start + 1024 * 1024 * 1024, 5 * 1024 ** 3 + 1) - 1
+            self.assertEqual(headers['x-amz-copy-source-range'],
+                             'bytes=%d-%d' % (start, end))
+            body = ('<CopyPartResult xmlns="%s"><ETag>"%d"</ETag>'
+                    '</CopyPartResult>' % (NAMESPACE, part_number))
+        else:
+            self.assertEqual(method, 'POST')
+            commit = ET.fromstring(body)
+            parts = [(part.find('PartNumber').text, part.find('ETag').text)
+                     for part in commit.findall('Part')]
+            self.assertEqual(parts, [(str(number), '"%d"' % (number))
+                                     for number in range(1, 7)])
+            body = self.fixtures.load('complete_multipart.xml')
+
+        return (httplib.OK,
+                body,
+                {},
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_copy_COPY_MULTIPART_FAILED(self, method, url,
+                                                      body, headers):
+        # test_copy_object_multipart_failure
+        if method == 'POST':
+            body = self.fixtures.load('initiate_multipart.xml')
+            return (httplib.OK,
+                    body,
+                    {},
+                    httplib.responses[httplib.OK])
+        elif method == 'PUT':
+            body = '<Error><Code>InternalError</Code></Error>'
+            return (httplib.OK,
+                    body,
+                    {},
+                    httplib.responses[httplib.OK])
+
+        self.assertEqual(method, 'DELETE')
+        self.assertTrue('uploadId=' in url)
+        return (httplib.NO_CONTENT,
+                '',
+                {},
+                httplib.responses[httplib.NO_CONTENT])
+
     def _foo_bar_container_foo_test_stream_data(self, method, url, body,
                                                 headers):
         # test_upload_object_via_stream
@@ -477,6 +603,51 @@ class S3Tests(unittest.TestCase):
         self.assertTrue(obj in objects)
         self.assertEqual(len(objects), 5)
 
+    def test_iterate_container_objects_prefetch(self):
+        self.mock_response_klass.type = 'ITERATOR'
+        container = Container(name='test_container', extra={},
+                              driver=self.driver)
+        expected = self.driver.list_container_objects(container=container)
+        objects = list(self.driver.iterate_container_objects(
+            container=container, ex_prefetch=2))
+
+        self.assertEqual([o.name for o in objects],
+                         [o.name for o in expected])
+        self.assertEqual(len(objects), 5)
+
+    def test_iterate_container_object_pages_are_parsed_lazily(self):
+        self.mock_response_klass.type = None
+        container = Container(name='test_container', extra={},
+                              driver=self.driver)
+        pages = self.driver._iterate_container_object_pages(container, {})
+
+        page = next(pages)
+        self.assertFalse(isinstance(page, list))
+        self.assertEqual([o.name for o in page], ['1.zip'])
+        self.assertRaises(StopIteration, next, pages)
+
+    def test_iterate_container_objects_with_marker(self):
+        self.mock_response_klass.type = 'ITERATOR'
+        container = Container(name='test_container', extra={},
+                              driver=self.driver)
+        objects = self.driver.iterate_container_objects(container=container,
+                                                        ex_marker='3.zip')
+
+        self.assertEqual([o.name for o in objects], ['4.zip', '5.zip'])
+
+    def test_iterate_container_level(self):
+        self.mock_response_klass.type = 'PREFIXES'
+        container = Container(name='test_container', extra={},
+                              driver=self.driver)
+        pages = list(self.driver._iterate_container_level(
+            container, 'logs/', '/'))
+
+        self.assertEqual(len(pages), 1)
+        objects, prefixes = pages[0]
+
+        self.assertEqual([o.name for o in objects], ['logs/index.txt'])
+        self.assertEqual(prefixes, ['logs/2013/', 'logs/2014/'])
+
     def test_list_container_objects_with_prefix(self):
         self.mock_response_klass.type = None
         container = Container(name='test_container', extra={},
@@ -661,6 +832,29 @@ class S3Tests(unittest.TestCase):
                                                        chunk_size=None)
         self.assertTrue(hasattr(stream, '__iter__'))
 
+    def test_download_object_as_stream_range(self):
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        obj = Object(name='foo_bar_object', size=1000, hash=None, extra={},
+                     container=container, meta_data=None,
+                     driver=self.driver_type)
+
+        response = MockResponse(httplib.PARTIAL_CONTENT, '0123456789')
+        raw_response = Mock()
+        raw_response.status = httplib.PARTIAL_CONTENT
+        raw_response.response = response
+        self.driver.connection.request = Mock(return_value=raw_response)
+
+        stream = self.driver.download_object_as_stream(obj=obj,
+                                                       ex_start_bytes=10,
+                                                       ex_end_bytes=20)
+        self.assertEqual(b('').join(stream), b('0123456789'))
+
+        call_kwargs = self.driver.connection.request.call_args[1]
+        self.assertEqual(call_kwargs['headers'], {'Range': 'bytes=10-19'})
+        self.assertTrue(call_kwargs['raw'])
+
     def test_upload_object_invalid_ex_storage_class(self):
         # Invalid hash is detected on the amazon side and BAD_REQUEST is
         # returned
@@ -772,11 +966,70 @@ class S3Tests(unittest.TestCase):
         obj = self.driver.upload_object_via_stream(container=container,
                                                    object_name=object_name,
                                                    iterator=iterator,
-                                                   extra=extra)
+                                                   extra=extra,
+                                                   ex_part_size=1)
 
         self.assertEqual(obj.name, object_name)
         self.assertEqual(obj.size, 3)
 
+    def test_upload_object_via_stream_parallel_parts(self):
+        if not self.driver.supports_s3_multipart_upload:
+            return
+
+        self.mock_raw_response_klass.type = 'MULTIPART'
+        self.mock_response_klass.type = 'MULTIPART'
+
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        object_name = 'foo_test_stream_data'
+        iterator = DummyIterator(data=['22', '33', '55'])
+        extra = {'content_type': 'text/plain'}
+        obj = self.driver.upload_object_via_stream(container=container,
+                                                   object_name=object_name,
+                                                   iterator=iterator,
+                                                   extra=extra,
+                                                   ex_part_size=2,
+                                                   ex_workers=3)
+
+        self.assertEqual(obj.name, object_name)
+        self.assertEqual(obj.size, 6)
+
+    def test_upload_object_via_stream_part_is_retried(self):
+        if not self.driver.supports_s3_multipart_upload:
+            return
+
+        self.mock_raw_response_klass.type = 'MULTIPART'
+        self.mock_response_klass.type = 'MULTIPART'
+
+        old_func = self.driver_type._upload_part
+        calls = []
+
+        def upload_part(self, object_path, upload_id, part_number, data):
+            calls.append(part_number)
+
+            if part_number == 2 and calls.count(2) == 1:
+                raise LibcloudError('Error uploading chunk', driver=self)
+
+            return old_func(self, object_path, upload_id, part_number, data)
+
+        self.driver_type._upload_part = upload_part
+
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        object_name = 'foo_test_stream_data'
+        iterator = DummyIterator(data=['2', '3', '5'])
+        extra = {'content_type': 'text/plain'}
+
+        try:
+            obj = self.driver.upload_object_via_stream(
+                container=container, object_name=object_name,
+                iterator=iterator, extra=extra, ex_part_size=1)
+        finally:
+            self.driver_type._upload_part = old_func
+
+        self.assertEqual(obj.size, 3)
+        self.assertEqual(calls, [1, 2, 2, 3])
+
     def test_upload_object_via_stream_abort(self):
         if not self.driver.supports_s3_multipart_upload:
             return
@@ -856,6 +1109,76 @@ class S3Tests(unittest.TestCase):
         result = self.driver.delete_object(obj=obj)
         self.assertTrue(result)
 
+    def test_delete_objects(self):
+        self.mock_response_klass.type = 'MULTI_DELETE'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+
+        # obj3 is deleted by a separate request
+        with patch.object(self.driver, '_get_delete_batch_size',
+                          Mock(return_value=2)):
+            results = container.delete_objects(['obj1', 'obj2', 'obj3'])
+
+        self.assertEqual([obj.name for (obj, _) in results],
+                         ['obj1', 'obj2', 'obj3'])
+        self.assertEqual(results[0][1], True)
+        self.assertTrue(isinstance(results[1][1], Exception))
+        self.assertEqual(results[2][1], True)
+
+    def test_copy_object(self):
+        self.mock_response_klass.type = 'COPY'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=1000, hash=None, extra={},
+                     container=container, meta_data={'old': 'value'},
+                     driver=self.driver)
+
+        copy = obj.copy(container, object_name='copy',
+                        extra={'meta_data': {'foo': 'bar'}})
+
+        self.assertEqual(copy.name, 'copy')
+        self.assertEqual(copy.size, 1000)
+        self.assertEqual(copy.hash, '0cc175b9c0f1b6a831c399e269772661')
+        self.assertEqual(copy.meta_data, {'foo': 'bar'})
+        self.assertEqual(copy.extra['last_modified'],
+                         '2013-09-15T12:41:35.000Z')
+
+    def test_copy_object_multipart(self):
+        self.mock_response_klass.type = 'COPY_MULTIPART'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=5 * 1024 ** 3 + 1,
+                     hash=None, extra={}, container=container,
+                     meta_data={'old': 'value'}, driver=self.driver)
+
+        copy = obj.copy(container, object_name='copy')
+
+        self.assertEqual(copy.name, 'copy')
+        self.assertEqual(copy.size, 5 * 1024 ** 3 + 1)
+        self.assertEqual(copy.hash, '3858f62230ac3c915f300c664312c11f-9')
+        self.assertEqual(copy.meta_data, {'old': 'value'})
+
+    def test_copy_object_multipart_failure(self):
+        self.mock_response_klass.type = 'COPY_MULTIPART_FAILED'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=5 * 1024 ** 3 + 1,
+                     hash=None, extra={}, container=container,
+                     meta_data={}, driver=self.driver)
+
+        self.assertRaises(LibcloudError, self.driver.copy_object, obj,
+                          container, 'copy')
+
+    def test_copy_object_failure(self):
+        self.mock_response_klass.type = 'COPY_FAILED'
+        container = Container(name='foo_bar_container', extra={},
+                              driver=self.driver)
+        obj = Object(name='foo_bar_object', size=1000, hash=None, extra={},
+                     container=container, meta_data={}, driver=self.driver)
+
+        self.assertRaises(LibcloudError, self.driver.copy_object, obj,
+                          container, 'copy')
+
 
 class S3USWestTests(S3Tests):
     driver_type = S3USWestStorageDriver
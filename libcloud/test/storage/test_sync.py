@@ -0,0 +1,241 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import with_statement
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+
+from libcloud.utils.py3 import b
+from libcloud.utils.files import exhaust_iterator
+from libcloud.common.types import LibcloudError
+from libcloud.storage.base import StorageDriver, Container, Object
+from libcloud.storage.types import ObjectDoesNotExistError
+from libcloud.storage.sync import sync_directory, sync_containers
+from libcloud.storage.sync import COMPARE_SIZE, COMPARE_MTIME, COMPARE_HASH
+
+
+class MemoryStorageDriver(StorageDriver):
+    """
+    Driver which stores objects in memory.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(MemoryStorageDriver, self).__init__('key', 'secret',
+                                                  *args, **kwargs)
+        self.objects = {}
+        self.copies = []
+        self.lock = threading.Lock()
+
+    def add(self, container, name, data, mtime=None, hash=None):
+        data = b(data)
+        mtime = mtime or time.time()
+        obj = Object(name=name, size=len(data),
+                     hash=hash or hashlib.md5(data).hexdigest(),
+                     extra={'last_modified':
+                            time.strftime('%a, %d %b %Y %H:%M:%S GMT',
+                                          time.gmtime(mtime))},
+                     meta_data={}, container=container, driver=self)
+
+        with self.lock:
+            self.objects[(container.name, name)] = (obj, data)
+
+        return obj
+
+    def get_data(self, container, name):
+        return self.objects[(container.name, name)][1]
+
+    def iterate_container_objects(self, container, ex_prefix=None):
+        for key in sorted(self.objects):
+            (obj, _) = self.objects[key]
+
+            if key[0] == container.name and \
+               obj.name.startswith(ex_prefix or ''):
+                yield obj
+
+    def download_object_as_stream(self, obj, chunk_size=None):
+        yield self.get_data(obj.container, obj.name)
+
+    def upload_object(self, file_path, container, object_name, extra=None,
+                      verify_hash=True):
+        if object_name.endswith('error'):
+            raise LibcloudError('Upload failed', driver=self)
+
+        with open(file_path, 'rb') as file_handle:
+            return self.add(container, object_name, file_handle.read())
+
+    def upload_object_via_stream(self, iterator, container, object_name,
+                                 extra=None):
+        return self.add(container, object_name, exhaust_iterator(iterator))
+
+    def delete_object(self, obj):
+        with self.lock:
+            if self.objects.pop((obj.container.name, obj.name), None):
+                return True
+
+        raise ObjectDoesNotExistError(value=None, driver=self,
+                                      object_name=obj.name)
+
+    def _copy_object(self, obj, container, object_name, extra):
+        self.copies.append((obj.name, object_name))
+        return self.add(container, object_name,
+                        self.get_data(obj.container, obj.name))
+
+
+class SyncDirectoryTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.driver = MemoryStorageDriver()
+        self.container = Container(name='container', extra={},
+                                   driver=self.driver)
+
+        self._write('a.txt', 'a')
+        self._write('dir/b.txt', 'bb')
+        self._write('dir/sub/c.txt', 'ccc')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _write(self, name, data, mtime=None):
+        file_path = os.path.join(self.path, *name.split('/'))
+
+        if not os.path.exists(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+
+        with open(file_path, 'wb') as file_handle:
+            file_handle.write(b(data))
+
+        if mtime is not None:
+            os.utime(file_path, (mtime, mtime))
+
+    def test_initial_sync_uploads_all_files(self):
+        results = sync_directory(self.path, self.container, prefix='backup/')
+
+        self.assertEqual(results,
+                         [('backup/a.txt', 'upload', True),
+                          ('backup/dir/b.txt', 'upload', True),
+                          ('backup/dir/sub/c.txt', 'upload', True)])
+        self.assertEqual(self.driver.get_data(self.container,
+                                              'backup/dir/sub/c.txt'),
+                         b('ccc'))
+
+        # Nothing changed
+        self.assertEqual(sync_directory(self.path, self.container,
+                                        prefix='backup/'), [])
+
+    def test_only_changed_files_are_uploaded(self):
+        now = time.time()
+        self.driver.add(self.container, 'a.txt', 'a', mtime=now)
+        self.driver.add(self.container, 'dir/b.txt', 'bb', mtime=now)
+        self.driver.add(self.container, 'dir/sub/c.txt', 'cc', mtime=now)
+
+        # Newer than the uploaded object, but with the same content
+        self._write('a.txt', 'x', mtime=now + 60)
+
+        results = sync_directory(self.path, self.container,
+                                 compare=COMPARE_SIZE)
+        self.assertEqual(results, [('dir/sub/c.txt', 'upload', True)])
+
+        results = sync_directory(self.path, self.container,
+                                 compare=COMPARE_MTIME, dry_run=True)
+        self.assertEqual(results, [('a.txt', 'upload', None)])
+
+        results = sync_directory(self.path, self.container,
+                                 compare=COMPARE_HASH)
+        self.assertEqual(results, [('a.txt', 'upload', True)])
+        self.assertEqual(self.driver.get_data(self.container, 'a.txt'),
+                         b('x'))
+
+    def test_delete_and_failures(self):
+        self.driver.add(self.container, 'extra.txt', 'e')
+        self.driver.add(self.container, 'other/extra.txt', 'e')
+        self._write('upload.error', 'e')
+
+        results = sync_directory(self.path, self.container, delete=True,
+                                 workers=2)
+        results = dict(((name, action), result)
+                       for (name, action, result) in results)
+
+        self.assertTrue(isinstance(results[('upload.error', 'upload')],
+                                   LibcloudError))
+        self.assertEqual(results[('extra.txt', 'delete')], True)
+        self.assertEqual(results[('other/extra.txt', 'delete')], True)
+        self.assertEqual(len(results), 6)
+
+    def test_invalid_compare(self):
+        self.assertRaises(ValueError, sync_directory, self.path,
+                          self.container, compare='invalid')
+
+
+class SyncContainersTests(unittest.TestCase):
+    def setUp(self):
+        self.driver = MemoryStorageDriver()
+        self.source = Container(name='source', extra={}, driver=self.driver)
+        self.destination = Container(name='destination', extra={},
+                                     driver=self.driver)
+
+        self.driver.add(self.source, 'logs/1', 'one')
+        self.driver.add(self.source, 'logs/2', 'two')
+        self.driver.add(self.source, 'other', 'other')
+
+    def test_server_side_copy(self):
+        self.driver.add(self.destination, 'archive/1', 'one')
+        self.driver.add(self.destination, 'archive/2', 'TWO')
+        self.driver.add(self.destination, 'archive/3', 'three')
+
+        results = sync_containers(self.source, self.destination,
+                                  prefix='logs/',
+                                  destination_prefix='archive/',
+                                  delete=True)
+
+        self.assertEqual(results, [('archive/2', 'copy', True),
+                                   ('archive/3', 'delete', True)])
+        self.assertEqual(self.driver.copies, [('logs/2', 'archive/2')])
+        self.assertEqual(self.driver.get_data(self.destination, 'archive/2'),
+                         b('two'))
+
+    def test_copy_between_drivers(self):
+        other_driver = MemoryStorageDriver()
+        destination = Container(name='destination', extra={},
+                                driver=other_driver)
+
+        results = sync_containers(self.source, destination)
+
+        self.assertEqual([name for (name, _, _) in results],
+                         ['logs/1', 'logs/2', 'other'])
+        self.assertEqual(self.driver.copies, [])
+        self.assertEqual(other_driver.get_data(destination, 'other'),
+                         b('other'))
+
+    def test_hash_falls_back_to_mtime(self):
+        now = time.time()
+        source = Container(name='multipart', extra={}, driver=self.driver)
+        self.driver.add(source, 'old', 'data', mtime=now - 60, hash='x-2')
+        self.driver.add(source, 'new', 'data', mtime=now + 60, hash='x-2')
+        self.driver.add(self.destination, 'old', 'data', mtime=now)
+        self.driver.add(self.destination, 'new', 'data', mtime=now)
+
+        results = sync_containers(source, self.destination, dry_run=True)
+        self.assertEqual(results, [('new', 'copy', None)])
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -15,11 +15,20 @@
 # limitations under the License.
 
 import sys
+import socket
+import threading
 import unittest
 
+from io import BytesIO
+
 from mock import Mock
 
-from libcloud.common.base import Connection
+from libcloud.utils.py3 import httplib
+from libcloud.utils.py3 import b
+from libcloud.common.base import Connection, ConnectionPool
+from libcloud.common.base import RequestStateAttribute
+from libcloud.common.base import StreamingXmlResponse, XmlResponse
+from libcloud.common.types import MalformedResponseError
 
 
 class ConnectionClassTestCase(unittest.TestCase):
@@ -84,5 +93,277 @@ class ConnectionClassTestCase(unittest.TestCase):
         self.assertEqual(call_kwargs['headers']['Content-Length'], '1')
 
 
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(max_size=2, idle_timeout=60)
+
+    def test_acquire_reuses_released_connection(self):
+        connection, reused = self.pool.acquire(key='a', factory=Mock)
+        self.assertFalse(reused)
+
+        self.pool.release(key='a', connection=connection)
+
+        connection2, reused = self.pool.acquire(key='a', factory=Mock)
+        self.assertTrue(reused)
+        self.assertTrue(connection is connection2)
+
+        # Different endpoint never shares a connection
+        connection3, reused = self.pool.acquire(key='b', factory=Mock)
+        self.assertFalse(reused)
+        self.assertFalse(connection3 is connection)
+
+    def test_release_closes_connections_over_max_size(self):
+        connections = [Mock(), Mock(), Mock()]
+
+        for connection in connections:
+            self.pool.release(key='a', connection=connection)
+
+        self.assertFalse(connections[0].close.called)
+        self.assertFalse(connections[1].close.called)
+        self.assertTrue(connections[2].close.called)
+
+    def test_idle_connections_are_evicted(self):
+        self.pool.idle_timeout = 0
+        connection = Mock()
+        self.pool.release(key='a', connection=connection)
+        self.pool._idle['a'][0] = (connection, 0)
+
+        connection2, reused = self.pool.acquire(key='a', factory=Mock)
+        self.assertFalse(reused)
+        self.assertTrue(connection.close.called)
+
+    def test_discard(self):
+        connection = Mock()
+        self.pool.release(key='a', connection=connection)
+        self.pool.discard(key='a')
+
+        self.assertTrue(connection.close.called)
+        _, reused = self.pool.acquire(key='a', factory=Mock)
+        self.assertFalse(reused)
+
+
+class ConnectionKeepAliveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.conn_cls = Mock()
+        self.conn_cls.side_effect = lambda **kwargs: Mock()
+
+        self.con = Connection(host='localhost')
+        self.con.conn_classes = (self.conn_cls, self.conn_cls)
+        self.con.connection_pool = ConnectionPool()
+        self.con.responseCls = Mock()
+
+    def test_connection_is_reused_between_requests(self):
+        self.con.request('/test')
+        connection = self.con.connection
+        self.con.request('/test')
+
+        self.assertTrue(self.con.connection is connection)
+        self.assertEqual(self.conn_cls.call_count, 1)
+        self.assertEqual(connection.request.call_count, 2)
+
+    def test_unread_response_connection_is_not_reused(self):
+        self.con.request('/test')
+        connection = self.con.connection
+        connection.getresponse.return_value.isclosed.return_value = False
+        self.con.request('/test')
+
+        self.assertTrue(connection.close.called)
+        self.con.request('/test')
+        self.assertFalse(self.con.connection is connection)
+
+    def test_stale_connection_is_reconnected(self):
+        self.con.request('/test')
+        stale = self.con.connection
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+
+        self.con.request('/test')
+
+        self.assertTrue(stale.close.called)
+        self.assertFalse(self.con.connection is stale)
+        self.assertEqual(self.con.connection.request.call_count, 1)
+
+    def test_post_after_idle_period_uses_new_connection(self):
+        self.con.request('/test')
+        stale = self.con.connection
+
+        # Server closes the idle keep-alive connection
+        stale.request.side_effect = socket.error('Broken pipe')
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+
+        self.con.request('/test', method='POST')
+
+        self.assertEqual(stale.request.call_count, 1)
+        self.assertFalse(self.con.connection is stale)
+        self.assertEqual(self.conn_cls.call_count, 2)
+        self.assertEqual(self.con.connection.request.call_count, 1)
+
+    def test_raw_request_uses_new_connection(self):
+        self.con.request('/test')
+        pooled = self.con.connection
+
+        self.con.request('/test', method='PUT', raw=True)
+
+        self.assertFalse(self.con.connection is pooled)
+        self.assertEqual(self.conn_cls.call_count, 2)
+
+    def test_fresh_connection_error_is_propagated(self):
+        self.conn_cls.side_effect = None
+        self.conn_cls.return_value.getresponse.side_effect = \
+            httplib.BadStatusLine('')
+
+        self.assertRaises(httplib.BadStatusLine, self.con.request, '/test')
+
+
+class RequestStateTestCase(unittest.TestCase):
+    def test_request_state_attribute_is_per_thread(self):
+        class Foo(object):
+            bar = RequestStateAttribute('bar', 'default')
+
+        foo = Foo()
+        self.assertEqual(foo.bar, 'default')
+
+        foo.bar = 'main'
+        values = []
+        started = threading.Event()
+        event = threading.Event()
+
+        def worker():
+            # Not set in this thread, values of other threads are not visible
+            values.append(foo.bar)
+            foo.bar = 'worker'
+            started.set()
+            event.wait()
+            values.append(foo.bar)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        started.wait()
+
+        foo.bar = 'main2'
+        event.set()
+        thread.join()
+
+        self.assertEqual(values, ['default', 'worker'])
+        self.assertEqual(foo.bar, 'main2')
+
+    def test_concurrent_requests(self):
+        barrier = threading.Barrier(5) if hasattr(threading, 'Barrier') \
+            else None
+
+        def factory(**kwargs):
+            connection = Mock()
+
+            def request(method, url, body, headers):
+                if barrier:
+                    barrier.wait()
+
+            connection.request.side_effect = request
+            return connection
+
+        con = Connection(host='localhost')
+        con.conn_classes = (factory, factory)
+        con.connection_pool = ConnectionPool()
+        con.responseCls = Mock()
+
+        result = {}
+
+        def worker(index):
+            con.request('/test/%s' % (index))
+            result[index] = (con.action, con.connection)
+
+        threads = [threading.Thread(target=worker, args=(index,))
+                   for index in range(5)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        for index in range(5):
+            action, connection = result[index]
+            self.assertEqual(action, '/test/%s' % (index))
+            call_kwargs = connection.request.call_args[1]
+            self.assertEqual(call_kwargs['url'], '/test/%s' % (index))
+
+        connections = set([id(result[index][1]) for index in range(5)])
+        self.assertEqual(len(connections), 5)
+
+
+class StreamingXmlResponseTestCase(unittest.TestCase):
+    BODY = ('<Result><Marker>next</Marker>' +
+            ''.join(['<Items><Item>%d</Item></Items>' % (i)
+                     for i in range(5)]) +
+            '<Nested><Item>x</Item></Nested></Result>')
+
+    def setUp(self):
+        self.http_response = Mock()
+        self.http_response.status = httplib.OK
+        self.http_response.reason = 'OK'
+        self.http_response.getheaders.return_value = []
+        self.http_response.isclosed.return_value = True
+
+        self.conn_cls = Mock()
+        self.conn_cls.return_value.getresponse.return_value = \
+            self.http_response
+
+        self.con = Connection(host='localhost')
+        self.con.conn_classes = (self.conn_cls, self.conn_cls)
+        self.con.connection_pool = ConnectionPool()
+        self.con.responseCls = XmlResponse
+
+    def _set_body(self, body):
+        self.http_response.read.side_effect = BytesIO(b(body)).read
+
+    def test_elements_are_yielded_incrementally(self):
+        self._set_body(self.BODY)
+        response = self.con.request('/test', stream=True)
+        self.assertTrue(isinstance(response, StreamingXmlResponse))
+
+        items = []
+        for index, element in enumerate(response.iterparse(xpath='Items/Item')):
+            items.append(element.text)
+            # Previously yielded elements have been removed from the tree
+            self.assertEqual(len(response.object.findall('Items/Item')),
+                             5 - index)
+
+            # Connection is not released until the body has been consumed
+            self.assertEqual(self.con.connection_pool._idle, {})
+
+        self.assertEqual(items, ['0', '1', '2', '3', '4'])
+        self.assertEqual(response.object.findtext('Marker'), 'next')
+        self.assertEqual(response.object.findtext('Nested/Item'), 'x')
+        self.assertEqual(len(list(self.con.connection_pool._idle.values())[0]),
+                         1)
+
+    def test_connection_is_closed_if_not_consumed(self):
+        self._set_body(self.BODY)
+        self.http_response.isclosed.return_value = False
+        response = self.con.request('/test', stream=True)
+        connection = self.con.connection
+
+        for element in response.iterparse(xpath='Items/Item'):
+            break
+
+        response.close()
+        self.assertTrue(connection.close.called)
+        self.assertEqual(self.con.connection_pool._idle, {})
+
+    def test_malformed_body(self):
+        self._set_body('<Result><Items>')
+        response = self.con.request('/test', stream=True)
+
+        self.assertRaises(MalformedResponseError, list,
+                          response.iterparse(xpath='Items/Item'))
+
+    def test_error_response_is_processed_by_response_class(self):
+        self._set_body('<Error>bad</Error>')
+        self.http_response.status = httplib.BAD_REQUEST
+
+        self.assertRaises(Exception, self.con.request, '/test', stream=True)
+        self.assertEqual(
+            len(list(self.con.connection_pool._idle.values())[0]), 1)
+
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
@@ -21,7 +21,10 @@ import gzip
 from mock import Mock
 
 from libcloud.utils.py3 import httplib, b, StringIO, PY3
+from libcloud.utils.files import read_in_chunks
+from libcloud.utils.compression import DecompressingReader
 from libcloud.common.base import Response, XmlResponse, JsonResponse
+from libcloud.common.base import RawResponse
 from libcloud.common.types import MalformedResponseError
 
 
@@ -146,6 +149,102 @@ class ResponseClassesTests(unittest.TestCase):
         body = response.parse_body()
         self.assertEqual(body, original_data)
 
+    def _gzip(self, data):
+        if PY3:
+            from io import BytesIO
+            string_io = BytesIO()
+        else:
+            string_io = StringIO()
+
+        stream = gzip.GzipFile(fileobj=string_io, mode='w')
+        stream.write(b(data))
+        stream.close()
+        return string_io.getvalue()
+
+    def test_gzip_encoding_is_decompressed_incrementally(self):
+        original_data = ''.join([str(i) for i in range(100000)])
+        compressed_data = self._gzip(original_data)
+        reads = []
+
+        if PY3:
+            from io import BytesIO
+            stream = BytesIO(compressed_data)
+        else:
+            stream = StringIO(compressed_data)
+
+        def read(amt=None):
+            reads.append(amt)
+            return stream.read(amt)
+
+        self._mock_response.read.side_effect = read
+        self._mock_response.getheaders.return_value = \
+                {'Content-Encoding': 'gzip'}
+
+        response = Response(response=self._mock_response,
+                            connection=self._mock_connection)
+
+        self.assertEqual(response.parse_body(), original_data)
+        self.assertTrue(None not in reads)
+        self.assertTrue(len(reads) > 1)
+
+    def test_raw_response_is_decompressed_while_streaming(self):
+        original_data = 'foo bar ponies, wooo gzip' * 1000
+        compressed_data = self._gzip(original_data)
+
+        if PY3:
+            from io import BytesIO
+            stream = BytesIO(compressed_data)
+        else:
+            stream = StringIO(compressed_data)
+
+        self._mock_response.read.side_effect = stream.read
+        self._mock_response.getheader.return_value = 'gzip'
+        self._mock_connection.connection.getresponse.return_value = \
+                self._mock_response
+
+        response = RawResponse(connection=self._mock_connection,
+                               decompress=True)
+        self.assertTrue(isinstance(response.response, DecompressingReader))
+        self.assertEqual(response.status, httplib.OK)
+
+        data = b('').join(read_in_chunks(response.response, chunk_size=100))
+        self.assertEqual(data, b(original_data))
+        self.assertEqual(response.response.bytes_read, len(compressed_data))
+
+    def test_decompressing_reader_read_all(self):
+        original_data = 'foo bar ponies, wooo gzip' * 1000
+        compressed_data = self._gzip(original_data)
+
+        if PY3:
+            from io import BytesIO
+            stream = BytesIO(compressed_data)
+        else:
+            stream = StringIO(compressed_data)
+
+        reader = DecompressingReader(stream, 'gzip', chunk_size=100)
+        self.assertEqual(reader.read(10), b(original_data[:10]))
+        self.assertEqual(reader.read(), b(original_data[10:]))
+        self.assertEqual(reader.read(), b(''))
+
+    def test_raw_response_is_not_decompressed_by_default(self):
+        # Objects which are stored compressed are downloaded as stored
+        self._mock_response.getheader.return_value = 'gzip'
+        self._mock_connection.connection.getresponse.return_value = \
+                self._mock_response
+
+        response = RawResponse(connection=self._mock_connection)
+        self.assertTrue(response.response is self._mock_response)
+
+    def test_raw_response_partial_content_is_not_decompressed(self):
+        self._mock_response.status = httplib.PARTIAL_CONTENT
+        self._mock_response.getheader.return_value = 'gzip'
+        self._mock_connection.connection.getresponse.return_value = \
+                self._mock_response
+
+        response = RawResponse(connection=self._mock_connection,
+                               decompress=True)
+        response.success = lambda: True
+        self.assertTrue(response.response is self._mock_response)
 
 
 if __name__ == '__main__':
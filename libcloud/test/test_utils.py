@@ -18,6 +18,11 @@ import sys
 import unittest
 import warnings
 import os.path
+import tempfile
+
+from io import BytesIO
+
+from mock import patch
 
 # In Python > 2.7 DeprecationWarnings are disabled by default
 warnings.simplefilter('default')
@@ -25,6 +30,9 @@ warnings.simplefilter('default')
 import libcloud.utils.files
 
 from libcloud.utils.misc import get_driver, set_driver
+from libcloud.utils.concurrency import parallel_map, prefetch, retry
+from libcloud.utils.concurrency import interleave, merge_sorted
+from libcloud.utils.concurrency import chain_prefetched
 
 from libcloud.utils.py3 import PY3
 from libcloud.utils.py3 import StringIO
@@ -180,6 +188,75 @@ class TestUtils(unittest.TestCase):
 
             self.assertEqual(index, 548)
 
+    def test_read_in_chunks_fill_size_uneven_pieces(self):
+        data = ''.join([str(x % 10) for x in range(1000)])
+        pieces = [data[:3], data[3:500], data[500:501], data[501:]]
+
+        result = list(libcloud.utils.files.read_in_chunks(iter(pieces),
+                                                          chunk_size=64,
+                                                          fill_size=True))
+
+        self.assertEqual(result, [b(data[i:i + 64])
+                                  for i in range(0, len(data), 64)])
+
+    def test_read_in_chunks_readinto(self):
+        class ShortReadFile(BytesIO):
+            # Returns at most 5 bytes per read like a socket would
+            def readinto(self, buf):
+                return BytesIO.readinto(self, memoryview(buf)[:5])
+
+        data = b('0123456789' * 10)
+
+        for file_obj in [BytesIO(data), ShortReadFile(data)]:
+            result = list(libcloud.utils.files.read_in_chunks(
+                file_obj, chunk_size=32, fill_size=True))
+
+            self.assertEqual(result, [data[i:i + 32]
+                                      for i in range(0, len(data), 32)])
+
+    def test_read_in_chunks_without_memoryview(self):
+        data = b('0123456789' * 10)
+        pieces = [data[:3], data[3:50], data[50:51], data[51:]]
+        expected = [data[i:i + 32] for i in range(0, len(data), 32)]
+        libcloud.utils.files.HAS_MEMORYVIEW = False
+
+        try:
+            for iterator in [iter(pieces), BytesIO(data)]:
+                result = list(libcloud.utils.files.read_in_chunks(
+                    iterator, chunk_size=32, fill_size=True))
+                self.assertEqual(result, expected)
+        finally:
+            libcloud.utils.files.HAS_MEMORYVIEW = True
+
+    def test_get_data_ranges(self):
+        size = 4 * 1024 * 1024
+        offsets = [0, 2 * 1024 * 1024]
+
+        with tempfile.TemporaryFile() as file_obj:
+            for offset in offsets:
+                file_obj.seek(offset)
+                file_obj.write(b('a' * 512))
+
+            file_obj.truncate(size)
+            file_obj.flush()
+
+            ranges = list(libcloud.utils.files.get_data_ranges(file_obj))
+
+            # Holes are only detected if the file system supports them, but
+            # all the data must always be covered
+            for offset in offsets:
+                self.assertTrue([(start, end) for (start, end) in ranges
+                                 if start <= offset and offset + 512 <= end])
+
+            position = 0
+            for (start, end) in ranges:
+                self.assertTrue(position <= start < end <= size)
+                position = end
+
+        with tempfile.TemporaryFile() as file_obj:
+            self.assertEqual(
+                list(libcloud.utils.files.get_data_ranges(file_obj)), [])
+
     def test_exhaust_iterator(self):
         def iterator_func():
             for x in range(0, 1000):
@@ -205,5 +282,157 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(result, b(data))
 
 
+class TestConcurrencyUtils(unittest.TestCase):
+    def test_parallel_map(self):
+        for workers in [1, 4]:
+            result = list(parallel_map(lambda x: x * 2, range(10),
+                                       workers=workers, ordered=True))
+            self.assertEqual(result, [(x, x * 2) for x in range(10)])
+
+            result = parallel_map(lambda x: x * 2, range(10), workers=workers)
+            self.assertEqual(sorted(result), [(x, x * 2) for x in range(10)])
+
+    def test_parallel_map_bounds_items_in_flight(self):
+        taken = []
+
+        def items():
+            for index in range(20):
+                taken.append(index)
+                yield index
+
+        for item, result in parallel_map(lambda x: x, items(), workers=3):
+            # Items which are not yet yielded are either in flight or done
+            self.assertTrue(len(taken) <= item + 1 + 3)
+
+    def test_parallel_map_propagates_error(self):
+        def func(item):
+            if item == 5:
+                raise ValueError('error')
+            return item
+
+        result = parallel_map(func, range(100), workers=4)
+        self.assertRaises(ValueError, list, result)
+
+    def test_prefetch(self):
+        produced = []
+
+        def items():
+            for index in range(10):
+                produced.append(index)
+                yield index
+
+        result = []
+        for item in prefetch(items(), depth=2):
+            result.append(item)
+            # At most depth items are buffered plus the one being produced
+            self.assertTrue(len(produced) <= item + 1 + 3)
+
+        self.assertEqual(result, list(range(10)))
+
+    def test_prefetch_propagates_error(self):
+        def items():
+            yield 1
+            raise ValueError('error')
+
+        iterator = prefetch(items(), depth=1)
+        self.assertEqual(next(iterator), 1)
+        self.assertRaises(ValueError, next, iterator)
+
+    def test_prefetch_close_stops_producer(self):
+        closed = []
+
+        def items():
+            try:
+                for index in range(1000):
+                    yield index
+            finally:
+                closed.append(True)
+
+        iterator = prefetch(items(), depth=1)
+        self.assertEqual(next(iterator), 0)
+        iterator.close()
+        self.assertEqual(closed, [True])
+
+    def test_interleave(self):
+        iterables = [range(0, 10), range(10, 15), [], range(15, 30)]
+        result = list(interleave(iterables, workers=2, depth=3))
+        self.assertEqual(sorted(result), list(range(30)))
+
+    def test_interleave_propagates_error(self):
+        def items():
+            yield 1
+            raise ValueError('error')
+
+        result = interleave([range(100), items()], workers=2)
+        self.assertRaises(ValueError, list, result)
+
+    def test_chain_prefetched(self):
+        iterables = [range(0, 10), [], range(10, 15), range(15, 30)]
+        result = list(chain_prefetched(iterables, workers=2, depth=3))
+        self.assertEqual(result, list(range(30)))
+
+    def test_chain_prefetched_bounds_active_iterables(self):
+        started = []
+
+        def items(index):
+            started.append(index)
+            for item in range(index * 10, index * 10 + 10):
+                yield item
+
+        iterator = chain_prefetched([items(i) for i in range(10)],
+                                    workers=2, depth=1)
+        self.assertEqual(next(iterator), 0)
+        # Only the next iterable is consumed ahead while the first one
+        # hasn't been buffered yet
+        self.assertTrue(set(started) <= set([0, 1]))
+        self.assertEqual(list(iterator), list(range(1, 100)))
+
+    def test_chain_prefetched_propagates_error(self):
+        def items():
+            yield 1
+            raise ValueError('error')
+
+        iterator = chain_prefetched([items(), range(100)], workers=2)
+        self.assertEqual(next(iterator), 1)
+        self.assertRaises(ValueError, next, iterator)
+
+    def test_merge_sorted(self):
+        iterables = [[1, 4, 7], [], [2, 5, 8], [0, 3, 6, 9]]
+        self.assertEqual(list(merge_sorted(iterables)), list(range(10)))
+
+        iterables = [['bb', 'd'], ['a', 'ccc']]
+        self.assertEqual(list(merge_sorted(iterables, key=lambda x: x[0])),
+                         ['a', 'bb', 'ccc', 'd'])
+
+    def test_retry(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ValueError('error')
+            return 'ok'
+
+        self.assertEqual(retry(func, retries=2, delay=0), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        calls[:] = []
+        self.assertRaises(ValueError, retry, func, retries=1, delay=0)
+        self.assertEqual(len(calls), 2)
+
+    @patch('time.sleep')
+    def test_retry_delay(self, sleep):
+        def func():
+            raise ValueError('error')
+
+        self.assertRaises(ValueError, retry, func, retries=3)
+
+        delays = [args[0] for (args, _) in sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+
+        for (delay, expected) in zip(delays, [0.5, 1, 2]):
+            self.assertTrue(expected <= delay <= expected * 1.5)
+
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
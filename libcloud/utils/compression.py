@@ -14,29 +14,165 @@
 # limitations under the License.
 
 import zlib
-import gzip
 
-from libcloud.utils.py3 import PY3
-from libcloud.utils.py3 import StringIO
+try:
+    from io import RawIOBase
+except ImportError:
+    # Python 2.5 doesn't have the io module
+    class RawIOBase(object):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+from libcloud.utils.py3 import b
 
 
 __all__ = [
-    'decompress_data'
+    'decompress_data',
+    'get_decompressor',
+    'DecompressingReader'
 ]
 
+# Size of a compressed block which is read from the underlying stream
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSION_TYPES = {
+    'zlib': 'zlib',
+    'deflate': 'zlib',
+    'gzip': 'gzip',
+    'x-gzip': 'gzip'
+}
+
+
+def get_decompressor(compression_type):
+    """
+    Return a zlib decompression object for the provided compression type.
+
+    @param compression_type: Compression type (zlib, deflate, gzip, x-gzip)
+    @type compression_type: C{str}
+    """
+    compression_type = COMPRESSION_TYPES.get(compression_type, None)
 
-def decompress_data(compression_type, data):
     if compression_type == 'zlib':
-        return zlib.decompress(data)
+        return zlib.decompressobj()
     elif compression_type == 'gzip':
-        # TODO: Should export BytesIO as StringIO in libcloud.utils.py3
-        if PY3:
-            from io import BytesIO
-            cls = BytesIO
-        else:
-            cls = StringIO
-
-        return gzip.GzipFile(fileobj=cls(data)).read()
-    else:
-        raise Exception('Invalid or onsupported compression type: %s' %
-                        (compression_type))
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    raise Exception('Invalid or onsupported compression type: %s' %
+                    (compression_type))
+
+
+def decompress_data(compression_type, data):
+    decompressor = get_decompressor(compression_type)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class DecompressingReader(RawIOBase):
+    """
+    File-like object which incrementally decompresses data read from a
+    compressed stream (e.g. an HTTP response with Content-Encoding: gzip).
+
+    Compressed data is read in blocks of C{chunk_size} bytes and at most
+    the requested amount of data is decompressed at once so neither the
+    compressed nor the decompressed payload is ever fully held in memory.
+
+    Other attributes (status, getheaders, etc.) are proxied to the wrapped
+    stream.
+    """
+
+    def __init__(self, fileobj, compression_type, chunk_size=CHUNK_SIZE):
+        """
+        @param fileobj: Stream with compressed data.
+        @type fileobj: C{file}
+
+        @param compression_type: Compression type (zlib, deflate, gzip)
+        @type compression_type: C{str}
+
+        @param chunk_size: Size of compressed blocks which are read from the
+                           stream.
+        @type chunk_size: C{int}
+        """
+        RawIOBase.__init__(self)
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decompressor = get_decompressor(compression_type)
+
+        # Number of compressed bytes read from the underlying stream
+        self.bytes_read = 0
+
+        self._pending = b('')
+        self._eof = False
+
+    def __getattr__(self, name):
+        if name == 'fileobj':
+            raise AttributeError(name)
+
+        return getattr(self.fileobj, name)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+
+            while True:
+                data = self._decompress(self.chunk_size)
+
+                if not data:
+                    break
+
+                chunks.append(data)
+
+            return b('').join(chunks)
+
+        return self._decompress(size)
+
+    def readinto(self, buf):
+        data = self._decompress(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    def _decompress(self, size):
+        """
+        Return at most C{size} bytes of decompressed data, reading and
+        decompressing more compressed blocks from the stream as needed.
+        """
+        if not size:
+            return b('')
+
+        while not self._pending and not self._eof:
+            data = self.decompressor.unconsumed_tail
+
+            if not data and not getattr(self.decompressor, 'eof', False):
+                data = b(self.fileobj.read(self.chunk_size))
+                self.bytes_read += len(data)
+
+            if data:
+                self._pending = self.decompressor.decompress(data, size)
+            else:
+                self._pending = self.decompressor.flush()
+                self._eof = True
+
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+
+        return data
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        data = self.read(self.chunk_size)
+
+        if not data:
+            raise StopIteration
+
+        return data
+
+    __next__ = next
+
+    def close(self):
+        RawIOBase.close(self)
+        self.fileobj.close()
@@ -0,0 +1,477 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Helpers for running blocking operations (usually HTTP requests) concurrently
+using a bounded pool of threads.
+"""
+
+import sys
+import time
+import heapq
+import random
+import threading
+
+from libcloud.utils.py3 import queue
+
+__all__ = [
+    'parallel_map',
+    'prefetch',
+    'interleave',
+    'chain_prefetched',
+    'merge_sorted',
+    'retry'
+]
+
+# Default number of seconds to wait before the first retry
+RETRY_DELAY = 0.5
+
+_STOP = object()
+
+
+def parallel_map(func, iterable, workers=4, ordered=False):
+    """
+    Apply `func` to every item in `iterable` using a pool of worker threads
+    and return a generator which yields (item, result) tuples.
+
+    Items are lazily taken from `iterable` and at most `workers` items are
+    in flight (taken from the iterable, but not yet yielded) at any time.
+    This bounds memory usage when items are large (e.g. upload parts).
+
+    If `func` raises an exception, no new items are scheduled, the items
+    which are already in flight are allowed to finish and the exception is
+    re-raised in the caller.
+
+    @type func: C{callable}
+    @param func: Function which is called with a single item.
+
+    @type iterable: C{iterable}
+    @param iterable: Items to process.
+
+    @type workers: C{int}
+    @param workers: Number of worker threads. If 1 or less, items are
+                    processed in the calling thread.
+
+    @type ordered: C{bool}
+    @param ordered: True to yield results in the same order as the items
+                    were taken from the iterable, otherwise results are
+                    yielded as soon as they are available.
+
+    @rtype: C{generator} of C{tuple}
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield item, func(item)
+        return
+
+    tasks = queue.Queue()
+    results = queue.Queue()
+
+    def worker():
+        while True:
+            task = tasks.get()
+
+            if task is _STOP:
+                return
+
+            index, item = task
+
+            try:
+                result = (index, item, func(item), None)
+            except Exception:
+                result = (index, item, None, sys.exc_info()[1])
+
+            results.put(result)
+
+    threads = []
+    for _ in range(workers):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    iterator = iter(iterable)
+    exhausted = False
+    in_flight = 0
+    next_index = 0
+    next_yield_index = 0
+    done = {}
+
+    try:
+        while True:
+            while not exhausted and in_flight < workers:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                tasks.put((next_index, item))
+                next_index += 1
+                in_flight += 1
+
+            if in_flight == 0:
+                break
+
+            index, item, result, error = results.get()
+
+            if error is not None:
+                raise error
+
+            if not ordered:
+                in_flight -= 1
+                yield item, result
+                continue
+
+            done[index] = (item, result)
+
+            while next_yield_index in done:
+                item, result = done.pop(next_yield_index)
+                next_yield_index += 1
+                in_flight -= 1
+                yield item, result
+    finally:
+        for _ in threads:
+            tasks.put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+
+def prefetch(iterable, depth=1):
+    """
+    Consume `iterable` in a background thread and return a generator which
+    yields the same items.
+
+    At most `depth` items which have not been yielded yet are buffered so
+    the producer (e.g. a generator which requests the next page of a
+    listing) runs ahead of the consumer by a bounded amount. Exceptions
+    raised by the producer are re-raised in the consumer. If the returned
+    generator is closed early, the producer is stopped once it has
+    finished producing the current item.
+
+    @type iterable: C{iterable}
+    @param iterable: Items to prefetch.
+
+    @type depth: C{int}
+    @param depth: Maximum number of buffered items.
+
+    @rtype: C{generator}
+    """
+    items = queue.Queue(max(depth, 1))
+    stopped = []
+
+    def put(item):
+        while not stopped:
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def producer():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    break
+            else:
+                put((_STOP, None))
+        except Exception:
+            put((_STOP, sys.exc_info()[1]))
+
+        # Release resources held by a generator which hasn't been exhausted
+        close = getattr(iterable, 'close', None)
+
+        if close is not None:
+            close()
+
+    thread = threading.Thread(target=producer)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, error = items.get()
+
+            if item is _STOP:
+                if error is not None:
+                    raise error
+                return
+
+            yield item
+    finally:
+        stopped.append(True)
+        thread.join()
+
+
+def interleave(iterables, workers=4, depth=100):
+    """
+    Consume multiple iterables concurrently and return a generator which
+    yields their items in the order in which they are produced.
+
+    Each worker thread drains one iterable at a time. At most `depth`
+    items which have not been yielded yet are buffered. Exceptions raised
+    by any of the iterables are re-raised in the consumer.
+
+    @type iterables: C{iterable} of C{iterable}
+    @param iterables: Iterables to consume.
+
+    @type workers: C{int}
+    @param workers: Number of iterables which are consumed concurrently.
+
+    @type depth: C{int}
+    @param depth: Maximum number of buffered items.
+
+    @rtype: C{generator}
+    """
+    tasks = queue.Queue()
+    items = queue.Queue(max(depth, 1))
+    stopped = []
+
+    for iterable in iterables:
+        tasks.put(iterable)
+
+    workers = max(min(workers, tasks.qsize()), 1)
+
+    def put(item):
+        while not stopped:
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def worker():
+        while not stopped:
+            try:
+                iterable = tasks.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                for item in iterable:
+                    if not put((item, None)):
+                        break
+            except Exception:
+                put((_STOP, sys.exc_info()[1]))
+                return
+
+            # Release resources held by a generator which hasn't been
+            # exhausted
+            close = getattr(iterable, 'close', None)
+
+            if close is not None:
+                close()
+
+        put((_STOP, None))
+
+    threads = []
+    for _ in range(workers):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    running = len(threads)
+
+    try:
+        while running:
+            item, error = items.get()
+
+            if item is _STOP:
+                if error is not None:
+                    raise error
+
+                running -= 1
+                continue
+
+            yield item
+    finally:
+        stopped.append(True)
+
+        for thread in threads:
+            thread.join()
+
+
+def chain_prefetched(iterables, workers=4, depth=100):
+    """
+    Return a generator which yields the items of multiple iterables one
+    iterable after the other (like C{itertools.chain}) while up to
+    `workers` of them are consumed ahead in background threads.
+
+    At most `depth` items which have not been yielded yet are buffered per
+    iterable. Exceptions raised by any of the iterables are re-raised in
+    the consumer once it reaches the items of that iterable.
+
+    @type iterables: C{iterable} of C{iterable}
+    @param iterables: Iterables to consume.
+
+    @type workers: C{int}
+    @param workers: Number of iterables which are consumed concurrently.
+
+    @type depth: C{int}
+    @param depth: Maximum number of buffered items per iterable.
+
+    @rtype: C{generator}
+    """
+    iterables = list(iterables)
+    buffers = [queue.Queue(max(depth, 1)) for _ in iterables]
+    tasks = queue.Queue()
+    stopped = []
+
+    for index in range(len(iterables)):
+        tasks.put(index)
+
+    def put(items, item):
+        while not stopped:
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def worker():
+        # Iterables are taken in order, so the one which is being consumed
+        # has always been taken by a worker
+        while not stopped:
+            try:
+                index = tasks.get_nowait()
+            except queue.Empty:
+                break
+
+            iterable = iterables[index]
+            items = buffers[index]
+
+            try:
+                for item in iterable:
+                    if not put(items, (item, None)):
+                        break
+                else:
+                    put(items, (_STOP, None))
+            except Exception:
+                put(items, (_STOP, sys.exc_info()[1]))
+
+            # Release resources held by a generator which hasn't been
+            # exhausted
+            close = getattr(iterable, 'close', None)
+
+            if close is not None:
+                close()
+
+    threads = []
+    for _ in range(max(min(workers, len(iterables)), 1)):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    try:
+        for items in buffers:
+            while True:
+                item, error = items.get()
+
+                if item is _STOP:
+                    if error is not None:
+                        raise error
+                    break
+
+                yield item
+    finally:
+        stopped.append(True)
+
+        for thread in threads:
+            thread.join()
+
+
+def merge_sorted(iterables, key=None):
+    """
+    Merge multiple sorted iterables into a single sorted generator.
+
+    @type iterables: C{iterable} of C{iterable}
+    @param iterables: Iterables which are sorted by `key`.
+
+    @type key: C{callable}
+    @param key: Function which returns the sort key for an item. Defaults
+                to the item itself.
+
+    @rtype: C{generator}
+    """
+    key = key or (lambda item: item)
+    heap = []
+
+    for index, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+
+        for item in iterator:
+            heap.append((key(item), index, item, iterator))
+            break
+
+    heapq.heapify(heap)
+
+    while heap:
+        item_key, index, item, iterator = heap[0]
+        yield item
+
+        for item in iterator:
+            heapq.heapreplace(heap, (key(item), index, item, iterator))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+def retry(func, retries=3, delay=RETRY_DELAY, backoff=2,
+          exceptions=(Exception,)):
+    """
+    Call `func` and retry it up to `retries` times if it raises one of
+    `exceptions`.
+
+    The delay between the retries grows exponentially and a random jitter
+    (up to half of the delay) is added to it so concurrent callers which
+    failed at the same time don't retry at the same time.
+
+    @type func: C{callable}
+    @param func: Function without arguments to call.
+
+    @type retries: C{int}
+    @param retries: Maximum number of retries.
+
+    @type delay: C{float}
+    @param delay: Seconds to wait before the first retry.
+
+    @type backoff: C{float}
+    @param backoff: Multiplier applied to the delay after each retry.
+
+    @return: Value returned by `func`.
+    """
+    attempt = 0
+
+    while True:
+        try:
+            return func()
+        except exceptions:
+            if attempt >= retries:
+                raise
+
+        attempt += 1
+
+        if delay:
+            time.sleep(delay + random.uniform(0, delay / 2.0))
+            delay *= backoff
@@ -13,7 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
 import os
+import sys
+import errno
+import threading
 import mimetypes
 
 from libcloud.utils.py3 import PY3
@@ -23,9 +28,27 @@ from libcloud.utils.py3 import b
 
 CHUNK_SIZE = 8096
 
+# Serializes seek + read on platforms without os.pread
+_PREAD_LOCK = threading.Lock()
+
+# memoryview is only available in Python 2.7 and later. Older versions use
+# the read() based code paths
+try:
+    memoryview
+except NameError:
+    HAS_MEMORYVIEW = False
+else:
+    HAS_MEMORYVIEW = True
+
 if PY3:
+    import io
     from io import FileIO as file
 
+    # Binary file objects returned by open() on Python 3 are buffered
+    FILE_TYPES = (io.RawIOBase, io.BufferedIOBase)
+else:
+    FILE_TYPES = (file,)
+
 
 def read_in_chunks(iterator, chunk_size=None, fill_size=False):
     """
@@ -42,42 +65,148 @@ def read_in_chunks(iterator, chunk_size=None, fill_size=False):
     @param fill_size: If True, make sure chunks are chunk_size in length
                       (except for last chunk).
 
-    TODO: At some point in the future we could use byte arrays here if version
-    >= Python 3. This should speed things up a bit and reduce memory usage.
+    When fill_size is True, chunks are assembled in a single pre-allocated
+    buffer. File objects which support readinto() are read directly into
+    that buffer and every byte is copied exactly once more when the chunk
+    is yielded, regardless of the size of the stream. Without memoryview
+    support, pieces are joined instead.
     """
     chunk_size = chunk_size or CHUNK_SIZE
 
-    if isinstance(iterator, (file, httplib.HTTPResponse)):
-        get_data = iterator.read
-        args = (chunk_size, )
+    if isinstance(iterator, FILE_TYPES + (httplib.HTTPResponse,)):
+        readinto = _get_readinto(iterator)
+
+        if fill_size and readinto and HAS_MEMORYVIEW:
+            return _readinto_in_chunks(readinto, chunk_size)
+
+        pieces = _read_pieces(iterator.read, chunk_size)
     else:
-        get_data = next
-        args = (iterator, )
-
-    data = b('')
-    empty = False
-
-    while not empty or len(data) > 0:
-        if not empty:
-            try:
-                chunk = b(get_data(*args))
-                if len(chunk) > 0:
-                    data += chunk
-                else:
-                    empty = True
-            except StopIteration:
-                empty = True
+        pieces = _iterate_pieces(iterator)
+
+    if fill_size and HAS_MEMORYVIEW:
+        return _fill_chunks(pieces, chunk_size)
+    elif fill_size:
+        return _join_chunks(pieces, chunk_size)
+
+    return pieces
+
+
+def _get_readinto(file_obj):
+    """
+    Return readinto method of a file object or None if the object doesn't
+    have one or if the read method has been overridden in a subclass without
+    also overriding readinto.
+    """
+    for klass in type(file_obj).__mro__:
+        if 'readinto' in klass.__dict__:
+            return file_obj.readinto
+        elif 'read' in klass.__dict__:
+            return None
+
+    return None
+
+
+def _read_pieces(read, chunk_size):
+    while True:
+        data = b(read(chunk_size))
 
         if len(data) == 0:
-            raise StopIteration
+            return
+
+        yield data
+
+
+def _iterate_pieces(iterator):
+    while True:
+        try:
+            data = b(next(iterator))
+        except StopIteration:
+            return
+
+        if len(data) == 0:
+            return
+
+        yield data
+
+
+def _readinto_in_chunks(readinto, chunk_size):
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+
+    while True:
+        filled = 0
+
+        while filled < chunk_size:
+            read = readinto(view[filled:])
+
+            if not read:
+                break
+
+            filled += read
+
+        if filled == 0:
+            return
+
+        yield view[:filled].tobytes()
+
+        if filled < chunk_size:
+            return
+
+
+def _fill_chunks(pieces, chunk_size):
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    filled = 0
+
+    for data in pieces:
+        data_view = memoryview(data)
+        offset = 0
+        length = len(data)
 
-        if fill_size:
-            if empty or len(data) >= chunk_size:
-                yield data[:chunk_size]
-                data = data[chunk_size:]
-        else:
-            yield data
-            data = b('')
+        while offset < length:
+            if filled == 0 and length - offset >= chunk_size:
+                # Whole chunk is available in the input, no need to copy it
+                # to the buffer first
+                yield data_view[offset:offset + chunk_size].tobytes()
+                offset += chunk_size
+                continue
+
+            size = min(chunk_size - filled, length - offset)
+            view[filled:filled + size] = data_view[offset:offset + size]
+            filled += size
+            offset += size
+
+            if filled == chunk_size:
+                yield view.tobytes()
+                filled = 0
+
+    if filled > 0:
+        yield view[:filled].tobytes()
+
+
+def _join_chunks(pieces, chunk_size):
+    buffered = []
+    size = 0
+
+    for data in pieces:
+        buffered.append(data)
+        size += len(data)
+
+        if size < chunk_size:
+            continue
+
+        data = b('').join(buffered)
+        offset = 0
+
+        while size - offset >= chunk_size:
+            yield data[offset:offset + chunk_size]
+            offset += chunk_size
+
+        buffered = [data[offset:]]
+        size -= offset
+
+    if size > 0:
+        yield b('').join(buffered)
 
 
 def exhaust_iterator(iterator):
@@ -91,22 +220,85 @@ def exhaust_iterator(iterator):
     @rtype C{str}
     @return Data returned by the iterator.
     """
-    data = b('')
+    return b('').join(_iterate_pieces(iterator))
+
+
+def pread(fileno, size, offset):
+    """
+    Read up to size bytes from a file descriptor starting at offset.
+
+    The file position is not used so multiple threads can read different
+    parts of a file through a single file descriptor at once. On platforms
+    without os.pread, reads are serialized.
+
+    @type fileno: C{int}
+    @param fileno: File descriptor.
+
+    @type size: C{int}
+    @param size: Maximum number of bytes to read.
+
+    @type offset: C{int}
+    @param offset: Offset from the beginning of the file.
+
+    @rtype: C{bytes}
+    """
+    if hasattr(os, 'pread'):
+        return os.pread(fileno, size, offset)
 
-    try:
-        chunk = b(next(iterator))
-    except StopIteration:
-        chunk = b('')
+    with _PREAD_LOCK:
+        os.lseek(fileno, offset, os.SEEK_SET)
+        return os.read(fileno, size)
 
-    while len(chunk) > 0:
-        data += chunk
 
+def get_data_ranges(file_obj):
+    """
+    Return a generator which yields (start, end) offsets of the regions of a
+    file which contain data.
+
+    Holes of sparse files are detected using SEEK_DATA / SEEK_HOLE. On
+    platforms and file systems which don't support them, the whole file is
+    returned as a single region. Note that the file position is changed.
+
+    @type file_obj: C{file}
+    @param file_obj: File object which has a file descriptor.
+
+    @rtype: C{generator} of C{tuple}
+    """
+    fileno = file_obj.fileno()
+    size = os.fstat(fileno).st_size
+
+    seek_data = getattr(os, 'SEEK_DATA', None)
+    seek_hole = getattr(os, 'SEEK_HOLE', None)
+
+    if seek_data is None or seek_hole is None:
+        if size:
+            yield (0, size)
+        return
+
+    offset = 0
+
+    while offset < size:
         try:
-            chunk = b(next(iterator))
-        except StopIteration:
-            chunk = b('')
+            start = os.lseek(fileno, offset, seek_data)
+        except OSError:
+            e = sys.exc_info()[1]
+
+            if e.errno == errno.ENXIO:
+                # There is no more data after the offset
+                return
+            elif offset == 0:
+                # Not supported by the file system
+                yield (0, size)
+                return
+
+            raise
+
+        end = min(os.lseek(fileno, start, seek_hole), size)
+
+        if end > start:
+            yield (start, end)
 
-    return data
+        offset = end
 
 
 def guess_file_mime_type(file_path):
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from xml.etree import ElementTree as ET
+
 
 def fixxpath(xpath, namespace=None):
     # ElementTree wants namespaces in its xpaths, so here we add them.
@@ -32,3 +34,57 @@ def findattr(element, xpath, namespace=None):
 
 def findall(element, xpath, namespace=None):
     return element.findall(fixxpath(xpath=xpath, namespace=namespace))
+
+
+def iterparse_elements(source, xpath, namespace=None, parsed=None):
+    """
+    Incrementally parse an XML document and yield elements which match the
+    provided path.
+
+    Every yielded element is removed from the tree once the consumer asks
+    for the next one so memory usage doesn't grow with the number of
+    matched elements. All the other elements are kept which means values
+    such as a pagination marker can be read from the root element once the
+    document has been consumed.
+
+    @param source: File-like object with a read method.
+    @type source: C{file}
+
+    @param xpath: Path of the elements relative to the root element (e.g.
+                  C{Contents} or C{reservationSet/item}).
+    @type xpath: C{str}
+
+    @param namespace: Optional namespace of the elements.
+    @type namespace: C{str}
+
+    @param parsed: Optional dictionary. Root element is stored under the
+                   C{root} key as soon as it has been parsed.
+    @type parsed: C{dict}
+
+    @rtype: C{generator} of C{Element}
+    """
+    tags = [fixxpath(xpath=tag, namespace=namespace)
+            for tag in xpath.split('/')]
+    depth = len(tags) + 1
+    stack = []
+
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if not stack and parsed is not None:
+                parsed['root'] = element
+
+            stack.append(element)
+            continue
+
+        stack.pop()
+
+        if len(stack) + 1 != depth or element.tag != tags[-1]:
+            continue
+
+        if [e.tag for e in stack[1:]] != tags[:-1]:
+            continue
+
+        yield element
+
+        element.clear()
+        stack[-1].remove(element)